@@ -1,11 +1,31 @@
-from fastapi import Header
+import hmac
+import logging
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from uuid import UUID
+
+from fastapi import Depends, Header, HTTPException, Request, status
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.rate_limit import rate_limiter
+from app.core.request_trace import STAGE_AUTH, timed_stage
 from app.core.security import AuthUser, parse_mock_bearer_token
 from app.core.supabase_auth import verify_supabase_access_token
+from app.db import session as db_session
+from app.db.read_routing import ROUTE_REPLICA, read_router
+
+logger = logging.getLogger("nvc.api.deps")
 
 
 async def get_current_user(authorization: str | None = Header(default=None)) -> AuthUser:
+    with timed_stage(STAGE_AUTH):
+        return await _resolve_current_user(authorization)
+
+
+async def _resolve_current_user(authorization: str | None) -> AuthUser:
     token_is_mock = isinstance(authorization, str) and authorization.strip().startswith("Bearer mock_")
 
     # Allow explicit mock token in any auth mode when mock is enabled.
@@ -21,3 +41,82 @@ async def get_current_user(authorization: str | None = Header(default=None)) ->
         return parse_mock_bearer_token(authorization)
     return await verify_supabase_access_token(authorization)
 
+
+async def require_ops_token(x_ops_token: str | None = Header(default=None)) -> None:
+    # Guards operational endpoints that can affect a live worker.
+    expected = settings.ops_token
+    if not expected or not x_ops_token or not hmac.compare_digest(
+        x_ops_token.encode("utf-8"), expected.encode("utf-8")
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="invalid ops token")
+
+
+def enforce_rate_limit(route: str) -> Callable[..., Awaitable[None]]:
+    # Use as a route-level dependency: those resolve before the handler's own
+    # parameters, so a rejected request never opens a DB session or calls the LLM.
+    async def _enforce(
+        request: Request,
+        user: AuthUser = Depends(get_current_user),
+    ) -> None:
+        decision = await rate_limiter.check(route, user.user_id)
+        if decision is None:
+            return
+        headers = decision.headers()
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="rate limit exceeded, retry later",
+                headers=headers,
+            )
+        # Copied onto the response by the request middleware.
+        request.state.rate_limit_headers = headers
+
+    return _enforce
+
+
+async def get_write_db_session(
+    user: AuthUser = Depends(get_current_user),
+) -> AsyncGenerator[AsyncSession, None]:
+    # Pin before the handler runs so a read racing the response already sees it,
+    # and again at every commit: the pin window has to start once the write is
+    # visible on primary, not before a handler that may spend a minute in the LLM.
+    read_router.record_write(user.user_id)
+    async with db_session.SessionLocal() as session:
+        event.listen(
+            session.sync_session,
+            "after_commit",
+            lambda _: read_router.record_write(user.user_id),
+        )
+        yield session
+
+
+@asynccontextmanager
+async def open_read_db_session(user_id: UUID) -> AsyncIterator[AsyncSession]:
+    replica_factory = db_session.ReplicaSessionLocal
+    route = read_router.choose(user_id, replica_configured=replica_factory is not None)
+    if route == ROUTE_REPLICA:
+        session = replica_factory()
+        try:
+            # Connect eagerly so an unreachable replica falls back before the
+            # handler has issued any query.
+            await session.connection()
+        except (OSError, TimeoutError, SQLAlchemyError):
+            await session.close()
+            read_router.record_replica_failure()
+            logger.warning("read replica unavailable, falling back to primary", exc_info=True)
+        else:
+            try:
+                yield session
+            finally:
+                await session.close()
+            return
+
+    async with db_session.SessionLocal() as session:
+        yield session
+
+
+async def get_read_db_session(
+    user: AuthUser = Depends(get_current_user),
+) -> AsyncGenerator[AsyncSession, None]:
+    async with open_read_db_session(user.user_id) as session:
+        yield session
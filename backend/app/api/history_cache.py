@@ -0,0 +1,67 @@
+import hashlib
+from uuid import UUID
+
+from app.core.cache import LruTtlCache
+from app.core.config import settings
+
+# Bump when the serialized history shape changes so old client copies revalidate.
+HISTORY_ETAG_VERSION = "1"
+
+HistoryCacheKey = tuple[UUID, UUID]
+
+session_history_cache: LruTtlCache[HistoryCacheKey, tuple[str, bytes]] = LruTtlCache(
+    max_entries=max(1, settings.history_cache_size),
+    name="session_history",
+)
+
+
+def build_history_etag(
+    session_id: UUID,
+    current_turn: int,
+    state: str,
+    has_summary: bool,
+    has_reflection: bool,
+) -> str:
+    raw = ":".join(
+        [
+            HISTORY_ETAG_VERSION,
+            str(session_id),
+            str(current_turn),
+            state,
+            "1" if has_summary else "0",
+            "1" if has_reflection else "0",
+        ]
+    )
+    return f'"{hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        normalized = candidate.strip()
+        if normalized == "*":
+            return True
+        # If-None-Match uses weak comparison, so a W/ prefix still matches.
+        if normalized.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def get_cached_history(user_id: UUID, session_id: UUID, etag: str) -> bytes | None:
+    if settings.history_cache_size <= 0:
+        return None
+    cached = session_history_cache.get((user_id, session_id))
+    if cached is None or cached[0] != etag:
+        return None
+    return cached[1]
+
+
+def cache_history(user_id: UUID, session_id: UUID, etag: str, body: bytes) -> None:
+    if settings.history_cache_size <= 0:
+        return
+    session_history_cache.set((user_id, session_id), (etag, body))
+
+
+def invalidate_session_history(user_id: UUID, session_id: UUID) -> None:
+    session_history_cache.discard((user_id, session_id))
@@ -0,0 +1,43 @@
+from datetime import UTC, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.api.deps import get_current_user
+from app.core.security import AuthUser
+from app.db.event_logs import EventLogRow
+from app.schemas.events import EventBatchRequest, EventBatchResponse
+from app.services.event_buffer import event_buffer
+
+router = APIRouter(prefix="/api/v1/events", tags=["events"])
+
+
+@router.post(":batch", response_model=EventBatchResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_event_batch(
+    payload: EventBatchRequest,
+    user: AuthUser = Depends(get_current_user),
+) -> EventBatchResponse:
+    # No DB session here: events are queued and bulk-inserted by the buffer's
+    # background flusher, so ingestion never competes with request traffic.
+    server_ts = datetime.now(UTC)
+    email = (user.email or f"{user.user_id}@local.user").strip().lower()
+    display_name = (user.display_name or "User").strip()[:120]
+    rows = [
+        EventLogRow(
+            user_id=user.user_id,
+            user_email=email,
+            user_display_name=display_name,
+            session_id=event.session_id,
+            event_name=event.event_name,
+            event_props=event.event_props,
+            client_ts=event.client_ts,
+            server_ts=server_ts,
+        )
+        for event in payload.events
+    ]
+    if not event_buffer.offer(rows):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="event buffer full, retry later",
+            headers={"Retry-After": "1"},
+        )
+    return EventBatchResponse(accepted=len(rows))
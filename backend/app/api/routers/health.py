@@ -1,12 +1,37 @@
-from fastapi import APIRouter
+from typing import Literal
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from app.api.deps import require_ops_token
+from app.api.history_cache import session_history_cache
 from app.core.config import settings
 from app.core.observability import observability_registry
-from app.schemas.common import HealthResponse, ObservabilityMetricsResponse
+from app.core.profiler import sampling_profiler
+from app.core.prometheus import CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE
+from app.core.prometheus import render_prometheus
+from app.core.rate_limit import rate_limiter
+from app.core.supabase_auth import auth_claims_cache, jwks_manager
+from app.core.supabase_user import supabase_user_fallback
+from app.db import session as db_session
+from app.db.idempotency import idempotency_response_cache
+from app.db.read_routing import read_router
+from app.schemas.common import (
+    HealthResponse,
+    ObservabilityMetricsResponse,
+    SlowRequestsResponse,
+    SqlStatementsResponse,
+)
+from app.services.event_buffer import event_buffer
 
 router = APIRouter(tags=["system"])
 
 
+def _require_profiler_enabled() -> None:
+    # Disabled workers do not expose the endpoint at all.
+    if not settings.profiler_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not found")
+
+
 @router.get("/health", response_model=HealthResponse)
 def health() -> HealthResponse:
     return HealthResponse(status="ok", app_env=settings.app_env)
@@ -17,4 +42,88 @@ def observability_metrics() -> ObservabilityMetricsResponse:
     payload = observability_registry.snapshot(
         slow_request_threshold_ms=settings.slow_request_ms
     )
+    payload["sql"]["slow_query_threshold_ms"] = settings.slow_query_ms
+    payload["sql"]["statement_budget"] = settings.sql_statement_budget
+    payload["event_loop"]["probe_interval_ms"] = settings.event_loop_probe_interval_ms
+    payload["event_loop"]["stall_threshold_ms"] = settings.event_loop_stall_ms
+    payload["event_ingest"] = event_buffer.stats()
+    payload["read_routing"] = read_router.stats(
+        replica_configured=db_session.ReplicaSessionLocal is not None
+    )
+    payload["auth_claims_cache"] = auth_claims_cache.stats()
+    payload["jwks"] = jwks_manager.stats()
+    payload["supabase_user_fallback"] = supabase_user_fallback.stats()
+    payload["rate_limit"] = rate_limiter.stats()
     return ObservabilityMetricsResponse.model_validate(payload)
+
+
+# Exemplars carry raw paths, request ids, SQL text and source stacks.
+@router.get(
+    "/ops/slow-requests",
+    response_model=SlowRequestsResponse,
+    dependencies=[Depends(require_ops_token)],
+)
+def slow_requests() -> SlowRequestsResponse:
+    return SlowRequestsResponse(
+        slow_request_threshold_ms=settings.slow_request_ms,
+        items=observability_registry.slow_requests(),
+    )
+
+
+# /ops/metrics and the exporter only carry statement_id; this maps ids to SQL.
+@router.get(
+    "/ops/sql-statements",
+    response_model=SqlStatementsResponse,
+    dependencies=[Depends(require_ops_token)],
+)
+def sql_statements() -> SqlStatementsResponse:
+    return SqlStatementsResponse(items=observability_registry.sql_statements())
+
+
+@router.get(
+    "/ops/metrics/prometheus",
+    response_class=Response,
+    dependencies=[Depends(require_ops_token)],
+)
+def prometheus_metrics() -> Response:
+    db_pools = {"primary": db_session.pool_stats(db_session.engine)}
+    if db_session.replica_engine is not None:
+        db_pools["replica"] = db_session.pool_stats(db_session.replica_engine)
+    body = render_prometheus(
+        observability_registry.export_series(),
+        caches={
+            "auth_claims": auth_claims_cache.stats(),
+            "idempotency": idempotency_response_cache.stats(),
+            "session_history": session_history_cache.stats(),
+        },
+        db_pools=db_pools,
+        rate_limit=rate_limiter.stats(),
+    )
+    return Response(content=body, media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get(
+    "/ops/profile",
+    response_class=Response,
+    dependencies=[Depends(_require_profiler_enabled), Depends(require_ops_token)],
+)
+async def profile(
+    seconds: float = Query(default=10, gt=0),
+    interval_ms: float = Query(default=10, ge=1, le=1000),
+    mode: Literal["threads", "tasks"] = Query(default="threads"),
+) -> Response:
+    if seconds > sampling_profiler.max_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be at most {sampling_profiler.max_seconds:g}",
+        )
+    result = await sampling_profiler.profile(seconds, interval_ms, mode)
+    return Response(
+        content=result.collapsed(),
+        media_type="text/plain; charset=utf-8",
+        headers={
+            "X-Profile-Mode": result.mode,
+            "X-Profile-Samples": str(result.samples),
+            "X-Profile-Interval-Ms": f"{result.interval_ms:g}",
+        },
+    )
@@ -1,25 +1,74 @@
-from datetime import date, timedelta
+from datetime import UTC, date, datetime, timedelta
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user
-from app.db.session import get_db_session
-from app.db.security import apply_request_rls_context
+from app.api.deps import get_current_user, get_read_db_session
 from app.core.security import AuthUser
-from app.schemas.progress import WeeklyProgressResponse
+from app.db.security import apply_request_rls_context
+from app.schemas.progress import WeeklyProgressResponse, WeeklyProgressTrendResponse
 
 router = APIRouter(prefix="/api/v1/progress", tags=["progress"])
 
 
+def _monday_of(value: date) -> date:
+    return value - timedelta(days=value.weekday())
+
+
+def _weekly_progress_from_rollup(week_start: date, row) -> WeeklyProgressResponse:
+    if not row:
+        return WeeklyProgressResponse(
+            week_start=week_start,
+            practice_count=0,
+            summary_count=0,
+            real_world_used_count=0,
+            avg_outcome_score=0.0,
+        )
+    outcome_score_count = int(row["outcome_score_count"] or 0)
+    avg_outcome_score = (
+        int(row["outcome_score_sum"] or 0) / outcome_score_count
+        if outcome_score_count > 0
+        else 0.0
+    )
+    return WeeklyProgressResponse(
+        week_start=week_start,
+        practice_count=int(row["practice_count"] or 0),
+        summary_count=int(row["summary_count"] or 0),
+        real_world_used_count=int(row["real_world_used_count"] or 0),
+        avg_outcome_score=avg_outcome_score,
+    )
+
+
 @router.get("/weekly", response_model=WeeklyProgressResponse)
 async def get_weekly_progress(
     week_start: date = Query(..., description="Date in YYYY-MM-DD format"),
     user: AuthUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db_session),
 ) -> WeeklyProgressResponse:
     await apply_request_rls_context(db, user)
+
+    # Monday-aligned weeks are served from the incrementally maintained rollup;
+    # arbitrary 7-day windows still use the live aggregate query.
+    if week_start.weekday() == 0:
+        rollup_result = await db.execute(
+            text(
+                """
+                SELECT
+                  practice_count,
+                  summary_count,
+                  real_world_used_count,
+                  outcome_score_sum,
+                  outcome_score_count
+                FROM user_weekly_stats
+                WHERE user_id = :user_id
+                  AND week_start = :week_start
+                """
+            ),
+            {"user_id": str(user.user_id), "week_start": week_start},
+        )
+        return _weekly_progress_from_rollup(week_start, rollup_result.mappings().first())
+
     week_end = week_start + timedelta(days=7)
 
     metrics_result = await db.execute(
@@ -73,3 +122,51 @@ async def get_weekly_progress(
         real_world_used_count=int(row["real_world_used_count"] or 0),
         avg_outcome_score=float(row["avg_outcome_score"] or 0.0),
     )
+
+
+@router.get("/weekly/trend", response_model=WeeklyProgressTrendResponse)
+async def get_weekly_progress_trend(
+    weeks: int = Query(default=8, ge=1, le=52),
+    until: date | None = Query(
+        default=None,
+        description="Any date inside the last week to include; defaults to the current week",
+    ),
+    user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db_session),
+) -> WeeklyProgressTrendResponse:
+    await apply_request_rls_context(db, user)
+    last_week_start = _monday_of(until or datetime.now(UTC).date())
+    first_week_start = last_week_start - timedelta(weeks=weeks - 1)
+
+    result = await db.execute(
+        text(
+            """
+            SELECT
+              week_start,
+              practice_count,
+              summary_count,
+              real_world_used_count,
+              outcome_score_sum,
+              outcome_score_count
+            FROM user_weekly_stats
+            WHERE user_id = :user_id
+              AND week_start BETWEEN :first_week_start AND :last_week_start
+            ORDER BY week_start ASC
+            """
+        ),
+        {
+            "user_id": str(user.user_id),
+            "first_week_start": first_week_start,
+            "last_week_start": last_week_start,
+        },
+    )
+    rows_by_week = {row["week_start"]: row for row in result.mappings().all()}
+
+    return WeeklyProgressTrendResponse(
+        weeks=[
+            _weekly_progress_from_rollup(week_start, rows_by_week.get(week_start))
+            for week_start in (
+                first_week_start + timedelta(weeks=index) for index in range(weeks)
+            )
+        ]
+    )
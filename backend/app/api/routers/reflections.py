@@ -3,11 +3,12 @@ from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user
-from app.db.session import get_db_session
+from app.api.deps import get_current_user, get_write_db_session
+from app.api.history_cache import invalidate_session_history
+from app.core.security import AuthUser
 from app.db.security import apply_request_rls_context
 from app.db.utils import ensure_user_exists, get_session_owned_by_user
-from app.core.security import AuthUser
+from app.db.weekly_stats import bump_user_weekly_stats
 from app.schemas.reflections import ReflectionCreateRequest, ReflectionCreateResponse
 
 router = APIRouter(prefix="/api/v1/reflections", tags=["reflections"])
@@ -17,7 +18,7 @@ router = APIRouter(prefix="/api/v1/reflections", tags=["reflections"])
 async def create_reflection(
     payload: ReflectionCreateRequest,
     user: AuthUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_write_db_session),
 ) -> ReflectionCreateResponse:
     await apply_request_rls_context(db, user)
     await ensure_user_exists(db, user)
@@ -58,6 +59,17 @@ async def create_reflection(
             },
         )
         row = result.mappings().one()
+        await db.execute(
+            text("UPDATE sessions SET has_reflection = TRUE WHERE id = :session_id"),
+            {"session_id": str(payload.session_id)},
+        )
+        await bump_user_weekly_stats(
+            db,
+            user.user_id,
+            row["created_at"],
+            real_world_used_count=1 if payload.used_in_real_world else 0,
+            outcome_score=payload.outcome_score,
+        )
         await db.commit()
     except IntegrityError as exc:
         await db.rollback()
@@ -65,5 +77,6 @@ async def create_reflection(
             status_code=status.HTTP_409_CONFLICT,
             detail="reflection already exists for this session",
         ) from exc
+    invalidate_session_history(user.user_id, payload.session_id)
 
     return ReflectionCreateResponse(reflection_id=row["id"], created_at=row["created_at"])
@@ -4,11 +4,10 @@ from fastapi import APIRouter, Depends, status
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user
-from app.db.session import get_db_session
+from app.api.deps import get_current_user, get_write_db_session
+from app.core.security import AuthUser
 from app.db.security import apply_request_rls_context
 from app.db.utils import ensure_user_exists
-from app.core.security import AuthUser
 from app.schemas.scenes import SceneCreateRequest, SceneCreateResponse
 
 router = APIRouter(prefix="/api/v1/scenes", tags=["scenes"])
@@ -18,7 +17,7 @@ router = APIRouter(prefix="/api/v1/scenes", tags=["scenes"])
 async def create_scene(
     payload: SceneCreateRequest,
     user: AuthUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_write_db_session),
 ) -> SceneCreateResponse:
     await apply_request_rls_context(db, user)
     await ensure_user_exists(db, user)
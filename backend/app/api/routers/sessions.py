@@ -1,24 +1,53 @@
+import base64
 import json
-from datetime import date, timedelta
+from collections.abc import AsyncIterator
+from datetime import date, datetime, timedelta
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user
-from app.db.session import get_db_session
-from app.db.security import apply_request_rls_context
-from app.db.utils import ensure_user_exists, get_scene_owned_by_user, get_session_owned_by_user
+from app.api.deps import (
+    enforce_rate_limit,
+    get_current_user,
+    get_read_db_session,
+    get_write_db_session,
+    open_read_db_session,
+)
+from app.api.history_cache import (
+    build_history_etag,
+    cache_history,
+    etag_matches,
+    get_cached_history,
+    invalidate_session_history,
+)
+from app.core.rate_limit import ROUTE_SESSION_MESSAGE, ROUTE_SESSION_REWRITE
 from app.core.security import AuthUser
+from app.db.idempotency import (
+    cache_idempotent_response,
+    get_cached_idempotent_response,
+    get_idempotent_response_bytes,
+    store_idempotent_response,
+)
+from app.db.security import apply_request_rls_context
+from app.db.utils import (
+    ensure_user_exists,
+    get_scene_owned_by_user,
+    get_session_owned_by_user,
+)
+from app.db.weekly_stats import bump_user_weekly_stats
 from app.schemas.sessions import (
     AssistantMessage,
+    ExportFormat,
     MessageCreateRequest,
     MessageCreateResponse,
-    OfnrFeedback,
     RewriteCreateRequest,
     RewriteCreateResponse,
+    SearchHighlight,
+    SearchMatchSource,
     SessionCreateRequest,
     SessionCreateResponse,
     SessionHistoryDetailResponse,
@@ -28,6 +57,9 @@ from app.schemas.sessions import (
     SessionHistoryReflection,
     SessionHistoryScene,
     SessionHistoryTurn,
+    SessionSearchItem,
+    SessionSearchMatch,
+    SessionSearchResponse,
     SessionState,
     SummaryCreateResponse,
 )
@@ -36,56 +68,63 @@ from app.services.nvc_service import (
     generate_assistant_reply,
     generate_rewrite,
 )
+from app.services.session_export import iter_session_export, parse_ofnr_detail
+from app.services.session_search import build_search_snippet, search_index_query
 
 router = APIRouter(prefix="/api/v1/sessions", tags=["sessions"])
 MESSAGE_ENDPOINT_KEY = "POST:/api/v1/sessions/{session_id}/messages"
+SEARCH_MATCHES_PER_SESSION = 3
+# Keywords need something the search index holds (see search_index_query).
+KEYWORD_NOT_INDEXED_DETAIL = (
+    "{param} must contain a CJK character or 3 consecutive letters or digits"
+)
+# Rows fetched per server-side cursor round trip during export.
+EXPORT_FETCH_ROWS = 500
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
 
 
-def _parse_ofnr_detail(value: dict | str | None) -> OfnrFeedback | None:
-    if value is None:
-        return None
-    payload = value
-    if isinstance(payload, str):
-        payload = json.loads(payload)
-    return OfnrFeedback.model_validate(payload)
+def _encode_session_cursor(created_at: datetime, session_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{session_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
 
 
-async def _get_idempotent_message_response(
-    db: AsyncSession,
-    user_id: UUID,
-    session_id: UUID,
-    client_message_id: UUID,
-) -> MessageCreateResponse | None:
-    existing_result = await db.execute(
-        text(
-            """
-            SELECT response_body
-            FROM idempotency_keys
-            WHERE user_id = :user_id
-              AND session_id = :session_id
-              AND endpoint = :endpoint
-              AND client_message_id = :client_message_id
-            LIMIT 1
-            """
-        ),
-        {
-            "user_id": str(user_id),
-            "session_id": str(session_id),
-            "endpoint": MESSAGE_ENDPOINT_KEY,
-            "client_message_id": str(client_message_id),
-        },
-    )
-    row = existing_result.mappings().first()
-    if not row:
-        return None
-    return MessageCreateResponse.model_validate(row["response_body"])
+def _decode_session_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at_raw, session_id_raw = raw.split("|", 1)
+        created_at = datetime.fromisoformat(created_at_raw)
+        session_id = UUID(session_id_raw)
+    except (ValueError, UnicodeError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="invalid cursor",
+        ) from exc
+    if created_at.tzinfo is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="invalid cursor",
+        )
+    return created_at, session_id
+
+
+def _json_bytes_response(body: bytes, headers: dict[str, str] | None = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _history_cache_headers(etag: str) -> dict[str, str]:
+    # Let browsers keep a private copy but revalidate it on every view.
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
 
 
 @router.post("", response_model=SessionCreateResponse, status_code=status.HTTP_201_CREATED)
 async def create_session(
     payload: SessionCreateRequest,
     user: AuthUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_write_db_session),
 ) -> SessionCreateResponse:
     await apply_request_rls_context(db, user)
     await ensure_user_exists(db, user)
@@ -111,6 +150,7 @@ async def create_session(
         },
     )
     row = result.mappings().one()
+    await bump_user_weekly_stats(db, user.user_id, row["created_at"], practice_count=1)
     await db.commit()
 
     return SessionCreateResponse(
@@ -125,25 +165,33 @@ async def create_session(
 async def list_sessions(
     limit: int = Query(default=10, ge=1, le=50),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None, min_length=1, max_length=200),
+    include_total: bool = Query(default=True),
     session_state: SessionState | None = Query(default=None, alias="state"),
     keyword: str | None = Query(default=None, min_length=1, max_length=80),
     created_from: date | None = Query(default=None),
     created_to: date | None = Query(default=None),
     user: AuthUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db_session),
 ) -> SessionHistoryListResponse:
-    await apply_request_rls_context(db, user)
-    await ensure_user_exists(db, user)
-
     if created_from and created_to and created_from > created_to:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="created_from must be less than or equal to created_to",
         )
-
+    cursor_position = _decode_session_cursor(cursor) if cursor else None
     normalized_keyword = keyword.strip() if keyword else ""
+    keyword_query = search_index_query(normalized_keyword) if normalized_keyword else None
+    if normalized_keyword and keyword_query is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=KEYWORD_NOT_INDEXED_DETAIL.format(param="keyword"),
+        )
+
+    await apply_request_rls_context(db, user)
+
     where_conditions = ["s.user_id = :user_id"]
-    base_params: dict[str, str | int | date] = {"user_id": str(user.user_id)}
+    base_params: dict[str, str | int | date | datetime] = {"user_id": str(user.user_id)}
 
     if session_state:
         where_conditions.append("s.state = :session_state")
@@ -158,60 +206,62 @@ async def list_sessions(
         base_params["created_to_exclusive"] = created_to + timedelta(days=1)
 
     if normalized_keyword:
+        # The GIN match only narrows candidates; ILIKE decides, so results are
+        # exactly those of a plain substring filter.
+        where_conditions.append(
+            """
+            (
+              sc.search_vector @@ nvc_search_tsquery(:keyword_query)
+              OR s.search_vector @@ nvc_search_tsquery(:keyword_query)
+            )
+            """
+        )
+        base_params["keyword_query"] = keyword_query
         where_conditions.append(
             """
             (
               sc.title ILIKE :keyword
               OR sc.goal ILIKE :keyword
               OR sc.context ILIKE :keyword
-              OR COALESCE(um.content, '') ILIKE :keyword
-              OR COALESCE(am.content, '') ILIKE :keyword
+              OR COALESCE(s.last_user_message, '') ILIKE :keyword
+              OR COALESCE(s.last_assistant_message, '') ILIKE :keyword
             )
             """
         )
         base_params["keyword"] = f"%{normalized_keyword}%"
 
-    from_clause = """
-        FROM sessions s
-        JOIN scenes sc ON sc.id = s.scene_id
-        LEFT JOIN LATERAL (
-          SELECT m.id, m.turn_no, m.content
-          FROM messages m
-          WHERE m.session_id = s.id
-            AND m.role = 'USER'
-          ORDER BY m.turn_no DESC, m.created_at DESC
-          LIMIT 1
-        ) um ON TRUE
-        LEFT JOIN LATERAL (
-          SELECT m.content
-          FROM messages m
-          WHERE m.session_id = s.id
-            AND m.role = 'ASSISTANT'
-            AND m.turn_no = um.turn_no
-          ORDER BY m.created_at DESC
-          LIMIT 1
-        ) am ON TRUE
-        LEFT JOIN feedback_items f ON f.user_message_id = um.id
-        LEFT JOIN summaries sm ON sm.session_id = s.id
-        LEFT JOIN reflections r ON r.session_id = s.id
-    """
     where_clause = " AND ".join(where_conditions)
 
-    total_result = await db.execute(
-        text(
-            f"""
-            SELECT COUNT(*) AS total
-            {from_clause}
-            WHERE {where_clause}
-            """
-        ),
-        base_params,
-    )
-    total = int(total_result.mappings().one()["total"] or 0)
+    total = None
+    if include_total:
+        # Scenes are only joined when the keyword filter needs them, so the
+        # plain count stays an index-only scan over sessions.
+        count_join = "JOIN scenes sc ON sc.id = s.scene_id" if normalized_keyword else ""
+        total_result = await db.execute(
+            text(
+                f"""
+                SELECT COUNT(*) AS total
+                FROM sessions s
+                {count_join}
+                WHERE {where_clause}
+                """
+            ),
+            base_params,
+        )
+        total = int(total_result.mappings().one()["total"] or 0)
 
     list_params = dict(base_params)
-    list_params["limit"] = limit
-    list_params["offset"] = offset
+    list_params["limit"] = limit + 1
+    page_conditions = list(where_conditions)
+    if cursor_position:
+        page_conditions.append("(s.created_at, s.id) < (:cursor_created_at, :cursor_id)")
+        list_params["cursor_created_at"] = cursor_position[0]
+        list_params["cursor_id"] = str(cursor_position[1])
+        offset_clause = ""
+    else:
+        list_params["offset"] = offset
+        offset_clause = "OFFSET :offset"
+
     list_result = await db.execute(
         text(
             f"""
@@ -224,21 +274,24 @@ async def list_sessions(
               s.target_turns,
               s.created_at,
               s.ended_at,
-              um.content AS last_user_message,
-              am.content AS last_assistant_message,
-              f.overall_score AS last_overall_score,
-              f.risk_level AS last_risk_level,
-              (sm.id IS NOT NULL) AS has_summary,
-              (r.id IS NOT NULL) AS has_reflection
-            {from_clause}
-            WHERE {where_clause}
-            ORDER BY s.created_at DESC
-            LIMIT :limit OFFSET :offset
+              s.last_user_message,
+              s.last_assistant_message,
+              s.last_overall_score,
+              s.last_risk_level,
+              s.has_summary,
+              s.has_reflection
+            FROM sessions s
+            JOIN scenes sc ON sc.id = s.scene_id
+            WHERE {" AND ".join(page_conditions)}
+            ORDER BY s.created_at DESC, s.id DESC
+            LIMIT :limit {offset_clause}
             """
         ),
         list_params,
     )
     rows = list_result.mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     items = [
         SessionHistoryListItem(
             session_id=row["session_id"],
@@ -258,17 +311,305 @@ async def list_sessions(
         )
         for row in rows
     ]
-    return SessionHistoryListResponse(items=items, limit=limit, offset=offset, total=total)
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = _encode_session_cursor(rows[-1]["created_at"], rows[-1]["session_id"])
+    return SessionHistoryListResponse(
+        items=items,
+        limit=limit,
+        offset=0 if cursor_position else offset,
+        total=total,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get(":search", response_model=SessionSearchResponse)
+async def search_sessions(
+    q: str = Query(..., min_length=1, max_length=80),
+    limit: int = Query(default=10, ge=1, le=20),
+    user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db_session),
+) -> SessionSearchResponse:
+    keyword = q.strip()
+    if not keyword:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="q must not be blank",
+        )
+    keyword_query = search_index_query(keyword)
+    if keyword_query is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=KEYWORD_NOT_INDEXED_DETAIL.format(param="q"),
+        )
+
+    await apply_request_rls_context(db, user)
+
+    # The GIN match narrows candidates through the index; strpos decides, so
+    # results are exactly those of a substring search.
+    result = await db.execute(
+        text(
+            """
+            WITH q AS (
+              SELECT nvc_search_tsquery(:keyword_query) AS query
+            ),
+            hits AS (
+              SELECT
+                m.session_id,
+                s.created_at,
+                CASE WHEN m.role = 'USER' THEN 'USER_MESSAGE' ELSE 'ASSISTANT_MESSAGE' END AS source,
+                m.turn_no,
+                m.content,
+                ts_rank(m.search_vector, q.query) AS rank
+              FROM q
+              JOIN messages m ON m.search_vector @@ q.query
+              JOIN sessions s ON s.id = m.session_id
+              WHERE s.user_id = :user_id
+                AND m.role IN ('USER', 'ASSISTANT')
+                AND strpos(lower(m.content), lower(:keyword)) > 0
+              UNION ALL
+              SELECT
+                s.id,
+                s.created_at,
+                'SCENE',
+                NULL,
+                CASE
+                  WHEN strpos(lower(sc.title), lower(:keyword)) > 0 THEN sc.title
+                  WHEN strpos(lower(sc.goal), lower(:keyword)) > 0 THEN sc.goal
+                  ELSE sc.context
+                END,
+                ts_rank(sc.search_vector, q.query)
+              FROM q
+              JOIN scenes sc ON sc.search_vector @@ q.query
+              JOIN sessions s ON s.scene_id = sc.id
+              WHERE sc.user_id = :user_id
+                AND s.user_id = :user_id
+                AND strpos(
+                  lower(sc.title || ' ' || sc.goal || ' ' || sc.context),
+                  lower(:keyword)
+                ) > 0
+            ),
+            ranked AS (
+              SELECT session_id, created_at, SUM(rank) AS score
+              FROM hits
+              GROUP BY session_id, created_at
+              ORDER BY score DESC, created_at DESC
+              LIMIT :limit
+            )
+            SELECT
+              r.session_id,
+              r.score,
+              s.scene_id,
+              sc.title AS scene_title,
+              s.state,
+              s.created_at,
+              h.source,
+              h.turn_no,
+              h.content
+            FROM ranked r
+            JOIN sessions s ON s.id = r.session_id
+            JOIN scenes sc ON sc.id = s.scene_id
+            JOIN LATERAL (
+              SELECT hits.source, hits.turn_no, hits.content, hits.rank
+              FROM hits
+              WHERE hits.session_id = r.session_id
+              ORDER BY hits.rank DESC, hits.turn_no NULLS FIRST
+              LIMIT :matches_per_session
+            ) h ON TRUE
+            ORDER BY r.score DESC, r.created_at DESC, h.rank DESC, h.turn_no NULLS FIRST
+            """
+        ),
+        {
+            "keyword": keyword,
+            "keyword_query": keyword_query,
+            "user_id": str(user.user_id),
+            "limit": limit,
+            "matches_per_session": SEARCH_MATCHES_PER_SESSION,
+        },
+    )
+    items: dict[UUID, SessionSearchItem] = {}
+    for row in result.mappings().all():
+        item = items.get(row["session_id"])
+        if item is None:
+            item = SessionSearchItem(
+                session_id=row["session_id"],
+                scene_id=row["scene_id"],
+                scene_title=row["scene_title"],
+                state=SessionState(row["state"]),
+                created_at=row["created_at"],
+                score=round(float(row["score"] or 0.0), 6),
+                matches=[],
+            )
+            items[row["session_id"]] = item
+        snippet = build_search_snippet(row["content"], keyword)
+        item.matches.append(
+            SessionSearchMatch(
+                source=SearchMatchSource(row["source"]),
+                turn=row["turn_no"],
+                snippet=snippet.text,
+                highlights=[
+                    SearchHighlight(start=start, length=length)
+                    for start, length in snippet.highlights
+                ],
+            )
+        )
+
+    return SessionSearchResponse(query=keyword, items=list(items.values()), limit=limit)
+
+
+async def _stream_session_export(user: AuthUser, export_format: ExportFormat) -> AsyncIterator[bytes]:
+    # The body is produced after the handler returns, so the stream owns its
+    # session (and the transaction the server-side cursor lives in).
+    async with open_read_db_session(user.user_id) as db:
+        await apply_request_rls_context(db, user)
+        result = await db.stream(
+            text(
+                """
+                SELECT
+                  s.id AS session_id,
+                  s.scene_id,
+                  s.state,
+                  s.current_turn,
+                  s.target_turns,
+                  s.created_at,
+                  s.ended_at,
+                  sc.title AS scene_title,
+                  sc.goal AS scene_goal,
+                  sc.context AS scene_context,
+                  sc.template_id AS scene_template_id,
+                  sm.id AS summary_id,
+                  sm.opening_line,
+                  sm.request_line,
+                  sm.fallback_line,
+                  sm.risk_triggers,
+                  sm.created_at AS summary_created_at,
+                  r.id AS reflection_id,
+                  r.used_in_real_world,
+                  r.outcome_score,
+                  r.blocker_code,
+                  r.blocker_note,
+                  r.created_at AS reflection_created_at,
+                  um.turn_no,
+                  um.id AS user_message_id,
+                  um.content AS user_content,
+                  am.id AS assistant_message_id,
+                  am.content AS assistant_content,
+                  f.overall_score,
+                  f.risk_level,
+                  f.ofnr_detail,
+                  f.next_best_sentence,
+                  rw.rewrites
+                FROM sessions s
+                JOIN scenes sc ON sc.id = s.scene_id
+                LEFT JOIN summaries sm ON sm.session_id = s.id
+                LEFT JOIN reflections r ON r.session_id = s.id
+                LEFT JOIN messages um
+                  ON um.session_id = s.id
+                 AND um.role = 'USER'
+                LEFT JOIN LATERAL (
+                  SELECT m.id, m.content
+                  FROM messages m
+                  WHERE m.session_id = um.session_id
+                    AND m.role = 'ASSISTANT'
+                    AND m.turn_no = um.turn_no
+                  ORDER BY m.created_at DESC
+                  LIMIT 1
+                ) am ON TRUE
+                LEFT JOIN feedback_items f ON f.user_message_id = um.id
+                LEFT JOIN LATERAL (
+                  SELECT json_agg(
+                    json_build_object(
+                      'rewrite_id', x.id,
+                      'rewrite_style', x.rewrite_style,
+                      'rewritten_content', x.rewritten_content,
+                      'created_at', x.created_at
+                    )
+                    ORDER BY x.created_at
+                  ) AS rewrites
+                  FROM rewrites x
+                  WHERE x.source_message_id = um.id
+                ) rw ON TRUE
+                WHERE s.user_id = :user_id
+                ORDER BY s.created_at DESC, s.id DESC, um.turn_no ASC, um.created_at ASC
+                """
+            ),
+            {"user_id": str(user.user_id)},
+            execution_options={"yield_per": EXPORT_FETCH_ROWS},
+        )
+        async for chunk in iter_session_export(result.mappings(), export_format):
+            yield chunk
+
+
+@router.get(
+    ":export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {
+                "application/x-ndjson": {},
+                "text/csv": {},
+            }
+        }
+    },
+)
+async def export_sessions(
+    export_format: ExportFormat = Query(default=ExportFormat.NDJSON, alias="format"),
+    user: AuthUser = Depends(get_current_user),
+) -> StreamingResponse:
+    filename = f"nvc-practice-history-{date.today():%Y%m%d}.{export_format.value}"
+    return StreamingResponse(
+        _stream_session_export(user, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
 
 
 @router.get("/{session_id}/history", response_model=SessionHistoryDetailResponse)
 async def get_session_history(
     session_id: UUID,
     user: AuthUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session),
-) -> SessionHistoryDetailResponse:
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db_session),
+) -> Response:
     await apply_request_rls_context(db, user)
-    await ensure_user_exists(db, user)
+
+    # Cheap primary-key probe first: it is enough to answer conditional GETs and
+    # completed-session cache hits without the turn query or Pydantic parsing.
+    version_result = await db.execute(
+        text(
+            """
+            SELECT state, current_turn, has_summary, has_reflection
+            FROM sessions
+            WHERE id = :session_id
+              AND user_id = :user_id
+            LIMIT 1
+            """
+        ),
+        {"session_id": str(session_id), "user_id": str(user.user_id)},
+    )
+    version_row = version_result.mappings().first()
+    if not version_row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="session not found")
+
+    etag = build_history_etag(
+        session_id,
+        version_row["current_turn"],
+        version_row["state"],
+        bool(version_row["has_summary"]),
+        bool(version_row["has_reflection"]),
+    )
+    if etag_matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=_history_cache_headers(etag),
+        )
+    if version_row["state"] != SessionState.ACTIVE.value:
+        cached_body = get_cached_history(user.user_id, session_id, etag)
+        if cached_body is not None:
+            return _json_bytes_response(cached_body, headers=_history_cache_headers(etag))
 
     session_result = await db.execute(
         text(
@@ -281,6 +622,8 @@ async def get_session_history(
               s.target_turns,
               s.created_at,
               s.ended_at,
+              s.has_summary,
+              s.has_reflection,
               sc.title AS scene_title,
               sc.goal AS scene_goal,
               sc.context AS scene_context,
@@ -349,7 +692,7 @@ async def get_session_history(
         feedback = None
         if row["overall_score"] is not None or row["next_best_sentence"] is not None:
             try:
-                parsed_ofnr = _parse_ofnr_detail(row["ofnr_detail"])
+                parsed_ofnr = parse_ofnr_detail(row["ofnr_detail"])
             except (ValueError, TypeError, json.JSONDecodeError):
                 parsed_ofnr = None
             feedback = SessionHistoryFeedback(
@@ -392,7 +735,7 @@ async def get_session_history(
             created_at=session_row["reflection_created_at"],
         )
 
-    return SessionHistoryDetailResponse(
+    response = SessionHistoryDetailResponse(
         session_id=session_row["session_id"],
         scene=SessionHistoryScene(
             scene_id=session_row["scene_id"],
@@ -410,20 +753,52 @@ async def get_session_history(
         summary=summary,
         reflection=reflection,
     )
+    body = response.model_dump_json().encode("utf-8")
+    body_etag = build_history_etag(
+        session_id,
+        session_row["current_turn"],
+        session_row["state"],
+        bool(session_row["has_summary"]),
+        bool(session_row["has_reflection"]),
+    )
+    if session_row["state"] != SessionState.ACTIVE.value:
+        cache_history(user.user_id, session_id, body_etag, body)
+    return _json_bytes_response(body, headers=_history_cache_headers(body_etag))
 
 
-@router.post("/{session_id}/messages", response_model=MessageCreateResponse)
+@router.post(
+    "/{session_id}/messages",
+    response_model=MessageCreateResponse,
+    dependencies=[Depends(enforce_rate_limit(ROUTE_SESSION_MESSAGE))],
+)
 async def create_session_message(
     session_id: UUID,
     payload: MessageCreateRequest,
     user: AuthUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session),
-) -> MessageCreateResponse:
+    db: AsyncSession = Depends(get_write_db_session),
+) -> Response:
+    idempotency_key = (
+        user.user_id,
+        session_id,
+        MESSAGE_ENDPOINT_KEY,
+        payload.client_message_id,
+    )
+    # Entries are only cached after this user's write committed, so a hit needs
+    # no ownership re-check and no DB round trip.
+    cached_response = get_cached_idempotent_response(idempotency_key)
+    if cached_response is not None:
+        return _json_bytes_response(cached_response)
+
     await apply_request_rls_context(db, user)
     await ensure_user_exists(db, user)
     session = await get_session_owned_by_user(db, session_id, user.user_id)
     if not session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="session not found")
+
+    existing_response = await get_idempotent_response_bytes(db, idempotency_key)
+    if existing_response is not None:
+        return _json_bytes_response(existing_response)
+
     if session["state"] != "ACTIVE":
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -434,15 +809,6 @@ async def create_session_message(
     if not scene:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="scene not found")
 
-    existing_response = await _get_idempotent_message_response(
-        db=db,
-        user_id=user.user_id,
-        session_id=session_id,
-        client_message_id=payload.client_message_id,
-    )
-    if existing_response:
-        return existing_response
-
     turn = int(session["current_turn"]) + 1
 
     user_message_result = await db.execute(
@@ -518,7 +884,11 @@ async def create_session_message(
             UPDATE sessions
             SET current_turn = :current_turn,
                 state = :state,
-                ended_at = CASE WHEN :is_completed THEN NOW() ELSE ended_at END
+                ended_at = CASE WHEN :is_completed THEN NOW() ELSE ended_at END,
+                last_user_message = :last_user_message,
+                last_assistant_message = :last_assistant_message,
+                last_overall_score = :last_overall_score,
+                last_risk_level = :last_risk_level
             WHERE id = :session_id
             """
         ),
@@ -526,6 +896,10 @@ async def create_session_message(
             "current_turn": turn,
             "state": new_state,
             "is_completed": is_completed,
+            "last_user_message": payload.content,
+            "last_assistant_message": assistant_content,
+            "last_overall_score": analysis.feedback.overall_score,
+            "last_risk_level": analysis.feedback.risk_level.value,
             "session_id": str(session_id),
         },
     )
@@ -538,59 +912,37 @@ async def create_session_message(
         feedback=analysis.feedback,
         turn=turn,
     )
+    response_bytes = response.model_dump_json().encode("utf-8")
     try:
-        await db.execute(
-            text(
-                """
-                INSERT INTO idempotency_keys (
-                    user_id,
-                    session_id,
-                    endpoint,
-                    client_message_id,
-                    response_body
-                )
-                VALUES (
-                    :user_id,
-                    :session_id,
-                    :endpoint,
-                    :client_message_id,
-                    CAST(:response_body AS jsonb)
-                )
-                """
-            ),
-            {
-                "user_id": str(user.user_id),
-                "session_id": str(session_id),
-                "endpoint": MESSAGE_ENDPOINT_KEY,
-                "client_message_id": str(payload.client_message_id),
-                "response_body": json.dumps(response.model_dump(mode="json")),
-            },
-        )
-        await db.commit()
+        stored = await store_idempotent_response(db, idempotency_key, response_bytes)
+        if stored:
+            await db.commit()
     except IntegrityError:
+        stored = False
+    if not stored:
         await db.rollback()
-        existing_response = await _get_idempotent_message_response(
-            db=db,
-            user_id=user.user_id,
-            session_id=session_id,
-            client_message_id=payload.client_message_id,
-        )
-        if existing_response:
-            return existing_response
+        existing_response = await get_idempotent_response_bytes(db, idempotency_key)
+        if existing_response is not None:
+            return _json_bytes_response(existing_response)
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="duplicate client message id",
         )
 
-    return response
+    cache_idempotent_response(idempotency_key, response_bytes)
+    return _json_bytes_response(response_bytes)
 
 
-@router.post("/{session_id}/rewrite", response_model=RewriteCreateResponse)
+@router.post(
+    "/{session_id}/rewrite",
+    response_model=RewriteCreateResponse,
+    dependencies=[Depends(enforce_rate_limit(ROUTE_SESSION_REWRITE))],
+)
 async def rewrite_session_message(
     session_id: UUID,
     payload: RewriteCreateRequest,
     user: AuthUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_write_db_session),
 ) -> RewriteCreateResponse:
     await apply_request_rls_context(db, user)
     session = await get_session_owned_by_user(db, session_id, user.user_id)
@@ -643,7 +995,7 @@ async def rewrite_session_message(
 async def create_session_summary(
     session_id: UUID,
     user: AuthUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session),
+    db: AsyncSession = Depends(get_write_db_session),
 ) -> SummaryCreateResponse:
     await apply_request_rls_context(db, user)
     session = await get_session_owned_by_user(db, session_id, user.user_id)
@@ -728,7 +1080,13 @@ async def create_session_summary(
         },
     )
     summary_row = summary_result.mappings().one()
+    await db.execute(
+        text("UPDATE sessions SET has_summary = TRUE WHERE id = :session_id"),
+        {"session_id": str(session_id)},
+    )
+    await bump_user_weekly_stats(db, user.user_id, summary_row["created_at"], summary_count=1)
     await db.commit()
+    invalidate_session_history(user.user_id, session_id)
 
     return SummaryCreateResponse(
         summary_id=summary_row["id"],
@@ -1,3 +1,4 @@
+import re
 from pathlib import Path
 
 from pydantic import Field, field_validator, model_validator
@@ -6,21 +7,72 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 BACKEND_DIR = Path(__file__).resolve().parents[2]
 ROOT_DIR = Path(__file__).resolve().parents[3]
 
+# Token-bucket limits such as "20/min": capacity 20, refilled over a minute.
+RATE_LIMIT_PATTERN = re.compile(r"(?P<count>[1-9][0-9]*)/(?P<unit>s|min|h)")
+
+
+def _to_asyncpg_url(database_url: str) -> str:
+    db_url = database_url.strip()
+    if db_url.startswith("postgresql+asyncpg://"):
+        return db_url
+    if db_url.startswith("postgresql://"):
+        return db_url.replace(
+            "postgresql://", "postgresql+asyncpg://", 1
+        )
+    return db_url
+
 
 class Settings(BaseSettings):
     app_env: str = Field(default="development", alias="APP_ENV")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     slow_request_ms: int = Field(default=1200, alias="SLOW_REQUEST_MS")
+    slow_query_ms: int = Field(default=200, alias="SLOW_QUERY_MS")
+    sql_statement_budget: int = Field(default=30, alias="SQL_STATEMENT_BUDGET")
     observability_recent_error_limit: int = Field(
         default=20, alias="OBSERVABILITY_RECENT_ERROR_LIMIT"
     )
+    observability_slow_exemplar_limit: int = Field(
+        default=20, alias="OBSERVABILITY_SLOW_EXEMPLAR_LIMIT"
+    )
+    observability_unmatched_path_capacity: int = Field(
+        default=64, alias="OBSERVABILITY_UNMATCHED_PATH_CAPACITY"
+    )
+    observability_statement_capacity: int = Field(
+        default=100, alias="OBSERVABILITY_STATEMENT_CAPACITY"
+    )
+    observability_shard_dir: str | None = Field(default=None, alias="OBSERVABILITY_SHARD_DIR")
+    observability_shard_flush_seconds: int = Field(
+        default=5, alias="OBSERVABILITY_SHARD_FLUSH_SECONDS"
+    )
+    ops_token: str | None = Field(default=None, alias="OPS_TOKEN")
+    profiler_enabled: bool = Field(default=False, alias="PROFILER_ENABLED")
+    profiler_max_seconds: int = Field(default=30, alias="PROFILER_MAX_SECONDS")
+    profiler_min_interval_seconds: int = Field(
+        default=60, alias="PROFILER_MIN_INTERVAL_SECONDS"
+    )
+    event_loop_monitor_enabled: bool = Field(default=True, alias="EVENT_LOOP_MONITOR_ENABLED")
+    event_loop_probe_interval_ms: int = Field(default=100, alias="EVENT_LOOP_PROBE_INTERVAL_MS")
+    event_loop_stall_ms: int = Field(default=200, alias="EVENT_LOOP_STALL_MS")
+    idempotency_ttl_hours: int = Field(default=72, alias="IDEMPOTENCY_TTL_HOURS")
+    idempotency_cache_size: int = Field(default=2048, alias="IDEMPOTENCY_CACHE_SIZE")
+    history_cache_size: int = Field(default=256, alias="HISTORY_CACHE_SIZE")
+    event_buffer_max_events: int = Field(default=10000, alias="EVENT_BUFFER_MAX_EVENTS")
+    event_flush_batch_size: int = Field(default=500, alias="EVENT_FLUSH_BATCH_SIZE")
+    event_flush_interval_ms: int = Field(default=1000, alias="EVENT_FLUSH_INTERVAL_MS")
     auth_mode: str = Field(default="mock", alias="AUTH_MODE")
     mock_auth_enabled: bool = Field(default=True, alias="MOCK_AUTH_ENABLED")
     allow_mock_auth_in_production: bool = Field(
         default=False, alias="ALLOW_MOCK_AUTH_IN_PRODUCTION"
     )
+    auth_claims_cache_size: int = Field(default=10000, alias="AUTH_CLAIMS_CACHE_SIZE")
+    auth_claims_cache_skew_seconds: int = Field(
+        default=30, alias="AUTH_CLAIMS_CACHE_SKEW_SECONDS"
+    )
 
     database_url: str = Field(alias="DATABASE_URL")
+    database_replica_url: str | None = Field(default=None, alias="DATABASE_REPLICA_URL")
+    replica_read_pin_seconds: int = Field(default=5, alias="REPLICA_READ_PIN_SECONDS")
+    replica_retry_seconds: int = Field(default=30, alias="REPLICA_RETRY_SECONDS")
     supabase_url: str | None = Field(default=None, alias="SUPABASE_URL")
     supabase_anon_key: str | None = Field(default=None, alias="SUPABASE_ANON_KEY")
     supabase_service_role_key: str | None = Field(
@@ -28,6 +80,35 @@ class Settings(BaseSettings):
     )
     jwt_audience: str = Field(default="authenticated", alias="JWT_AUDIENCE")
     jwt_issuer: str | None = Field(default=None, alias="JWT_ISSUER")
+    jwks_refresh_interval_seconds: int = Field(
+        default=600, alias="JWKS_REFRESH_INTERVAL_SECONDS"
+    )
+    jwks_min_refresh_interval_seconds: int = Field(
+        default=30, alias="JWKS_MIN_REFRESH_INTERVAL_SECONDS"
+    )
+    supabase_user_cache_ttl_seconds: int = Field(
+        default=60, alias="SUPABASE_USER_CACHE_TTL_SECONDS"
+    )
+    supabase_user_negative_ttl_seconds: int = Field(
+        default=30, alias="SUPABASE_USER_NEGATIVE_TTL_SECONDS"
+    )
+    supabase_user_breaker_failures: int = Field(
+        default=5, alias="SUPABASE_USER_BREAKER_FAILURES"
+    )
+    supabase_user_breaker_open_seconds: int = Field(
+        default=30, alias="SUPABASE_USER_BREAKER_OPEN_SECONDS"
+    )
+
+    rate_limit_enabled: bool = Field(default=True, alias="RATE_LIMIT_ENABLED")
+    rate_limit_backend: str = Field(default="memory", alias="RATE_LIMIT_BACKEND")
+    rate_limit_message_user: str = Field(default="20/min", alias="RATE_LIMIT_MESSAGE_USER")
+    rate_limit_message_global: str = Field(
+        default="600/min", alias="RATE_LIMIT_MESSAGE_GLOBAL"
+    )
+    rate_limit_rewrite_user: str = Field(default="10/min", alias="RATE_LIMIT_REWRITE_USER")
+    rate_limit_rewrite_global: str = Field(
+        default="300/min", alias="RATE_LIMIT_REWRITE_GLOBAL"
+    )
 
     llm_api_key: str | None = Field(default=None, alias="LLM_API_KEY")
     llm_model: str = Field(
@@ -52,27 +133,60 @@ class Settings(BaseSettings):
 
     @property
     def sqlalchemy_database_url(self) -> str:
-        db_url = self.database_url.strip()
-        if db_url.startswith("postgresql+asyncpg://"):
-            return db_url
-        if db_url.startswith("postgresql://"):
-            return db_url.replace(
-                "postgresql://", "postgresql+asyncpg://", 1
-            )
-        return db_url
+        return _to_asyncpg_url(self.database_url)
+
+    @property
+    def sqlalchemy_replica_database_url(self) -> str | None:
+        if not self.database_replica_url:
+            return None
+        return _to_asyncpg_url(self.database_replica_url)
 
     @field_validator(
         "app_env",
         "log_level",
         "slow_request_ms",
+        "slow_query_ms",
+        "sql_statement_budget",
         "observability_recent_error_limit",
+        "observability_slow_exemplar_limit",
+        "observability_unmatched_path_capacity",
+        "observability_statement_capacity",
+        "observability_shard_dir",
+        "observability_shard_flush_seconds",
+        "ops_token",
+        "profiler_max_seconds",
+        "profiler_min_interval_seconds",
+        "event_loop_probe_interval_ms",
+        "event_loop_stall_ms",
+        "idempotency_ttl_hours",
+        "idempotency_cache_size",
+        "history_cache_size",
+        "event_buffer_max_events",
+        "event_flush_batch_size",
+        "event_flush_interval_ms",
         "auth_mode",
+        "auth_claims_cache_size",
+        "auth_claims_cache_skew_seconds",
         "database_url",
+        "database_replica_url",
+        "replica_read_pin_seconds",
+        "replica_retry_seconds",
         "supabase_url",
         "supabase_anon_key",
         "supabase_service_role_key",
         "jwt_audience",
         "jwt_issuer",
+        "jwks_refresh_interval_seconds",
+        "jwks_min_refresh_interval_seconds",
+        "supabase_user_cache_ttl_seconds",
+        "supabase_user_negative_ttl_seconds",
+        "supabase_user_breaker_failures",
+        "supabase_user_breaker_open_seconds",
+        "rate_limit_backend",
+        "rate_limit_message_user",
+        "rate_limit_message_global",
+        "rate_limit_rewrite_user",
+        "rate_limit_rewrite_global",
         "llm_api_key",
         "llm_model",
         "openai_base_url",
@@ -106,6 +220,25 @@ class Settings(BaseSettings):
             return 1200
         return max(1, normalized)
 
+    @field_validator("slow_query_ms", mode="before")
+    @classmethod
+    def normalize_slow_query_ms(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 200
+        return max(1, normalized)
+
+    @field_validator("sql_statement_budget", mode="before")
+    @classmethod
+    def normalize_sql_statement_budget(cls, value):
+        # 0 turns the per-request budget warning off.
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 30
+        return max(0, normalized)
+
     @field_validator("observability_recent_error_limit", mode="before")
     @classmethod
     def normalize_recent_error_limit(cls, value):
@@ -115,6 +248,285 @@ class Settings(BaseSettings):
             return 20
         return max(1, normalized)
 
+    @field_validator("observability_slow_exemplar_limit", mode="before")
+    @classmethod
+    def normalize_observability_slow_exemplar_limit(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 20
+        return max(1, normalized)
+
+    @field_validator("observability_statement_capacity", mode="before")
+    @classmethod
+    def normalize_observability_statement_capacity(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 100
+        return max(1, normalized)
+
+    @field_validator("observability_unmatched_path_capacity", mode="before")
+    @classmethod
+    def normalize_observability_unmatched_path_capacity(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 64
+        return max(1, normalized)
+
+    @field_validator("observability_shard_dir", mode="before")
+    @classmethod
+    def normalize_observability_shard_dir(cls, value):
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+    @field_validator("ops_token", mode="before")
+    @classmethod
+    def normalize_ops_token(cls, value):
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+    @field_validator("profiler_max_seconds", mode="before")
+    @classmethod
+    def normalize_profiler_max_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 30
+        return max(1, normalized)
+
+    @field_validator("profiler_min_interval_seconds", mode="before")
+    @classmethod
+    def normalize_profiler_min_interval_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 60
+        return max(0, normalized)
+
+    @field_validator("event_loop_probe_interval_ms", mode="before")
+    @classmethod
+    def normalize_event_loop_probe_interval_ms(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 100
+        return max(10, normalized)
+
+    @field_validator("event_loop_stall_ms", mode="before")
+    @classmethod
+    def normalize_event_loop_stall_ms(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 200
+        return max(10, normalized)
+
+    @field_validator("observability_shard_flush_seconds", mode="before")
+    @classmethod
+    def normalize_observability_shard_flush_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 5
+        return max(1, normalized)
+
+    @field_validator("idempotency_ttl_hours", mode="before")
+    @classmethod
+    def normalize_idempotency_ttl_hours(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 72
+        return max(1, normalized)
+
+    @field_validator("idempotency_cache_size", mode="before")
+    @classmethod
+    def normalize_idempotency_cache_size(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 2048
+        return max(0, normalized)
+
+    @field_validator("history_cache_size", mode="before")
+    @classmethod
+    def normalize_history_cache_size(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 256
+        return max(0, normalized)
+
+    @field_validator("event_buffer_max_events", mode="before")
+    @classmethod
+    def normalize_event_buffer_max_events(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 10000
+        return max(1, normalized)
+
+    @field_validator("event_flush_batch_size", mode="before")
+    @classmethod
+    def normalize_event_flush_batch_size(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 500
+        return max(1, normalized)
+
+    @field_validator("event_flush_interval_ms", mode="before")
+    @classmethod
+    def normalize_event_flush_interval_ms(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 1000
+        return max(10, normalized)
+
+    @field_validator("auth_claims_cache_size", mode="before")
+    @classmethod
+    def normalize_auth_claims_cache_size(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 10000
+        return max(0, normalized)
+
+    @field_validator("auth_claims_cache_skew_seconds", mode="before")
+    @classmethod
+    def normalize_auth_claims_cache_skew_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 30
+        return max(0, normalized)
+
+    @field_validator("database_replica_url", mode="before")
+    @classmethod
+    def normalize_database_replica_url(cls, value):
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+    @field_validator("replica_read_pin_seconds", mode="before")
+    @classmethod
+    def normalize_replica_read_pin_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 5
+        return max(0, normalized)
+
+    @field_validator("replica_retry_seconds", mode="before")
+    @classmethod
+    def normalize_replica_retry_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 30
+        return max(1, normalized)
+
+    @field_validator("jwks_refresh_interval_seconds", mode="before")
+    @classmethod
+    def normalize_jwks_refresh_interval_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 600
+        return max(30, normalized)
+
+    @field_validator("jwks_min_refresh_interval_seconds", mode="before")
+    @classmethod
+    def normalize_jwks_min_refresh_interval_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 30
+        return max(1, normalized)
+
+    @field_validator("supabase_user_cache_ttl_seconds", mode="before")
+    @classmethod
+    def normalize_supabase_user_cache_ttl_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 60
+        return max(0, normalized)
+
+    @field_validator("supabase_user_negative_ttl_seconds", mode="before")
+    @classmethod
+    def normalize_supabase_user_negative_ttl_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 30
+        return max(0, normalized)
+
+    @field_validator("supabase_user_breaker_failures", mode="before")
+    @classmethod
+    def normalize_supabase_user_breaker_failures(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 5
+        return max(1, normalized)
+
+    @field_validator("supabase_user_breaker_open_seconds", mode="before")
+    @classmethod
+    def normalize_supabase_user_breaker_open_seconds(cls, value):
+        try:
+            normalized = int(value)
+        except (TypeError, ValueError):
+            return 30
+        return max(1, normalized)
+
+    @field_validator("rate_limit_backend", mode="before")
+    @classmethod
+    def normalize_rate_limit_backend(cls, value):
+        if not isinstance(value, str):
+            return "memory"
+        normalized = value.strip().lower()
+        if normalized not in {"memory", "postgres"}:
+            return "memory"
+        return normalized
+
+    @field_validator(
+        "rate_limit_message_user",
+        "rate_limit_message_global",
+        "rate_limit_rewrite_user",
+        "rate_limit_rewrite_global",
+        mode="before",
+    )
+    @classmethod
+    def normalize_rate_limit(cls, value):
+        # "<count>/<s|min|h>"; empty, "0" or "off" disables that bucket.
+        if value is None:
+            return ""
+        normalized = str(value).strip().lower().replace(" ", "")
+        if normalized in {"", "0", "off"}:
+            return ""
+        if not RATE_LIMIT_PATTERN.fullmatch(normalized):
+            raise ValueError(f"invalid rate limit {value!r}, expected e.g. '20/min'")
+        return normalized
+
+    @field_validator("rate_limit_enabled", mode="before")
+    @classmethod
+    def parse_rate_limit_enabled(cls, value):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            normalized = value.strip().lower()
+            if normalized in {"1", "true", "yes", "on"}:
+                return True
+            if normalized in {"0", "false", "no", "off"}:
+                return False
+        return value
+
     @field_validator("mock_auth_enabled", mode="before")
     @classmethod
     def parse_mock_auth_enabled(cls, value):
@@ -128,6 +540,32 @@ class Settings(BaseSettings):
                 return False
         return value
 
+    @field_validator("profiler_enabled", mode="before")
+    @classmethod
+    def parse_profiler_enabled(cls, value):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            normalized = value.strip().lower()
+            if normalized in {"1", "true", "yes", "on"}:
+                return True
+            if normalized in {"0", "false", "no", "off"}:
+                return False
+        return value
+
+    @field_validator("event_loop_monitor_enabled", mode="before")
+    @classmethod
+    def parse_event_loop_monitor_enabled(cls, value):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            normalized = value.strip().lower()
+            if normalized in {"1", "true", "yes", "on"}:
+                return True
+            if normalized in {"0", "false", "no", "off"}:
+                return False
+        return value
+
     @field_validator("allow_mock_auth_in_production", mode="before")
     @classmethod
     def parse_allow_mock_auth_in_production(cls, value):
@@ -154,5 +592,11 @@ class Settings(BaseSettings):
             )
         return self
 
+    @model_validator(mode="after")
+    def enforce_profiler_token(self):
+        if self.profiler_enabled and not self.ops_token:
+            raise ValueError("PROFILER_ENABLED requires OPS_TOKEN")
+        return self
+
 
 settings = Settings()
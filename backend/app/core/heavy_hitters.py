@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+
+class SpaceSaving:
+    # Space-Saving top-k sketch (Metwally et al.): at most `capacity` counters
+    # however many distinct keys arrive. A new key takes over the smallest
+    # counter and inherits its count as `error`, so for every tracked key
+    # count - error <= true count <= count, and any key seen more than
+    # total / capacity times is guaranteed to be tracked.
+    __slots__ = ("_counters", "capacity", "total")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self.total = 0
+        # key -> [count, error]
+        self._counters: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def add(self, key: str, weight: int = 1) -> None:
+        self.total += weight
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return
+        if len(self._counters) < self.capacity:
+            self._counters[key] = [weight, 0]
+            return
+        # A linear scan: capacity is small, and this only runs for keys that
+        # are not already tracked.
+        counters = self._counters
+        victim = min(counters, key=lambda tracked: counters[tracked][0])
+        floor = counters.pop(victim)[0]
+        counters[key] = [floor + weight, floor]
+
+    def top(self, limit: int | None = None) -> list[tuple[str, int, int]]:
+        # (key, count, error), highest count first.
+        ranked = sorted(
+            ((key, count, error) for key, (count, error) in self._counters.items()),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return ranked if limit is None else ranked[:limit]
+
+    def merge(self, other: SpaceSaving) -> None:
+        # Mergeable-summaries rule: a key missing from a full sketch may have
+        # had up to that sketch's smallest count there, so it is charged as error.
+        own_floor = self._floor()
+        other_floor = other._floor()
+        merged: dict[str, list[int]] = {}
+        for key in self._counters.keys() | other._counters.keys():
+            own_count, own_error = self._counters.get(key, (own_floor, own_floor))
+            other_count, other_error = other._counters.get(key, (other_floor, other_floor))
+            merged[key] = [own_count + other_count, own_error + other_error]
+        self._counters = _largest(merged, self.capacity)
+        self.total += other.total
+
+    def to_state(self) -> dict:
+        return {
+            "total": self.total,
+            "counters": [[key, count, error] for key, (count, error) in self._counters.items()],
+        }
+
+    @classmethod
+    def from_state(cls, capacity: int, state: dict) -> SpaceSaving:
+        sketch = cls(capacity)
+        sketch.total = int(state["total"])
+        sketch._counters = _largest(
+            {key: [int(count), int(error)] for key, count, error in state["counters"]},
+            sketch.capacity,
+        )
+        return sketch
+
+    def _floor(self) -> int:
+        if len(self._counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self._counters.values())
+
+
+def _largest(counters: dict[str, list[int]], capacity: int) -> dict[str, list[int]]:
+    if len(counters) <= capacity:
+        return counters
+    kept = sorted(counters, key=lambda key: (-counters[key][0], key))[:capacity]
+    return {key: counters[key] for key in kept}
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable
+from functools import lru_cache
+
+# Log-linear buckets in the style of HdrHistogram: values below 2**SUB_BUCKET_BITS
+# microseconds get one bucket each, and every further power of two is split into
+# HALF_SUB_BUCKETS equal buckets, so a bucket is never wider than ~6% of its
+# values. Latencies are recorded in whole microseconds up to MAX_VALUE_US (~19h).
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKET_COUNT // 2
+MAX_VALUE_US = (1 << 36) - 1
+BUCKET_COUNT = (MAX_VALUE_US.bit_length() - SUB_BUCKET_BITS + 1) * HALF_SUB_BUCKETS + HALF_SUB_BUCKETS
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 95.0, 99.0)
+
+_EMPTY_COUNTS = array("q", bytes(8 * BUCKET_COUNT))
+
+
+def bucket_index(value_us: int) -> int:
+    value_us = min(max(0, value_us), MAX_VALUE_US)
+    magnitude = max(0, value_us.bit_length() - SUB_BUCKET_BITS)
+    return magnitude * HALF_SUB_BUCKETS + (value_us >> magnitude)
+
+
+def bucket_upper_bound_us(index: int) -> int:
+    # Highest value that lands in this bucket.
+    magnitude = max(0, index // HALF_SUB_BUCKETS - 1)
+    lower = (index - magnitude * HALF_SUB_BUCKETS) << magnitude
+    return lower + (1 << magnitude) - 1
+
+
+@lru_cache(maxsize=8)
+def _bound_ranges(upper_bounds_us: tuple[int, ...]) -> tuple[tuple[int, int], ...]:
+    # Log buckets are ordered, so each bound owns a contiguous index range: the
+    # buckets whose upper edge is above the previous bound and within this one.
+    ranges = []
+    start = 0
+    for bound_us in upper_bounds_us:
+        end = start
+        while end < BUCKET_COUNT and bucket_upper_bound_us(end) <= bound_us:
+            end += 1
+        ranges.append((start, end))
+        start = end
+    return tuple(ranges)
+
+
+class LatencyHistogram:
+    __slots__ = ("_counts", "count", "max_us", "sum_us")
+
+    def __init__(self) -> None:
+        # Fixed size whatever the traffic: BUCKET_COUNT 8-byte counters.
+        self._counts = array("q", bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+    def record(self, latency_ms: float) -> None:
+        value_us = min(max(0, int(latency_ms * 1000)), MAX_VALUE_US)
+        self._counts[bucket_index(value_us)] += 1
+        self.count += 1
+        self.sum_us += value_us
+        self.max_us = max(self.max_us, value_us)
+
+    def clear(self) -> None:
+        # Slice assignment keeps this cheap enough for the observe() path.
+        self._counts[:] = _EMPTY_COUNTS
+        self.count = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+    def copy(self) -> LatencyHistogram:
+        histogram = LatencyHistogram()
+        histogram._counts = array("q", self._counts)
+        histogram.count = self.count
+        histogram.sum_us = self.sum_us
+        histogram.max_us = self.max_us
+        return histogram
+
+    def cumulative_counts(self, upper_bounds_us: tuple[int, ...]) -> list[int]:
+        # Prometheus-style "le" buckets. A log bucket counts toward the first
+        # bound that covers all of it, so counts never overstate "<= bound".
+        counts = self._counts
+        cumulative = []
+        running = 0
+        for start, end in _bound_ranges(upper_bounds_us):
+            running += sum(counts[start:end])
+            cumulative.append(running)
+        return cumulative
+
+    def merge(self, other: LatencyHistogram) -> None:
+        counts = self._counts
+        for index, bucket_count in enumerate(other._counts):
+            if bucket_count:
+                counts[index] += bucket_count
+        self.count += other.count
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentiles_ms(
+        self,
+        percentiles: Iterable[float] = DEFAULT_PERCENTILES,
+    ) -> dict[float, float]:
+        # One cumulative pass for all requested percentiles. A percentile reports
+        # its bucket's upper bound, clamped to the largest value seen.
+        wanted = sorted(percentiles)
+        results: dict[float, float] = {}
+        if self.count == 0:
+            return {percentile: 0.0 for percentile in wanted}
+        targets = [
+            (percentile, max(1, -(-self.count * percentile // 100))) for percentile in wanted
+        ]
+        position = 0
+        cumulative = 0
+        for index, bucket_count in enumerate(self._counts):
+            if not bucket_count:
+                continue
+            cumulative += bucket_count
+            while position < len(targets) and cumulative >= targets[position][1]:
+                value_us = min(bucket_upper_bound_us(index), self.max_us)
+                results[targets[position][0]] = round(value_us / 1000, 3)
+                position += 1
+            if position == len(targets):
+                break
+        return results
+
+    def to_dict(self) -> dict:
+        # Sparse and JSON-friendly, so other processes can merge it back.
+        return {
+            "count": self.count,
+            "sum_us": self.sum_us,
+            "max_us": self.max_us,
+            "buckets": {
+                str(index): bucket_count
+                for index, bucket_count in enumerate(self._counts)
+                if bucket_count
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> LatencyHistogram:
+        histogram = cls()
+        for index, bucket_count in payload.get("buckets", {}).items():
+            histogram._counts[int(index)] = int(bucket_count)
+        histogram.count = int(payload.get("count", 0))
+        histogram.sum_us = int(payload.get("sum_us", 0))
+        histogram.max_us = int(payload.get("max_us", 0))
+        return histogram
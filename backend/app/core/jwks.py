@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from time import monotonic
+
+import httpx
+import jwt
+from jwt import PyJWK
+
+logger = logging.getLogger("nvc.auth.jwks")
+
+JWKS_FETCH_TIMEOUT_SECONDS = 5.0
+
+JwksFetcher = Callable[[str], Awaitable[dict]]
+
+
+async def _fetch_jwks(url: str) -> dict:
+    # Refreshes are minutes apart, so a short-lived client is cheap and is never
+    # tied to an event loop that has since gone away.
+    async with httpx.AsyncClient(timeout=JWKS_FETCH_TIMEOUT_SECONDS) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
+
+
+def _parse_jwks(payload: dict) -> dict[str | None, PyJWK]:
+    keys: dict[str | None, PyJWK] = {}
+    for raw_key in payload.get("keys", []):
+        if not isinstance(raw_key, dict) or raw_key.get("use") == "enc":
+            continue
+        try:
+            key = PyJWK(raw_key)
+        except jwt.PyJWTError:
+            # Unsupported key types are skipped, as PyJWKSet does.
+            continue
+        keys[raw_key.get("kid")] = key
+    if not keys:
+        raise ValueError("JWKS contains no usable signing keys")
+    return keys
+
+
+class JwksManager:
+    def __init__(
+        self,
+        *,
+        url_resolver: Callable[[], str],
+        refresh_interval_seconds: float,
+        min_refresh_interval_seconds: float,
+        fetcher: JwksFetcher = _fetch_jwks,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self._url_resolver = url_resolver
+        self._refresh_interval_seconds = max(1.0, refresh_interval_seconds)
+        self._min_refresh_interval_seconds = max(0.0, min_refresh_interval_seconds)
+        self._fetcher = fetcher
+        self._clock = clock
+        self._keys: dict[str | None, PyJWK] = {}
+        self._last_attempt_at: float | None = None
+        self._last_success_at: float | None = None
+        self._lock: asyncio.Lock | None = None
+        self._lock_loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._unknown_kid_refreshes = 0
+
+    def configure(
+        self,
+        *,
+        refresh_interval_seconds: float | None = None,
+        min_refresh_interval_seconds: float | None = None,
+    ) -> None:
+        if refresh_interval_seconds is not None:
+            self._refresh_interval_seconds = max(1.0, refresh_interval_seconds)
+        if min_refresh_interval_seconds is not None:
+            self._min_refresh_interval_seconds = max(0.0, min_refresh_interval_seconds)
+
+    def reset(self) -> None:
+        self._keys = {}
+        self._last_attempt_at = None
+        self._last_success_at = None
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._unknown_kid_refreshes = 0
+
+    async def start(self) -> None:
+        # Prefetch so the first request verifies from memory. A failure is only
+        # logged: the first unknown kid retries, and the schedule keeps trying.
+        await self.refresh()
+        self._ensure_refresher()
+
+    async def close(self) -> None:
+        task = self._task
+        self._task = None
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def get_signing_key(self, kid: str | None) -> PyJWK:
+        key = self._lookup(kid)
+        if key is not None:
+            return key
+        await self._refresh_for_unknown_kid(kid)
+        key = self._lookup(kid)
+        if key is None:
+            raise jwt.PyJWKClientError(f"unable to find a signing key for kid {kid!r}")
+        return key
+
+    async def refresh(self) -> bool:
+        async with self._get_lock():
+            return await self._refresh_locked()
+
+    def stats(self) -> dict:
+        age = None
+        if self._last_success_at is not None:
+            age = round(max(0.0, self._clock() - self._last_success_at), 3)
+        return {
+            "keys": len(self._keys),
+            "refreshes": self._refreshes,
+            "refresh_failures": self._refresh_failures,
+            "unknown_kid_refreshes": self._unknown_kid_refreshes,
+            "last_refresh_age_seconds": age,
+        }
+
+    def _lookup(self, kid: str | None) -> PyJWK | None:
+        key = self._keys.get(kid)
+        if key is None and kid is None and len(self._keys) == 1:
+            # A token without kid is only unambiguous against a single-key set.
+            key = next(iter(self._keys.values()))
+        return key
+
+    async def _refresh_for_unknown_kid(self, kid: str | None) -> None:
+        async with self._get_lock():
+            # Requests that queued behind an in-flight fetch re-check first, so a
+            # burst on a newly rotated kid costs one fetch, not one per request.
+            if self._lookup(kid) is not None:
+                return
+            # Random kids must not turn into a fetch per request.
+            if (
+                self._last_attempt_at is not None
+                and self._clock() - self._last_attempt_at < self._min_refresh_interval_seconds
+            ):
+                return
+            self._unknown_kid_refreshes += 1
+            await self._refresh_locked()
+
+    async def _refresh_locked(self) -> bool:
+        self._last_attempt_at = self._clock()
+        try:
+            keys = _parse_jwks(await self._fetcher(self._url_resolver()))
+        except Exception:
+            # Keep serving the last good key set; a failed refresh never empties it.
+            self._refresh_failures += 1
+            logger.warning("JWKS refresh failed", exc_info=True)
+            return False
+        self._keys = keys
+        self._refreshes += 1
+        self._last_success_at = self._clock()
+        return True
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _ensure_refresher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        delay = self._refresh_interval_seconds
+        while True:
+            await asyncio.sleep(delay)
+            refreshed = await self.refresh()
+            # Retry sooner after a failure, but never faster than the cooldown.
+            delay = (
+                self._refresh_interval_seconds
+                if refreshed
+                else max(1.0, self._min_refresh_interval_seconds)
+            )
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sys
+import threading
+from collections import deque
+from datetime import UTC, datetime, timedelta
+from time import perf_counter
+
+from app.core.observability import observability_registry
+from app.core.profiler import stack_lines
+
+logger = logging.getLogger("nvc.event_loop")
+
+# Frames kept per captured stall stack (innermost ones).
+STALL_STACK_DEPTH = 40
+# Stalls remembered for attaching to slow-request exemplars.
+RECENT_STALL_LIMIT = 64
+
+
+class EventLoopMonitor:
+    # A probe task sleeps probe_interval at a time and records how late it
+    # wakes up: anything beyond the interval is time the loop spent running
+    # something else without yielding. The probe cannot see what blocked the
+    # loop once it runs again, so a watchdog thread checks the probe's
+    # deadline and, once the loop is stall_ms overdue, captures the loop
+    # thread's stack while the blocking code is still on it.
+    def __init__(self, probe_interval_seconds: float = 0.1, stall_seconds: float = 0.2) -> None:
+        self._probe_interval_seconds = probe_interval_seconds
+        self._stall_seconds = stall_seconds
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._loop_thread_id: int | None = None
+        # perf_counter() time the probe is due to wake; None while not probing.
+        self._deadline: float | None = None
+        # (deadline, stack) captured by the watchdog for the current stall.
+        self._captured: tuple[float, list[str]] | None = None
+        # (started_at, ended_at, stall item), perf_counter() times.
+        self._recent: deque[tuple[float, float, dict]] = deque(maxlen=RECENT_STALL_LIMIT)
+        self._recent_lock = threading.Lock()
+
+    def configure(
+        self,
+        *,
+        probe_interval_seconds: float | None = None,
+        stall_seconds: float | None = None,
+    ) -> None:
+        # Applies from the next start().
+        if probe_interval_seconds is not None:
+            self._probe_interval_seconds = max(0.01, probe_interval_seconds)
+        if stall_seconds is not None:
+            self._stall_seconds = max(0.01, stall_seconds)
+
+    def reset(self) -> None:
+        with self._recent_lock:
+            self._recent.clear()
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._task = loop.create_task(self._probe())
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            args=(self._stop,),
+            name="nvc-loop-watchdog",
+            daemon=True,
+        )
+        self._watchdog.start()
+
+    async def close(self) -> None:
+        task = self._task
+        self._task = None
+        self._stop.set()
+        self._deadline = None
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        watchdog = self._watchdog
+        self._watchdog = None
+        if watchdog is not None:
+            await asyncio.to_thread(watchdog.join)
+
+    def stalls_between(self, started_at: float, ended_at: float) -> list[dict]:
+        # Stalls overlapping [started_at, ended_at] (perf_counter() times).
+        with self._recent_lock:
+            stalls = [
+                stall
+                for stall_started_at, stall_ended_at, stall in self._recent
+                if stall_started_at < ended_at and stall_ended_at > started_at
+            ]
+        # The probe only records a stall once the loop lets it run, which is
+        # after the request that blocked it has finished; a stall the watchdog
+        # has caught but the probe has not yet recorded is still in progress.
+        deadline = self._deadline
+        captured = self._captured
+        if deadline is not None and captured is not None and captured[0] == deadline:
+            overdue_seconds = perf_counter() - deadline
+            stalls.append(
+                {
+                    "timestamp": datetime.now(UTC) - timedelta(seconds=overdue_seconds),
+                    "lag_ms": round((ended_at - deadline) * 1000, 2),
+                    "stack": captured[1],
+                }
+            )
+        return stalls
+
+    async def _probe(self) -> None:
+        interval = self._probe_interval_seconds
+        while True:
+            deadline = perf_counter() + interval
+            self._deadline = deadline
+            await asyncio.sleep(interval)
+            woke_at = perf_counter()
+            self._record(deadline, woke_at, max(0.0, woke_at - deadline) * 1000)
+
+    def _record(self, deadline: float, woke_at: float, lag_ms: float) -> None:
+        if lag_ms < self._stall_seconds * 1000:
+            observability_registry.observe_loop_lag(lag_ms)
+            return
+        captured = self._captured
+        stack = captured[1] if captured is not None and captured[0] == deadline else []
+        stall = {
+            "timestamp": datetime.now(UTC) - timedelta(seconds=woke_at - deadline),
+            "lag_ms": round(lag_ms, 2),
+            "stack": stack,
+        }
+        observability_registry.observe_loop_lag(lag_ms, stall=stall)
+        with self._recent_lock:
+            self._recent.append((deadline, woke_at, stall))
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "event_loop_stall",
+                    "lag_ms": stall["lag_ms"],
+                    "stack": stack,
+                },
+                ensure_ascii=False,
+            )
+        )
+
+    def _watch(self, stop: threading.Event) -> None:
+        # Wakes a few times per stall threshold; takes no locks the loop uses.
+        check_seconds = max(0.005, min(self._probe_interval_seconds, self._stall_seconds) / 2)
+        while not stop.wait(check_seconds):
+            deadline = self._deadline
+            if deadline is None or perf_counter() - deadline < self._stall_seconds:
+                continue
+            captured = self._captured
+            if captured is not None and captured[0] == deadline:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            self._captured = (deadline, stack_lines(frame, STALL_STACK_DEPTH))
+
+
+event_loop_monitor = EventLoopMonitor()
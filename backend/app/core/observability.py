@@ -1,13 +1,47 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
 from collections import Counter, deque
+from collections.abc import Callable
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import UTC, datetime
+from pathlib import Path
 from threading import Lock
+from uuid import uuid4
 
+from app.core.heavy_hitters import SpaceSaving
+from app.core.histogram import LatencyHistogram
+from app.core.request_trace import STAGE_DB
+from app.core.sliding_window import WINDOWS, SlidingWindow, new_windows
+from app.core.statements import statement_id
 
-def _utc_now() -> datetime:
-    return datetime.now(timezone.utc)
+logger = logging.getLogger("nvc.observability")
+
+SHARD_SUFFIX = ".json"
+# Shard files not rewritten for this many flush intervals belong to workers
+# that crashed, were recycled or ran in an earlier deployment; they are
+# dropped from the aggregate and deleted.
+SHARD_STALE_FLUSHES = 3
+
+# Methods and paths come straight from the client; anything outside these is
+# folded into one label so scanners cannot grow the per-route series.
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+OTHER_METHOD = "OTHER"
+UNMATCHED_ROUTE = "<unmatched>"
+OTHER_ENDPOINT = "other"
+# Statement shapes beyond the per-shard capacity are counted under this key.
+OTHER_STATEMENT = "<other>"
+# Event-loop stalls (with their blocking stacks) kept per shard.
+MAX_LOOP_STALLS = 20
+
+
+def _utc_from(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, UTC)
 
 
 @dataclass(slots=True)
@@ -21,107 +55,1015 @@ class RecentErrorEvent:
     latency_ms: float
 
 
-class ObservabilityRegistry:
-    def __init__(self, max_recent_errors: int = 20) -> None:
-        self._lock = Lock()
-        self._max_recent_errors = max(1, max_recent_errors)
-        self._recent_errors: deque[RecentErrorEvent] = deque(
-            maxlen=self._max_recent_errors
-        )
-        self.reset()
+class _Shard:
+    # Everything observed by one thread of one process. Only the owning thread
+    # writes to it, so its lock is only contended while a reader copies it.
+    __slots__ = (
+        "budget_exceeded",
+        "endpoint_counts",
+        "latency_histograms",
+        "llm_attempts_per_call",
+        "llm_call_histograms",
+        "llm_calls",
+        "llm_fallbacks",
+        "llm_outcomes",
+        "llm_retries",
+        "llm_tokens",
+        "llm_upstream_histograms",
+        "lock",
+        "loop_lag",
+        "loop_stall_count",
+        "loop_stalls",
+        "max_latency_ms",
+        "recent_errors",
+        "request_counts",
+        "server_error_count",
+        "slow_counts",
+        "slow_exemplars",
+        "slow_request_count",
+        "stage_calls",
+        "stage_histograms",
+        "started_at",
+        "statement_capacity",
+        "statement_histograms",
+        "statement_max",
+        "statement_rows",
+        "statement_slow",
+        "status_counts",
+        "total_latency_ms",
+        "total_requests",
+        "unmatched_paths",
+        "windows",
+    )
 
-    def reset(self) -> None:
-        with self._lock:
-            self._started_at = _utc_now()
-            self._total_requests = 0
-            self._total_latency_ms = 0.0
-            self._max_latency_ms = 0.0
-            self._slow_request_count = 0
-            self._server_error_count = 0
-            self._status_counts: Counter[str] = Counter()
-            self._endpoint_counts: Counter[str] = Counter()
-            self._recent_errors.clear()
-
-    def configure(self, *, max_recent_errors: int | None = None) -> None:
-        with self._lock:
-            if max_recent_errors is None:
-                return
-            normalized = max(1, max_recent_errors)
-            if normalized == self._max_recent_errors:
-                return
-            self._max_recent_errors = normalized
-            self._recent_errors = deque(self._recent_errors, maxlen=normalized)
+    def __init__(
+        self,
+        *,
+        started_at: datetime,
+        max_recent_errors: int,
+        max_slow_exemplars: int,
+        unmatched_path_capacity: int,
+        statement_capacity: int,
+    ) -> None:
+        self.lock = Lock()
+        self.started_at = started_at
+        self.total_requests = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.slow_request_count = 0
+        self.server_error_count = 0
+        self.status_counts: Counter[str] = Counter()
+        # Exact counts for route templates (bounded by the route table); raw
+        # paths of unmatched requests only get a fixed-size top-k sketch.
+        self.endpoint_counts: Counter[str] = Counter()
+        self.unmatched_paths = SpaceSaving(unmatched_path_capacity)
+        self.request_counts: Counter[tuple[str, str, int]] = Counter()
+        self.slow_counts: Counter[tuple[str, str]] = Counter()
+        # Keyed by (method, route, status class); each histogram is fixed-size.
+        self.latency_histograms: dict[tuple[str, str, str], LatencyHistogram] = {}
+        # Keyed by (method, route, stage): time each request spent in a stage,
+        # plus how many times the stage ran (e.g. DB statements).
+        self.stage_histograms: dict[tuple[str, str, str], LatencyHistogram] = {}
+        self.stage_calls: Counter[tuple[str, str, str]] = Counter()
+        # Keyed by normalized statement, whatever request (if any) issued it.
+        # New shapes stop getting their own histogram at statement_capacity.
+        self.statement_capacity = statement_capacity
+        self.statement_histograms: dict[str, LatencyHistogram] = {}
+        self.statement_rows: Counter[str] = Counter()
+        self.statement_slow: Counter[str] = Counter()
+        # Keyed by (method, route): most statements one request issued, and
+        # requests that went over SQL_STATEMENT_BUDGET.
+        self.statement_max: Counter[tuple[str, str]] = Counter()
+        self.budget_exceeded: Counter[tuple[str, str]] = Counter()
+        # LLM completions by purpose (assistant, rewrite). Upstream histograms
+        # hold single HTTP attempts; call histograms include retries and backoff.
+        self.llm_calls: Counter[str] = Counter()
+        self.llm_attempts_per_call: Counter[tuple[str, int]] = Counter()
+        self.llm_outcomes: Counter[tuple[str, str]] = Counter()
+        self.llm_retries: Counter[tuple[str, str]] = Counter()
+        self.llm_fallbacks: Counter[tuple[str, str]] = Counter()
+        self.llm_tokens: Counter[tuple[str, str]] = Counter()
+        self.llm_upstream_histograms: dict[str, LatencyHistogram] = {}
+        self.llm_call_histograms: dict[str, LatencyHistogram] = {}
+        # Event-loop scheduling lag per probe, and stalls over EVENT_LOOP_STALL_MS.
+        self.loop_lag = LatencyHistogram()
+        self.loop_stall_count = 0
+        self.loop_stalls: deque[dict] = deque(maxlen=MAX_LOOP_STALLS)
+        # Recent traffic only (1m/5m/1h rings); fixed size however long we run.
+        self.windows = new_windows()
+        self.recent_errors: deque[RecentErrorEvent] = deque(maxlen=max_recent_errors)
+        self.slow_exemplars: deque[dict] = deque(maxlen=max_slow_exemplars)
 
     def observe(
         self,
         *,
+        now: float,
         request_id: str,
         method: str,
         path: str,
         route: str,
+        route_matched: bool,
         status_code: int,
         latency_ms: float,
         is_slow: bool,
+        stages: dict[str, list[float]] | None,
+        exemplar: dict | None,
+        budget_exceeded: bool,
     ) -> None:
-        endpoint_key = f"{method} {route}"
-        with self._lock:
-            self._total_requests += 1
-            self._total_latency_ms += latency_ms
-            self._max_latency_ms = max(self._max_latency_ms, latency_ms)
-            self._status_counts[str(status_code)] += 1
-            self._endpoint_counts[endpoint_key] += 1
-            if is_slow:
-                self._slow_request_count += 1
-            if status_code >= 500:
-                self._server_error_count += 1
-                self._recent_errors.append(
-                    RecentErrorEvent(
-                        timestamp=_utc_now(),
-                        request_id=request_id,
-                        method=method,
-                        path=path,
-                        route=route,
-                        status_code=status_code,
-                        latency_ms=latency_ms,
-                    )
+        if is_slow and exemplar is not None:
+            self.slow_exemplars.append(
+                {
+                    "timestamp": _utc_from(now),
+                    "request_id": request_id,
+                    "method": method,
+                    "path": path,
+                    "route": route,
+                    "status_code": status_code,
+                    "latency_ms": round(latency_ms, 2),
+                    **exemplar,
+                }
+            )
+        if method not in KNOWN_METHODS:
+            method = OTHER_METHOD
+        if route_matched:
+            self.endpoint_counts[f"{method} {route}"] += 1
+        else:
+            self.unmatched_paths.add(f"{method} {path}")
+            route = UNMATCHED_ROUTE
+        histogram_key = (method, route, f"{status_code // 100}xx")
+        self.total_requests += 1
+        self.total_latency_ms += latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        self.status_counts[str(status_code)] += 1
+        self.request_counts[(method, route, status_code)] += 1
+        histogram = self.latency_histograms.get(histogram_key)
+        if histogram is None:
+            histogram = self.latency_histograms[histogram_key] = LatencyHistogram()
+        histogram.record(latency_ms)
+        if stages:
+            for stage, (stage_ms, calls) in stages.items():
+                stage_key = (method, route, stage)
+                stage_histogram = self.stage_histograms.get(stage_key)
+                if stage_histogram is None:
+                    stage_histogram = self.stage_histograms[stage_key] = LatencyHistogram()
+                stage_histogram.record(stage_ms)
+                self.stage_calls[stage_key] += int(calls)
+            db_stage = stages.get(STAGE_DB)
+            if db_stage is not None:
+                endpoint_key = (method, route)
+                self.statement_max[endpoint_key] = max(
+                    self.statement_max[endpoint_key], int(db_stage[1])
+                )
+        if budget_exceeded:
+            self.budget_exceeded[(method, route)] += 1
+        for window in self.windows:
+            window.record(now, latency_ms, is_error=status_code >= 500, is_slow=is_slow)
+        if is_slow:
+            self.slow_request_count += 1
+            self.slow_counts[(method, route)] += 1
+        if status_code >= 500:
+            self.server_error_count += 1
+            self.recent_errors.append(
+                RecentErrorEvent(
+                    timestamp=_utc_from(now),
+                    request_id=request_id,
+                    method=method,
+                    path=path,
+                    route=route,
+                    status_code=status_code,
+                    latency_ms=latency_ms,
                 )
+            )
 
-    def snapshot(self, *, slow_request_threshold_ms: int, top_n: int = 10) -> dict:
-        with self._lock:
-            avg_latency = (
-                self._total_latency_ms / self._total_requests
-                if self._total_requests > 0
-                else 0.0
+    def observe_statement(
+        self,
+        statement: str,
+        duration_ms: float,
+        rowcount: int,
+        is_slow: bool,
+    ) -> None:
+        histogram = self.statement_histograms.get(statement)
+        if histogram is None:
+            if len(self.statement_histograms) >= self.statement_capacity:
+                statement = OTHER_STATEMENT
+                histogram = self.statement_histograms.get(statement)
+            if histogram is None:
+                histogram = self.statement_histograms[statement] = LatencyHistogram()
+        histogram.record(duration_ms)
+        if rowcount > 0:
+            self.statement_rows[statement] += rowcount
+        if is_slow:
+            self.statement_slow[statement] += 1
+
+    def observe_llm_call(
+        self,
+        purpose: str,
+        attempts: list[tuple[str, int | None, float]],
+        duration_ms: float,
+        fallback_reason: str | None,
+        prompt_tokens: int,
+        completion_tokens: int,
+    ) -> None:
+        self.llm_calls[purpose] += 1
+        if fallback_reason is not None:
+            self.llm_fallbacks[(purpose, fallback_reason)] += 1
+        if not attempts:
+            return
+        self.llm_attempts_per_call[(purpose, len(attempts))] += 1
+        upstream = self.llm_upstream_histograms.get(purpose)
+        if upstream is None:
+            upstream = self.llm_upstream_histograms[purpose] = LatencyHistogram()
+        for index, (outcome, status_code, attempt_ms) in enumerate(attempts):
+            self.llm_outcomes[(purpose, outcome)] += 1
+            upstream.record(attempt_ms)
+            if index < len(attempts) - 1:
+                # Every attempt but the last was retried.
+                reason = str(status_code) if status_code is not None else outcome
+                self.llm_retries[(purpose, reason)] += 1
+        call = self.llm_call_histograms.get(purpose)
+        if call is None:
+            call = self.llm_call_histograms[purpose] = LatencyHistogram()
+        call.record(duration_ms)
+        if prompt_tokens:
+            self.llm_tokens[(purpose, "prompt")] += prompt_tokens
+        if completion_tokens:
+            self.llm_tokens[(purpose, "completion")] += completion_tokens
+
+    def observe_loop_lag(self, lag_ms: float, stall: dict | None) -> None:
+        self.loop_lag.record(lag_ms)
+        if stall is not None:
+            self.loop_stall_count += 1
+            self.loop_stalls.append(stall)
+
+    def merge(self, other: _Shard) -> None:
+        self.started_at = min(self.started_at, other.started_at)
+        self.total_requests += other.total_requests
+        self.total_latency_ms += other.total_latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, other.max_latency_ms)
+        self.slow_request_count += other.slow_request_count
+        self.server_error_count += other.server_error_count
+        self.status_counts.update(other.status_counts)
+        self.endpoint_counts.update(other.endpoint_counts)
+        self.unmatched_paths.merge(other.unmatched_paths)
+        self.request_counts.update(other.request_counts)
+        self.slow_counts.update(other.slow_counts)
+        _merge_histograms(self.latency_histograms, other.latency_histograms)
+        _merge_histograms(self.stage_histograms, other.stage_histograms)
+        self.stage_calls.update(other.stage_calls)
+        # Merged views are transient, so they keep every shape the shards kept.
+        _merge_histograms(self.statement_histograms, other.statement_histograms)
+        self.statement_rows.update(other.statement_rows)
+        self.statement_slow.update(other.statement_slow)
+        for key, count in other.statement_max.items():
+            self.statement_max[key] = max(self.statement_max[key], count)
+        self.budget_exceeded.update(other.budget_exceeded)
+        self.llm_calls.update(other.llm_calls)
+        self.llm_attempts_per_call.update(other.llm_attempts_per_call)
+        self.llm_outcomes.update(other.llm_outcomes)
+        self.llm_retries.update(other.llm_retries)
+        self.llm_fallbacks.update(other.llm_fallbacks)
+        self.llm_tokens.update(other.llm_tokens)
+        _merge_histograms(self.llm_upstream_histograms, other.llm_upstream_histograms)
+        _merge_histograms(self.llm_call_histograms, other.llm_call_histograms)
+        self.loop_lag.merge(other.loop_lag)
+        self.loop_stall_count += other.loop_stall_count
+        if other.loop_stalls:
+            self.loop_stalls = deque(
+                sorted(
+                    [*self.loop_stalls, *other.loop_stalls],
+                    key=lambda stall: stall["timestamp"],
+                ),
+                maxlen=self.loop_stalls.maxlen,
+            )
+        for window, other_window in zip(self.windows, other.windows):
+            window.merge(other_window)
+        if other.recent_errors:
+            self.recent_errors = deque(
+                sorted(
+                    [*self.recent_errors, *other.recent_errors],
+                    key=lambda event: event.timestamp,
+                ),
+                maxlen=self.recent_errors.maxlen,
             )
-            top_endpoints = [
-                {"endpoint": endpoint, "count": count}
-                for endpoint, count in self._endpoint_counts.most_common(max(1, top_n))
-            ]
-            recent_errors = [
+        if other.slow_exemplars:
+            self.slow_exemplars = deque(
+                sorted(
+                    [*self.slow_exemplars, *other.slow_exemplars],
+                    key=lambda exemplar: exemplar["timestamp"],
+                ),
+                maxlen=self.slow_exemplars.maxlen,
+            )
+
+    def to_state(self) -> dict:
+        # JSON-friendly; tuple keys become lists with the value last.
+        return {
+            "started_at": self.started_at.isoformat(),
+            "total_requests": self.total_requests,
+            "total_latency_ms": self.total_latency_ms,
+            "max_latency_ms": self.max_latency_ms,
+            "slow_request_count": self.slow_request_count,
+            "server_error_count": self.server_error_count,
+            "status_counts": dict(self.status_counts),
+            "endpoint_counts": dict(self.endpoint_counts),
+            "unmatched_paths": self.unmatched_paths.to_state(),
+            "request_counts": [[*key, count] for key, count in self.request_counts.items()],
+            "slow_counts": [[*key, count] for key, count in self.slow_counts.items()],
+            "latency_histograms": [
+                [*key, histogram.to_dict()] for key, histogram in self.latency_histograms.items()
+            ],
+            "stage_histograms": [
+                [*key, histogram.to_dict(), self.stage_calls[key]]
+                for key, histogram in self.stage_histograms.items()
+            ],
+            "statements": [
+                [
+                    statement,
+                    histogram.to_dict(),
+                    self.statement_rows[statement],
+                    self.statement_slow[statement],
+                ]
+                for statement, histogram in self.statement_histograms.items()
+            ],
+            "statement_max": [[*key, count] for key, count in self.statement_max.items()],
+            "budget_exceeded": [[*key, count] for key, count in self.budget_exceeded.items()],
+            "llm_calls": dict(self.llm_calls),
+            "llm_attempts_per_call": [
+                [*key, count] for key, count in self.llm_attempts_per_call.items()
+            ],
+            "llm_outcomes": [[*key, count] for key, count in self.llm_outcomes.items()],
+            "llm_retries": [[*key, count] for key, count in self.llm_retries.items()],
+            "llm_fallbacks": [[*key, count] for key, count in self.llm_fallbacks.items()],
+            "llm_tokens": [[*key, count] for key, count in self.llm_tokens.items()],
+            "llm_upstream_histograms": {
+                purpose: histogram.to_dict()
+                for purpose, histogram in self.llm_upstream_histograms.items()
+            },
+            "llm_call_histograms": {
+                purpose: histogram.to_dict()
+                for purpose, histogram in self.llm_call_histograms.items()
+            },
+            "loop_lag": self.loop_lag.to_dict(),
+            "loop_stall_count": self.loop_stall_count,
+            "loop_stalls": [_stall_state(stall) for stall in self.loop_stalls],
+            "windows": [window.to_state() for window in self.windows],
+            "recent_errors": [
                 {
-                    "timestamp": event.timestamp,
+                    "timestamp": event.timestamp.isoformat(),
                     "request_id": event.request_id,
                     "method": event.method,
                     "path": event.path,
                     "route": event.route,
                     "status_code": event.status_code,
-                    "latency_ms": round(event.latency_ms, 2),
+                    "latency_ms": event.latency_ms,
                 }
-                for event in reversed(self._recent_errors)
-            ]
-            return {
-                "started_at": self._started_at,
-                "total_requests": self._total_requests,
-                "status_counts": dict(self._status_counts),
-                "avg_latency_ms": round(avg_latency, 2),
-                "max_latency_ms": round(self._max_latency_ms, 2),
-                "slow_request_count": self._slow_request_count,
-                "server_error_count": self._server_error_count,
-                "slow_request_threshold_ms": slow_request_threshold_ms,
-                "top_endpoints": top_endpoints,
-                "recent_errors": recent_errors,
+                for event in self.recent_errors
+            ],
+            "slow_exemplars": [
+                {
+                    **exemplar,
+                    "timestamp": exemplar["timestamp"].isoformat(),
+                    "loop_stalls": [
+                        _stall_state(stall) for stall in exemplar.get("loop_stalls", ())
+                    ],
+                }
+                for exemplar in self.slow_exemplars
+            ],
+        }
+
+    def load_state(self, state: dict) -> None:
+        # Fills a fresh shard from to_state() output, keeping its own limits.
+        self.started_at = datetime.fromisoformat(state["started_at"])
+        self.total_requests = int(state["total_requests"])
+        self.total_latency_ms = float(state["total_latency_ms"])
+        self.max_latency_ms = float(state["max_latency_ms"])
+        self.slow_request_count = int(state["slow_request_count"])
+        self.server_error_count = int(state["server_error_count"])
+        self.status_counts.update(state["status_counts"])
+        self.endpoint_counts.update(state["endpoint_counts"])
+        self.unmatched_paths = SpaceSaving.from_state(
+            self.unmatched_paths.capacity, state["unmatched_paths"]
+        )
+        for method, route, status_code, count in state["request_counts"]:
+            self.request_counts[(method, route, int(status_code))] = int(count)
+        for method, route, count in state["slow_counts"]:
+            self.slow_counts[(method, route)] = int(count)
+        for method, route, status_class, histogram in state["latency_histograms"]:
+            self.latency_histograms[(method, route, status_class)] = LatencyHistogram.from_dict(
+                histogram
+            )
+        for method, route, stage, histogram, calls in state["stage_histograms"]:
+            self.stage_histograms[(method, route, stage)] = LatencyHistogram.from_dict(histogram)
+            self.stage_calls[(method, route, stage)] = int(calls)
+        for statement, histogram, rows, slow in state["statements"]:
+            self.statement_histograms[statement] = LatencyHistogram.from_dict(histogram)
+            self.statement_rows[statement] = int(rows)
+            self.statement_slow[statement] = int(slow)
+        for method, route, count in state["statement_max"]:
+            self.statement_max[(method, route)] = int(count)
+        for method, route, count in state["budget_exceeded"]:
+            self.budget_exceeded[(method, route)] = int(count)
+        self.llm_calls.update(state["llm_calls"])
+        for purpose, attempts, count in state["llm_attempts_per_call"]:
+            self.llm_attempts_per_call[(purpose, int(attempts))] = int(count)
+        for field in ("llm_outcomes", "llm_retries", "llm_fallbacks", "llm_tokens"):
+            counter = getattr(self, field)
+            for purpose, label, count in state[field]:
+                counter[(purpose, label)] = int(count)
+        for purpose, histogram in state["llm_upstream_histograms"].items():
+            self.llm_upstream_histograms[purpose] = LatencyHistogram.from_dict(histogram)
+        for purpose, histogram in state["llm_call_histograms"].items():
+            self.llm_call_histograms[purpose] = LatencyHistogram.from_dict(histogram)
+        self.loop_lag = LatencyHistogram.from_dict(state["loop_lag"])
+        self.loop_stall_count = int(state["loop_stall_count"])
+        for stall in state["loop_stalls"]:
+            self.loop_stalls.append(_stall_from_state(stall))
+        self.windows = tuple(
+            SlidingWindow.from_state(slot_seconds, slot_count, window_state)
+            for (_, slot_seconds, slot_count), window_state in zip(WINDOWS, state["windows"])
+        )
+        for event in state["recent_errors"]:
+            self.recent_errors.append(
+                RecentErrorEvent(
+                    timestamp=datetime.fromisoformat(event["timestamp"]),
+                    request_id=event["request_id"],
+                    method=event["method"],
+                    path=event["path"],
+                    route=event["route"],
+                    status_code=int(event["status_code"]),
+                    latency_ms=float(event["latency_ms"]),
+                )
+            )
+        for exemplar in state["slow_exemplars"]:
+            self.slow_exemplars.append(
+                {
+                    **exemplar,
+                    "timestamp": datetime.fromisoformat(exemplar["timestamp"]),
+                    "loop_stalls": [_stall_from_state(stall) for stall in exemplar["loop_stalls"]],
+                }
+            )
+
+
+def _stall_state(stall: dict) -> dict:
+    return {**stall, "timestamp": stall["timestamp"].isoformat()}
+
+
+def _stall_from_state(stall: dict) -> dict:
+    return {**stall, "timestamp": datetime.fromisoformat(stall["timestamp"])}
+
+
+def _merge_histograms(target: dict, source: dict) -> None:
+    for key, histogram in source.items():
+        existing = target.get(key)
+        if existing is None:
+            target[key] = histogram.copy()
+        else:
+            existing.merge(histogram)
+
+
+class ObservabilityRegistry:
+    # Per-thread shards merged on read keep observe() off any shared lock. With
+    # a shard directory configured, every worker process also writes its merged
+    # shards to <dir>/<pid>-<token>.json and readers fold in the other workers'
+    # files, so /ops/metrics reports the whole server rather than one worker.
+    def __init__(
+        self,
+        max_recent_errors: int = 20,
+        *,
+        max_slow_exemplars: int = 20,
+        unmatched_path_capacity: int = 64,
+        statement_capacity: int = 100,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        # Wall-clock seconds: window slots must line up across worker processes.
+        self._clock = clock
+        # Guards the shard list and generation; never taken by observe() once
+        # the calling thread has its shard.
+        self._lock = Lock()
+        self._local = threading.local()
+        self._max_recent_errors = max(1, max_recent_errors)
+        self._max_slow_exemplars = max(1, max_slow_exemplars)
+        self._unmatched_path_capacity = max(1, unmatched_path_capacity)
+        self._statement_capacity = max(1, statement_capacity)
+        self._shards: list[_Shard] = []
+        self._generation = 0
+        self._shard_dir: Path | None = None
+        self._flush_interval_seconds = 5.0
+        self._shard_name: str | None = None
+        self._shard_pid: int | None = None
+        self._task: asyncio.Task | None = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._started_at = _utc_from(self._clock())
+            self._shards = []
+            # Threads notice the bump and start a fresh shard on their next observe.
+            self._generation += 1
+        shard_dir = self._shard_dir
+        if shard_dir is not None and self._shard_pid == os.getpid():
+            (shard_dir / self._shard_name).unlink(missing_ok=True)
+
+    def configure(
+        self,
+        *,
+        max_recent_errors: int | None = None,
+        max_slow_exemplars: int | None = None,
+        unmatched_path_capacity: int | None = None,
+        statement_capacity: int | None = None,
+        shard_dir: str | None = None,
+        flush_interval_seconds: float | None = None,
+    ) -> None:
+        # New ring and sketch sizes apply to shards started after reset().
+        # shard_dir="" turns cross-process aggregation off.
+        with self._lock:
+            if max_recent_errors is not None:
+                normalized = max(1, max_recent_errors)
+                if normalized != self._max_recent_errors:
+                    self._max_recent_errors = normalized
+                    for shard in self._shards:
+                        with shard.lock:
+                            shard.recent_errors = deque(shard.recent_errors, maxlen=normalized)
+            if max_slow_exemplars is not None:
+                self._max_slow_exemplars = max(1, max_slow_exemplars)
+            if unmatched_path_capacity is not None:
+                self._unmatched_path_capacity = max(1, unmatched_path_capacity)
+            if statement_capacity is not None:
+                self._statement_capacity = max(1, statement_capacity)
+            if shard_dir is not None:
+                self._shard_dir = Path(shard_dir) if shard_dir else None
+            if flush_interval_seconds is not None:
+                self._flush_interval_seconds = max(0.1, flush_interval_seconds)
+
+    def observe(
+        self,
+        *,
+        request_id: str,
+        method: str,
+        path: str,
+        route: str,
+        status_code: int,
+        latency_ms: float,
+        is_slow: bool,
+        stages: dict[str, list[float]] | None = None,
+        route_matched: bool = True,
+        exemplar: dict | None = None,
+        statement_budget_exceeded: bool = False,
+    ) -> None:
+        # exemplar: request detail, kept only when is_slow.
+        now = self._clock()
+        shard = self._local_shard()
+        with shard.lock:
+            shard.observe(
+                now=now,
+                request_id=request_id,
+                method=method,
+                path=path,
+                route=route,
+                route_matched=route_matched,
+                status_code=status_code,
+                latency_ms=latency_ms,
+                is_slow=is_slow,
+                stages=stages,
+                exemplar=exemplar,
+                budget_exceeded=statement_budget_exceeded,
+            )
+
+    def observe_statement(
+        self,
+        statement: str,
+        duration_ms: float,
+        *,
+        rowcount: int = -1,
+        is_slow: bool = False,
+    ) -> None:
+        # statement: normalized (app.core.statements.normalize_statement).
+        shard = self._local_shard()
+        with shard.lock:
+            shard.observe_statement(statement, duration_ms, rowcount, is_slow)
+
+    def observe_llm_call(
+        self,
+        purpose: str,
+        *,
+        attempts: list[tuple[str, int | None, float]],
+        duration_ms: float,
+        fallback_reason: str | None,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+    ) -> None:
+        # attempts: (outcome, HTTP status, milliseconds) per upstream request;
+        # empty when the call was skipped (no API key).
+        shard = self._local_shard()
+        with shard.lock:
+            shard.observe_llm_call(
+                purpose,
+                attempts,
+                duration_ms,
+                fallback_reason,
+                prompt_tokens,
+                completion_tokens,
+            )
+
+    def observe_loop_lag(self, lag_ms: float, *, stall: dict | None = None) -> None:
+        # stall: {timestamp, lag_ms, stack} when lag_ms went over the threshold.
+        shard = self._local_shard()
+        with shard.lock:
+            shard.observe_loop_lag(lag_ms, stall)
+
+    def slow_requests(self) -> list[dict]:
+        # Newest first, merged across threads and workers.
+        merged, _ = self._collect()
+        return list(reversed(merged.slow_exemplars))
+
+    def sql_statements(self) -> list[dict]:
+        # Normalized SQL behind each statement_id, by total time; kept out of
+        # snapshot() so the open metrics endpoint carries no SQL text.
+        merged, _ = self._collect()
+        statements = sorted(
+            merged.statement_histograms.items(),
+            key=lambda item: (-item[1].sum_us, item[0]),
+        )
+        return [
+            {"statement_id": statement_id(statement), "statement": statement}
+            for statement, _ in statements
+        ]
+
+    def snapshot(self, *, slow_request_threshold_ms: int, top_n: int = 10) -> dict:
+        merged, workers = self._collect()
+        now = self._clock()
+        avg_latency = (
+            merged.total_latency_ms / merged.total_requests
+            if merged.total_requests > 0
+            else 0.0
+        )
+        top_endpoints = _top_endpoints(merged, max(1, top_n))
+        recent_errors = [
+            {
+                "timestamp": event.timestamp,
+                "request_id": event.request_id,
+                "method": event.method,
+                "path": event.path,
+                "route": event.route,
+                "status_code": event.status_code,
+                "latency_ms": round(event.latency_ms, 2),
             }
+            for event in reversed(merged.recent_errors)
+        ]
+        latency_histograms = [
+            _histogram_item(f"{method} {route}", status_class, histogram)
+            for (method, route, status_class), histogram in sorted(
+                merged.latency_histograms.items(),
+                key=lambda item: (-item[1].count, item[0]),
+            )
+        ]
+        stage_timings = [
+            _stage_item(key, histogram, merged.stage_calls[key])
+            for key, histogram in sorted(
+                merged.stage_histograms.items(),
+                key=lambda item: (-item[1].sum_us, item[0]),
+            )
+        ]
+        return {
+            "started_at": merged.started_at,
+            "workers": workers,
+            "total_requests": merged.total_requests,
+            "status_counts": dict(merged.status_counts),
+            "avg_latency_ms": round(avg_latency, 2),
+            "max_latency_ms": round(merged.max_latency_ms, 2),
+            "slow_request_count": merged.slow_request_count,
+            "server_error_count": merged.server_error_count,
+            "slow_request_threshold_ms": slow_request_threshold_ms,
+            "top_endpoints": top_endpoints,
+            "recent_errors": recent_errors,
+            "latency_histograms": latency_histograms,
+            "stage_timings": stage_timings,
+            "windows": [
+                _window_item(label, window, now, merged.started_at)
+                for (label, _, _), window in zip(WINDOWS, merged.windows)
+            ],
+            "sql": _sql_stats(merged, max(1, top_n)),
+            "llm": [_llm_item(merged, purpose) for purpose in sorted(merged.llm_calls)],
+            "event_loop": _event_loop_stats(merged),
+        }
 
+    def export_series(self) -> dict:
+        # Raw labelled series for exporters, merged across threads and workers.
+        merged, _ = self._collect()
+        return {
+            "started_at": merged.started_at,
+            "requests": dict(merged.request_counts),
+            "slow_requests": dict(merged.slow_counts),
+            "latency": merged.latency_histograms,
+            "stages": merged.stage_histograms,
+            "stage_calls": dict(merged.stage_calls),
+            "statements": {
+                (statement_id(statement),): histogram
+                for statement, histogram in merged.statement_histograms.items()
+            },
+            "slow_statements": {
+                (statement_id(statement),): count
+                for statement, count in merged.statement_slow.items()
+            },
+            "statement_budget_exceeded": dict(merged.budget_exceeded),
+            "llm_calls": dict(merged.llm_calls),
+            "llm_outcomes": dict(merged.llm_outcomes),
+            "llm_retries": dict(merged.llm_retries),
+            "llm_fallbacks": dict(merged.llm_fallbacks),
+            "llm_tokens": dict(merged.llm_tokens),
+            "llm_upstream": {
+                (purpose,): histogram
+                for purpose, histogram in merged.llm_upstream_histograms.items()
+            },
+            "llm_call": {
+                (purpose,): histogram for purpose, histogram in merged.llm_call_histograms.items()
+            },
+            "event_loop_lag": {(): merged.loop_lag} if merged.loop_lag.count else {},
+            "event_loop_stalls": merged.loop_stall_count,
+        }
 
-observability_registry = ObservabilityRegistry()
+    def write_shard(self) -> None:
+        shard_dir = self._shard_dir
+        if shard_dir is None:
+            return
+        payload = json.dumps(self._collect_local().to_state(), separators=(",", ":"))
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        path = shard_dir / self._own_shard_name()
+        # Readers only ever see a complete file.
+        temporary_path = path.with_suffix(".tmp")
+        temporary_path.write_text(payload, encoding="utf-8")
+        os.replace(temporary_path, path)
+
+    def start(self) -> None:
+        if self._shard_dir is None:
+            return
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._task = loop.create_task(self._run())
 
+    async def close(self) -> None:
+        task = self._task
+        self._task = None
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._shard_dir is not None:
+            # A retiring worker leaves its final counts for the others to report.
+            await asyncio.to_thread(self._write_shard_logged)
+
+    def _local_shard(self) -> _Shard:
+        local = self._local
+        shard = getattr(local, "shard", None)
+        if shard is not None and local.generation == self._generation:
+            return shard
+        with self._lock:
+            shard = self._new_shard()
+            self._shards.append(shard)
+            local.shard = shard
+            local.generation = self._generation
+        return shard
+
+    def _new_shard(self) -> _Shard:
+        return _Shard(
+            started_at=self._started_at,
+            max_recent_errors=self._max_recent_errors,
+            max_slow_exemplars=self._max_slow_exemplars,
+            unmatched_path_capacity=self._unmatched_path_capacity,
+            statement_capacity=self._statement_capacity,
+        )
+
+    def _collect_local(self) -> _Shard:
+        with self._lock:
+            shards = list(self._shards)
+            merged = self._new_shard()
+        for shard in shards:
+            with shard.lock:
+                merged.merge(shard)
+        return merged
+
+    def _collect(self) -> tuple[_Shard, int]:
+        merged = self._collect_local()
+        workers = 1
+        shard_dir = self._shard_dir
+        if shard_dir is None:
+            return merged, workers
+        own_name = self._own_shard_name()
+        stale_before = self._clock() - self._flush_interval_seconds * SHARD_STALE_FLUSHES
+        for path in sorted(shard_dir.glob(f"*{SHARD_SUFFIX}")):
+            if path.name == own_name:
+                continue
+            try:
+                if path.stat().st_mtime < stale_before:
+                    path.unlink(missing_ok=True)
+                    continue
+                state = json.loads(path.read_text(encoding="utf-8"))
+                peer = self._new_shard()
+                peer.load_state(state)
+            except (OSError, ValueError, KeyError, TypeError):
+                logger.warning("skipping unreadable observability shard %s", path, exc_info=True)
+                continue
+            merged.merge(peer)
+            workers += 1
+        return merged, workers
+
+    def _own_shard_name(self) -> str:
+        # pid alone is not unique: a recycled worker can reuse a dead one's pid.
+        pid = os.getpid()
+        if self._shard_pid != pid:
+            self._shard_pid = pid
+            self._shard_name = f"{pid}-{uuid4().hex[:8]}{SHARD_SUFFIX}"
+        return self._shard_name
+
+    def _write_shard_logged(self) -> None:
+        try:
+            self.write_shard()
+        except OSError:
+            logger.warning("failed to write observability shard", exc_info=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval_seconds)
+            await asyncio.to_thread(self._write_shard_logged)
+
+
+def _top_endpoints(merged: _Shard, limit: int) -> list[dict]:
+    # Unmatched paths report their guaranteed count (count - error), so the
+    # listed counts plus "other" add up to the total exactly.
+    candidates = list(merged.endpoint_counts.items())
+    candidates.extend(
+        (endpoint, count - error)
+        for endpoint, count, error in merged.unmatched_paths.top()
+        if count > error
+    )
+    candidates.sort(key=lambda item: (-item[1], item[0]))
+    top_endpoints = [{"endpoint": endpoint, "count": count} for endpoint, count in candidates[:limit]]
+    other = merged.total_requests - sum(item["count"] for item in top_endpoints)
+    if other > 0:
+        top_endpoints.append({"endpoint": OTHER_ENDPOINT, "count": other})
+    return top_endpoints
+
+
+def _histogram_item(endpoint: str, status_class: str, histogram: LatencyHistogram) -> dict:
+    percentiles = histogram.percentiles_ms()
+    return {
+        "endpoint": endpoint,
+        "status_class": status_class,
+        "count": histogram.count,
+        "p50_ms": percentiles[50.0],
+        "p90_ms": percentiles[90.0],
+        "p95_ms": percentiles[95.0],
+        "p99_ms": percentiles[99.0],
+        "max_ms": round(histogram.max_us / 1000, 3),
+    }
+
+
+def _stage_item(key: tuple[str, str, str], histogram: LatencyHistogram, calls: int) -> dict:
+    method, route, stage = key
+    percentiles = histogram.percentiles_ms((50.0, 95.0, 99.0))
+    return {
+        "endpoint": f"{method} {route}",
+        "stage": stage,
+        "requests": histogram.count,
+        "calls": calls,
+        "total_ms": round(histogram.sum_us / 1000, 3),
+        "avg_ms": round(histogram.sum_us / 1000 / histogram.count, 3) if histogram.count else 0.0,
+        "p50_ms": percentiles[50.0],
+        "p95_ms": percentiles[95.0],
+        "p99_ms": percentiles[99.0],
+    }
+
+
+def _sql_stats(merged: _Shard, limit: int) -> dict:
+    statements = sorted(
+        merged.statement_histograms.items(),
+        key=lambda item: (-item[1].sum_us, item[0]),
+    )
+    top_statements = []
+    for statement, histogram in statements[:limit]:
+        percentiles = histogram.percentiles_ms((50.0, 95.0, 99.0))
+        top_statements.append(
+            {
+                "statement_id": statement_id(statement),
+                "count": histogram.count,
+                "total_ms": round(histogram.sum_us / 1000, 3),
+                "avg_ms": round(histogram.sum_us / 1000 / histogram.count, 3),
+                "p50_ms": percentiles[50.0],
+                "p95_ms": percentiles[95.0],
+                "p99_ms": percentiles[99.0],
+                "max_ms": round(histogram.max_us / 1000, 3),
+                "rows": merged.statement_rows[statement],
+                "slow_count": merged.statement_slow[statement],
+            }
+        )
+    endpoints = []
+    for (method, route, stage), histogram in merged.stage_histograms.items():
+        if stage != STAGE_DB or not histogram.count:
+            continue
+        statement_count = merged.stage_calls[(method, route, stage)]
+        endpoints.append(
+            {
+                "endpoint": f"{method} {route}",
+                "requests": histogram.count,
+                "statements": statement_count,
+                "avg_statements": round(statement_count / histogram.count, 2),
+                "max_statements": merged.statement_max[(method, route)],
+                "avg_db_ms": round(histogram.sum_us / 1000 / histogram.count, 3),
+                "budget_exceeded": merged.budget_exceeded[(method, route)],
+            }
+        )
+    endpoints.sort(key=lambda item: (-item["avg_statements"], item["endpoint"]))
+    return {
+        "statements": sum(histogram.count for _, histogram in statements),
+        "total_ms": round(sum(histogram.sum_us for _, histogram in statements) / 1000, 3),
+        "slow_statements": sum(merged.statement_slow.values()),
+        "budget_exceeded_requests": sum(merged.budget_exceeded.values()),
+        "top_statements": top_statements,
+        "endpoints": endpoints[:limit],
+    }
+
+
+def _llm_item(merged: _Shard, purpose: str) -> dict:
+    calls = merged.llm_calls[purpose]
+    fallback_reasons = _labels_for(merged.llm_fallbacks, purpose)
+    outcomes = _labels_for(merged.llm_outcomes, purpose)
+    attempts_per_call = {
+        str(attempts): count
+        for (item_purpose, attempts), count in sorted(merged.llm_attempts_per_call.items())
+        if item_purpose == purpose
+    }
+    upstream_calls = sum(attempts_per_call.values())
+    attempts = sum(outcomes.values())
+    fallbacks = sum(fallback_reasons.values())
+    upstream = merged.llm_upstream_histograms.get(purpose) or LatencyHistogram()
+    call = merged.llm_call_histograms.get(purpose) or LatencyHistogram()
+    upstream_percentiles = upstream.percentiles_ms((50.0, 95.0, 99.0))
+    call_percentiles = call.percentiles_ms((50.0, 95.0, 99.0))
+    return {
+        "purpose": purpose,
+        "calls": calls,
+        "attempts": attempts,
+        "avg_attempts": round(attempts / upstream_calls, 3) if upstream_calls else 0.0,
+        "attempts_per_call": attempts_per_call,
+        "outcomes": outcomes,
+        "retry_reasons": _labels_for(merged.llm_retries, purpose),
+        "timeouts": outcomes.get("timeout", 0),
+        "parse_failures": outcomes.get("parse_error", 0),
+        "fallbacks": fallbacks,
+        "fallback_rate": round(fallbacks / calls, 4) if calls else 0.0,
+        "fallback_reasons": fallback_reasons,
+        "prompt_tokens": merged.llm_tokens[(purpose, "prompt")],
+        "completion_tokens": merged.llm_tokens[(purpose, "completion")],
+        "upstream_p50_ms": upstream_percentiles[50.0],
+        "upstream_p95_ms": upstream_percentiles[95.0],
+        "upstream_p99_ms": upstream_percentiles[99.0],
+        "upstream_max_ms": round(upstream.max_us / 1000, 3),
+        "call_p50_ms": call_percentiles[50.0],
+        "call_p95_ms": call_percentiles[95.0],
+        "call_p99_ms": call_percentiles[99.0],
+    }
+
+
+def _event_loop_stats(merged: _Shard) -> dict:
+    lag = merged.loop_lag
+    percentiles = lag.percentiles_ms((50.0, 95.0, 99.0))
+    return {
+        "probes": lag.count,
+        "p50_ms": percentiles[50.0],
+        "p95_ms": percentiles[95.0],
+        "p99_ms": percentiles[99.0],
+        "max_ms": round(lag.max_us / 1000, 3),
+        "stalls": merged.loop_stall_count,
+        "recent_stalls": list(reversed(merged.loop_stalls)),
+    }
+
+
+def _labels_for(counter: Counter[tuple[str, str]], purpose: str) -> dict[str, int]:
+    return {
+        label: count
+        for (item_purpose, label), count in sorted(counter.items())
+        if item_purpose == purpose
+    }
+
+
+def _window_item(label: str, window: SlidingWindow, now: float, started_at: datetime) -> dict:
+    requests, errors, slow, latency = window.summary(now)
+    # Shortly after start, rates are over the time actually observed.
+    covered_seconds = max(1.0, min(window.seconds, now - started_at.timestamp()))
+    percentiles = latency.percentiles_ms((50.0, 95.0, 99.0))
+    return {
+        "window": label,
+        "seconds": window.seconds,
+        "requests": requests,
+        "requests_per_second": round(requests / covered_seconds, 3),
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "slow_rate": round(slow / requests, 4) if requests else 0.0,
+        "p50_ms": percentiles[50.0],
+        "p95_ms": percentiles[95.0],
+        "p99_ms": percentiles[99.0],
+    }
+
+
+observability_registry = ObservabilityRegistry()
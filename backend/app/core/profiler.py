@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from types import CodeType, FrameType
+
+from fastapi import HTTPException, status
+
+PROFILE_MODE_THREADS = "threads"
+PROFILE_MODE_TASKS = "tasks"
+PROFILE_MODES = (PROFILE_MODE_THREADS, PROFILE_MODE_TASKS)
+
+# Deepest stack kept per sample; the innermost frames are the ones dropped.
+MAX_STACK_DEPTH = 128
+
+_BACKEND_DIR = Path(__file__).resolve().parents[2]
+_STDLIB_DIR = Path(sysconfig.get_paths()["stdlib"])
+
+
+@dataclass(slots=True)
+class ProfileResult:
+    mode: str
+    seconds: float
+    interval_ms: float
+    samples: int
+    stacks: Counter[str]
+
+    def collapsed(self) -> str:
+        # Brendan Gregg's collapsed format ("root;caller;callee count"), as read
+        # by flamegraph.pl, speedscope and inferno.
+        return "".join(
+            f"{stack} {count}\n"
+            for stack, count in sorted(self.stacks.items(), key=lambda item: (-item[1], item[0]))
+        )
+
+
+@lru_cache(maxsize=4096)
+def short_filename(filename: str) -> str:
+    # Relative to site-packages, the backend or the stdlib, whichever applies.
+    path = Path(filename)
+    if "site-packages" in path.parts:
+        return "/".join(path.parts[path.parts.index("site-packages") + 1 :])
+    if path.is_relative_to(_BACKEND_DIR):
+        return path.relative_to(_BACKEND_DIR).as_posix()
+    if path.is_relative_to(_STDLIB_DIR):
+        return path.relative_to(_STDLIB_DIR).as_posix()
+    return filename
+
+
+def stack_lines(frame: FrameType | None, limit: int = MAX_STACK_DEPTH) -> list[str]:
+    # Outermost first, with the line each frame is executing; the innermost
+    # frames are kept when the stack is deeper than limit.
+    lines = [
+        f"{frame.f_code.co_qualname} ({short_filename(frame.f_code.co_filename)}:{frame.f_lineno})"
+        for frame in _thread_frames(frame)
+    ]
+    return lines[-limit:]
+
+
+@lru_cache(maxsize=4096)
+def _code_label(code: CodeType) -> str:
+    # Function-level (first line) labels, so samples anywhere in a function add up.
+    label = f"{code.co_qualname} ({short_filename(code.co_filename)}:{code.co_firstlineno})"
+    # ";" separates frames in the collapsed format.
+    return label.replace(";", ":")
+
+
+def _collapse(root: str, frames: list[FrameType]) -> str:
+    # frames: outermost first.
+    labels = [root]
+    labels.extend(_code_label(frame.f_code) for frame in frames[:MAX_STACK_DEPTH])
+    return ";".join(labels)
+
+
+def _thread_frames(frame: FrameType | None) -> list[FrameType]:
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class _ThreadSampler:
+    # Samples every thread's Python stack from a daemon thread. Only runs while
+    # a profile is being taken; nothing is hooked into the interpreter, so an
+    # idle profiler costs nothing.
+    def __init__(self, interval_seconds: float) -> None:
+        self._interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="nvc-profiler", daemon=True)
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self._interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                root = names.get(ident, f"thread-{ident}")
+                self.stacks[_collapse(root, _thread_frames(frame))] += 1
+            self.samples += 1
+
+
+def _await_frames(coro) -> list[FrameType]:
+    # Task.get_stack() stops at the outermost frame of a suspended coroutine;
+    # following cr_await (or the generator equivalents) yields the whole chain
+    # down to the innermost await, outermost first.
+    frames = []
+    while coro is not None and len(frames) < MAX_STACK_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        frame = frame or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = (
+            getattr(coro, "cr_await", None)
+            or getattr(coro, "gi_yieldfrom", None)
+            or getattr(coro, "ag_await", None)
+        )
+    return frames
+
+
+def _sample_tasks(stacks: Counter[str]) -> None:
+    # Runs on the event loop, so the task set and coroutine frames are stable.
+    current = asyncio.current_task()
+    for task in asyncio.all_tasks():
+        if task is current or task.done():
+            continue
+        coro = task.get_coro()
+        root = f"task {getattr(coro, '__qualname__', type(coro).__name__)}"
+        stacks[_collapse(root, _await_frames(coro))] += 1
+
+
+class SamplingProfiler:
+    # On-demand statistical profiler for one worker. Thread mode shows where
+    # CPU time goes (including handlers blocking the event loop); task mode
+    # shows where asyncio tasks are parked, sampled on the loop between
+    # callbacks. One profile at a time, and at most one start per
+    # min_interval_seconds, so the endpoint cannot be used to load a worker.
+    def __init__(self, max_seconds: float = 30.0, min_interval_seconds: float = 60.0) -> None:
+        self._lock = threading.Lock()
+        self._max_seconds = max_seconds
+        self._min_interval_seconds = min_interval_seconds
+        self._running = False
+        self._last_started_at: float | None = None
+
+    def configure(
+        self,
+        *,
+        max_seconds: float | None = None,
+        min_interval_seconds: float | None = None,
+    ) -> None:
+        with self._lock:
+            if max_seconds is not None:
+                self._max_seconds = max(0.1, max_seconds)
+            if min_interval_seconds is not None:
+                self._min_interval_seconds = max(0.0, min_interval_seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._last_started_at = None
+
+    @property
+    def max_seconds(self) -> float:
+        return self._max_seconds
+
+    async def profile(self, seconds: float, interval_ms: float, mode: str) -> ProfileResult:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"unknown profile mode {mode!r}")
+        seconds = min(seconds, self._max_seconds)
+        self._acquire()
+        try:
+            if mode == PROFILE_MODE_TASKS:
+                stacks, samples = await self._profile_tasks(seconds, interval_ms / 1000)
+            else:
+                stacks, samples = await self._profile_threads(seconds, interval_ms / 1000)
+        finally:
+            with self._lock:
+                self._running = False
+        return ProfileResult(
+            mode=mode,
+            seconds=seconds,
+            interval_ms=interval_ms,
+            samples=samples,
+            stacks=stacks,
+        )
+
+    def _acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            retry_after = 0.0
+            if self._running:
+                retry_after = 1.0
+            elif self._last_started_at is not None:
+                retry_after = self._last_started_at + self._min_interval_seconds - now
+            if retry_after > 0:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="a profile was taken recently, retry later",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+            self._running = True
+            self._last_started_at = now
+
+    async def _profile_threads(
+        self, seconds: float, interval_seconds: float
+    ) -> tuple[Counter[str], int]:
+        sampler = _ThreadSampler(interval_seconds)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.to_thread(sampler.stop)
+        return sampler.stacks, sampler.samples
+
+    async def _profile_tasks(
+        self, seconds: float, interval_seconds: float
+    ) -> tuple[Counter[str], int]:
+        stacks: Counter[str] = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(interval_seconds)
+            _sample_tasks(stacks)
+            samples += 1
+        return stacks, samples
+
+
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+from app.core.histogram import LatencyHistogram
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request latency "le" bounds in seconds, and the same in microseconds for
+# LatencyHistogram.cumulative_counts.
+LATENCY_BUCKETS_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LATENCY_BUCKETS_US = tuple(int(bound * 1_000_000) for bound in LATENCY_BUCKETS_SECONDS)
+_LATENCY_LE_LABELS = tuple(repr(bound) for bound in LATENCY_BUCKETS_SECONDS)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+@lru_cache(maxsize=8192)
+def format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    # Label sets repeat on every scrape; format and escape each one once.
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self._lines: list[str] = []
+
+    def family(self, name: str, metric_type: str, help_text: str) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name: str, labels: tuple[tuple[str, str], ...], value: float) -> None:
+        self._lines.append(f"{name}{format_labels(labels)} {_format_value(value)}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _write_histograms(
+    writer: _Writer,
+    name: str,
+    help_text: str,
+    label_names: tuple[str, ...],
+    histograms: dict[tuple[str, ...], LatencyHistogram],
+) -> None:
+    writer.family(name, "histogram", help_text)
+    for key, histogram in sorted(histograms.items()):
+        labels = tuple(zip(label_names, key))
+        for le_label, cumulative in zip(
+            _LATENCY_LE_LABELS, histogram.cumulative_counts(LATENCY_BUCKETS_US)
+        ):
+            writer.sample(f"{name}_bucket", labels + (("le", le_label),), cumulative)
+        writer.sample(f"{name}_bucket", labels + (("le", "+Inf"),), histogram.count)
+        writer.sample(f"{name}_sum", labels, histogram.sum_us / 1_000_000)
+        writer.sample(f"{name}_count", labels, histogram.count)
+
+
+def render_prometheus(
+    series: dict,
+    *,
+    caches: dict[str, dict],
+    db_pools: dict[str, dict | None],
+    rate_limit: dict,
+) -> str:
+    writer = _Writer()
+
+    writer.family("nvc_process_start_time_seconds", "gauge", "Metrics registry start time.")
+    writer.sample("nvc_process_start_time_seconds", (), series["started_at"].timestamp())
+
+    writer.family("nvc_http_requests_total", "counter", "Requests by route template and status.")
+    for (method, route, status_code), count in sorted(series["requests"].items()):
+        writer.sample(
+            "nvc_http_requests_total",
+            (("method", method), ("route", route), ("status", str(status_code))),
+            count,
+        )
+
+    writer.family(
+        "nvc_http_slow_requests_total",
+        "counter",
+        "Requests at or above SLOW_REQUEST_MS by route template.",
+    )
+    for (method, route), count in sorted(series["slow_requests"].items()):
+        writer.sample("nvc_http_slow_requests_total", (("method", method), ("route", route)), count)
+
+    _write_histograms(
+        writer,
+        "nvc_http_request_duration_seconds",
+        "Request latency by route template and status class.",
+        ("method", "route", "status_class"),
+        series["latency"],
+    )
+    _write_histograms(
+        writer,
+        "nvc_http_request_stage_duration_seconds",
+        "Time a request spent in each stage (auth, db, llm, analysis).",
+        ("method", "route", "stage"),
+        series["stages"],
+    )
+    writer.family(
+        "nvc_http_request_stage_calls_total",
+        "counter",
+        "Times each stage ran, e.g. DB statements executed.",
+    )
+    for (method, route, stage), count in sorted(series["stage_calls"].items()):
+        writer.sample(
+            "nvc_http_request_stage_calls_total",
+            (("method", method), ("route", route), ("stage", stage)),
+            count,
+        )
+
+    writer.family(
+        "nvc_http_statement_budget_exceeded_total",
+        "counter",
+        "Requests that issued more than SQL_STATEMENT_BUDGET statements.",
+    )
+    for (method, route), count in sorted(series["statement_budget_exceeded"].items()):
+        writer.sample(
+            "nvc_http_statement_budget_exceeded_total",
+            (("method", method), ("route", route)),
+            count,
+        )
+
+    # Statements are labelled by statement_id; /ops/sql-statements maps ids to SQL.
+    _write_histograms(
+        writer,
+        "nvc_db_statement_duration_seconds",
+        "Statement latency by normalized statement.",
+        ("statement_id",),
+        series["statements"],
+    )
+    writer.family(
+        "nvc_db_slow_statements_total",
+        "counter",
+        "Statements at or above SLOW_QUERY_MS by normalized statement.",
+    )
+    for (statement_key,), count in sorted(series["slow_statements"].items()):
+        writer.sample("nvc_db_slow_statements_total", (("statement_id", statement_key),), count)
+
+    writer.family("nvc_llm_calls_total", "counter", "LLM completions requested by purpose.")
+    for purpose, count in sorted(series["llm_calls"].items()):
+        writer.sample("nvc_llm_calls_total", (("purpose", purpose),), count)
+    for metric, key, label, help_text in (
+        (
+            "nvc_llm_attempts_total",
+            "llm_outcomes",
+            "outcome",
+            "Upstream LLM requests by outcome.",
+        ),
+        (
+            "nvc_llm_retries_total",
+            "llm_retries",
+            "reason",
+            "Retried upstream LLM requests by HTTP status or error.",
+        ),
+        (
+            "nvc_llm_fallbacks_total",
+            "llm_fallbacks",
+            "reason",
+            "LLM completions answered with canned text instead, by reason.",
+        ),
+        ("nvc_llm_tokens_total", "llm_tokens", "kind", "LLM tokens reported by the provider."),
+    ):
+        writer.family(metric, "counter", help_text)
+        for (purpose, value), count in sorted(series[key].items()):
+            writer.sample(metric, (("purpose", purpose), (label, value)), count)
+    _write_histograms(
+        writer,
+        "nvc_llm_upstream_duration_seconds",
+        "Single upstream LLM request latency by purpose.",
+        ("purpose",),
+        series["llm_upstream"],
+    )
+    _write_histograms(
+        writer,
+        "nvc_llm_call_duration_seconds",
+        "LLM completion latency by purpose, including retries and backoff.",
+        ("purpose",),
+        series["llm_call"],
+    )
+
+    _write_histograms(
+        writer,
+        "nvc_event_loop_lag_seconds",
+        "How late the event-loop probe woke up, per probe.",
+        (),
+        series["event_loop_lag"],
+    )
+    writer.family(
+        "nvc_event_loop_stalls_total",
+        "counter",
+        "Event-loop lag at or above EVENT_LOOP_STALL_MS.",
+    )
+    writer.sample("nvc_event_loop_stalls_total", (), series["event_loop_stalls"])
+
+    writer.family("nvc_db_pool_connections", "gauge", "Pooled DB connections by state.")
+    for engine_name, stats in db_pools.items():
+        if stats is None:
+            continue
+        for state in ("checked_out", "checked_in", "overflow"):
+            writer.sample(
+                "nvc_db_pool_connections",
+                (("engine", engine_name), ("state", state)),
+                stats[state],
+            )
+    writer.family("nvc_db_pool_size", "gauge", "Configured DB pool size.")
+    for engine_name, stats in db_pools.items():
+        if stats is not None:
+            writer.sample("nvc_db_pool_size", (("engine", engine_name),), stats["size"])
+
+    writer.family("nvc_cache_entries", "gauge", "Entries held by in-process caches.")
+    for cache_name, stats in caches.items():
+        writer.sample("nvc_cache_entries", (("cache", cache_name),), stats["size"])
+    for metric, key, help_text in (
+        ("nvc_cache_hits_total", "hits", "In-process cache hits."),
+        ("nvc_cache_misses_total", "misses", "In-process cache misses."),
+        ("nvc_cache_evictions_total", "evictions", "In-process cache LRU evictions."),
+    ):
+        writer.family(metric, "counter", help_text)
+        for cache_name, stats in caches.items():
+            writer.sample(metric, (("cache", cache_name),), stats[key])
+
+    writer.family("nvc_rate_limit_enabled", "gauge", "1 when rate limiting is enforced.")
+    writer.sample(
+        "nvc_rate_limit_enabled",
+        (("backend", rate_limit["backend"]),),
+        rate_limit["enabled"],
+    )
+    writer.family("nvc_rate_limit_allowed_total", "counter", "Rate-limited requests allowed.")
+    for route, count in rate_limit["allowed"].items():
+        writer.sample("nvc_rate_limit_allowed_total", (("route", route),), count)
+    writer.family(
+        "nvc_rate_limit_rejected_total",
+        "counter",
+        "Requests rejected with 429 by route and bucket scope.",
+    )
+    for route_scope, count in rate_limit["rejected"].items():
+        route, _, scope = route_scope.rpartition(":")
+        writer.sample("nvc_rate_limit_rejected_total", (("route", route), ("scope", scope)), count)
+    writer.family(
+        "nvc_rate_limit_backend_errors_total",
+        "counter",
+        "Rate limit checks skipped because the backend was unavailable.",
+    )
+    writer.sample("nvc_rate_limit_backend_errors_total", (), rate_limit["backend_errors"])
+
+    return writer.render()
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import logging
+import math
+from collections import Counter, OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from threading import Lock
+from time import monotonic
+from typing import Protocol
+from uuid import UUID
+
+from sqlalchemy import text
+
+from app.core.config import RATE_LIMIT_PATTERN, settings
+from app.db import session as db_session
+
+logger = logging.getLogger("nvc.rate_limit")
+
+ROUTE_SESSION_MESSAGE = "session_message"
+ROUTE_SESSION_REWRITE = "session_rewrite"
+
+SCOPE_USER = "user"
+SCOPE_GLOBAL = "global"
+
+BACKEND_MEMORY = "memory"
+BACKEND_POSTGRES = "postgres"
+
+_UNIT_SECONDS = {"s": 1, "min": 60, "h": 3600}
+
+# Upper bound on buckets held per process; an evicted bucket is full again.
+MAX_MEMORY_BUCKETS = 100000
+
+
+@dataclass(frozen=True, slots=True)
+class TokenBucketRule:
+    capacity: int
+    period_seconds: int
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+
+@dataclass(frozen=True, slots=True)
+class RoutePolicy:
+    user_rule: TokenBucketRule | None
+    global_rule: TokenBucketRule | None
+
+
+@dataclass(frozen=True, slots=True)
+class AcquireResult:
+    allowed: bool
+    tokens: tuple[float, ...]
+    retry_after_seconds: float
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitDecision:
+    allowed: bool
+    scope: str
+    limit: int
+    period_seconds: int
+    remaining: int
+    reset_seconds: int
+    retry_after_seconds: int
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset_seconds),
+            "RateLimit-Policy": f"{self.limit};w={self.period_seconds}",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after_seconds)
+        return headers
+
+
+class RateLimitBackend(Protocol):
+    name: str
+
+    async def acquire(
+        self,
+        keys: list[str],
+        rules: list[TokenBucketRule],
+        cost: float = 1.0,
+    ) -> AcquireResult: ...
+
+
+def parse_rate_limit(value: str) -> TokenBucketRule | None:
+    if not value:
+        return None
+    match = RATE_LIMIT_PATTERN.fullmatch(value)
+    if match is None:
+        raise ValueError(f"invalid rate limit {value!r}, expected e.g. '20/min'")
+    return TokenBucketRule(
+        capacity=int(match["count"]),
+        period_seconds=_UNIT_SECONDS[match["unit"]],
+    )
+
+
+class MemoryRateLimitBackend:
+    # Per-process buckets: with several workers each one enforces the limits
+    # separately, so use the postgres backend when that matters.
+    name = BACKEND_MEMORY
+
+    def __init__(
+        self,
+        *,
+        max_buckets: int = MAX_MEMORY_BUCKETS,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self._lock = Lock()
+        self._clock = clock
+        self._max_buckets = max(1, max_buckets)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def acquire(
+        self,
+        keys: list[str],
+        rules: list[TokenBucketRule],
+        cost: float = 1.0,
+    ) -> AcquireResult:
+        with self._lock:
+            now = self._clock()
+            available: list[float] = []
+            for key, rule in zip(keys, rules):
+                entry = self._buckets.get(key)
+                if entry is None:
+                    available.append(float(rule.capacity))
+                    continue
+                stored, updated_at = entry
+                refilled = stored + max(0.0, now - updated_at) * rule.refill_per_second
+                available.append(min(float(rule.capacity), refilled))
+
+            retry_after = max(
+                (
+                    (cost - tokens) / rule.refill_per_second
+                    for tokens, rule in zip(available, rules)
+                    if tokens < cost
+                ),
+                default=0.0,
+            )
+            allowed = all(tokens >= cost for tokens in available)
+            if allowed:
+                # All-or-nothing: a call rejected by one bucket spends no tokens.
+                available = [tokens - cost for tokens in available]
+                for key, tokens in zip(keys, available):
+                    self._buckets[key] = (tokens, now)
+                    self._buckets.move_to_end(key)
+                while len(self._buckets) > self._max_buckets:
+                    self._buckets.popitem(last=False)
+            return AcquireResult(
+                allowed=allowed,
+                tokens=tuple(available),
+                retry_after_seconds=retry_after,
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class PostgresRateLimitBackend:
+    # Buckets shared by every worker through rate_limit_acquire (migration
+    # 0011): one statement, on its own short transaction, per checked request.
+    name = BACKEND_POSTGRES
+
+    async def acquire(
+        self,
+        keys: list[str],
+        rules: list[TokenBucketRule],
+        cost: float = 1.0,
+    ) -> AcquireResult:
+        async with db_session.engine.begin() as conn:
+            row = (
+                await conn.execute(
+                    text(
+                        """
+                        SELECT allowed, tokens, retry_after_seconds
+                        FROM public.rate_limit_acquire(
+                          CAST(:keys AS TEXT[]),
+                          CAST(:capacities AS DOUBLE PRECISION[]),
+                          CAST(:refill_per_second AS DOUBLE PRECISION[]),
+                          :cost
+                        )
+                        """
+                    ),
+                    {
+                        "keys": keys,
+                        "capacities": [float(rule.capacity) for rule in rules],
+                        "refill_per_second": [rule.refill_per_second for rule in rules],
+                        "cost": cost,
+                    },
+                )
+            ).one()
+        return AcquireResult(
+            allowed=bool(row.allowed),
+            tokens=tuple(float(tokens) for tokens in row.tokens),
+            retry_after_seconds=float(row.retry_after_seconds),
+        )
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        *,
+        enabled: bool,
+        policies: dict[str, RoutePolicy],
+        backend: RateLimitBackend,
+    ) -> None:
+        self._lock = Lock()
+        self._enabled = enabled
+        self._policies = dict(policies)
+        self._backend = backend
+        self._allowed: Counter[str] = Counter()
+        self._rejected: Counter[str] = Counter()
+        self._backend_errors = 0
+
+    def configure(
+        self,
+        *,
+        enabled: bool | None = None,
+        policies: dict[str, RoutePolicy] | None = None,
+        backend: RateLimitBackend | None = None,
+    ) -> None:
+        with self._lock:
+            if enabled is not None:
+                self._enabled = enabled
+            if policies is not None:
+                self._policies = dict(policies)
+            if backend is not None:
+                self._backend = backend
+
+    def reset(self) -> None:
+        reset_backend = getattr(self._backend, "reset", None)
+        if reset_backend is not None:
+            reset_backend()
+        with self._lock:
+            self._allowed.clear()
+            self._rejected.clear()
+            self._backend_errors = 0
+
+    async def check(self, route: str, user_id: UUID) -> RateLimitDecision | None:
+        policy = self._policies.get(route)
+        if not self._enabled or policy is None:
+            return None
+        buckets: list[tuple[str, TokenBucketRule, str]] = []
+        if policy.user_rule is not None:
+            buckets.append((f"{route}:{SCOPE_USER}:{user_id}", policy.user_rule, SCOPE_USER))
+        if policy.global_rule is not None:
+            buckets.append((f"{route}:{SCOPE_GLOBAL}", policy.global_rule, SCOPE_GLOBAL))
+        if not buckets:
+            return None
+        # A stable key order keeps the shared backend's row locks deadlock-free.
+        buckets.sort(key=lambda bucket: bucket[0])
+
+        try:
+            result = await self._backend.acquire(
+                [key for key, _, _ in buckets],
+                [rule for _, rule, _ in buckets],
+            )
+        except Exception:
+            # Fail open: an unavailable limiter store must not take the API down.
+            with self._lock:
+                self._backend_errors += 1
+            logger.warning("rate limit backend unavailable, allowing request", exc_info=True)
+            return None
+
+        decision = _decision_from(result, buckets)
+        with self._lock:
+            if decision.allowed:
+                self._allowed[route] += 1
+            else:
+                self._rejected[f"{route}:{decision.scope}"] += 1
+        return decision
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self._enabled,
+                "backend": self._backend.name,
+                "allowed": dict(sorted(self._allowed.items())),
+                "rejected": dict(sorted(self._rejected.items())),
+                "backend_errors": self._backend_errors,
+            }
+
+
+def _decision_from(
+    result: AcquireResult,
+    buckets: list[tuple[str, TokenBucketRule, str]],
+) -> RateLimitDecision:
+    # RateLimit-* describe a single quota: the one that blocked the request,
+    # otherwise the one closest to running out.
+    if result.allowed:
+        index = min(
+            range(len(buckets)),
+            key=lambda i: result.tokens[i] / buckets[i][1].capacity,
+        )
+    else:
+        index = max(
+            range(len(buckets)),
+            key=lambda i: (1.0 - result.tokens[i]) / buckets[i][1].refill_per_second,
+        )
+    _, rule, scope = buckets[index]
+    tokens = max(0.0, result.tokens[index])
+    return RateLimitDecision(
+        allowed=result.allowed,
+        scope=scope,
+        limit=rule.capacity,
+        period_seconds=rule.period_seconds,
+        remaining=math.floor(tokens),
+        reset_seconds=math.ceil((rule.capacity - tokens) / rule.refill_per_second),
+        retry_after_seconds=max(1, math.ceil(result.retry_after_seconds)),
+    )
+
+
+def rate_limit_policies_from_settings() -> dict[str, RoutePolicy]:
+    return {
+        ROUTE_SESSION_MESSAGE: RoutePolicy(
+            user_rule=parse_rate_limit(settings.rate_limit_message_user),
+            global_rule=parse_rate_limit(settings.rate_limit_message_global),
+        ),
+        ROUTE_SESSION_REWRITE: RoutePolicy(
+            user_rule=parse_rate_limit(settings.rate_limit_rewrite_user),
+            global_rule=parse_rate_limit(settings.rate_limit_rewrite_global),
+        ),
+    }
+
+
+def rate_limit_backend_from_settings() -> RateLimitBackend:
+    if settings.rate_limit_backend == BACKEND_POSTGRES:
+        return PostgresRateLimitBackend()
+    return MemoryRateLimitBackend()
+
+
+rate_limiter = RateLimiter(
+    enabled=settings.rate_limit_enabled,
+    policies=rate_limit_policies_from_settings(),
+    backend=rate_limit_backend_from_settings(),
+)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from time import perf_counter
+
+from app.core.statements import normalize_statement
+
+STAGE_AUTH = "auth"
+STAGE_DB = "db"
+STAGE_LLM = "llm"
+STAGE_ANALYSIS = "analysis"
+
+# Per-request detail kept for slow-request exemplars; beyond this many
+# statements only the count of dropped ones is kept.
+MAX_TRACED_STATEMENTS = 50
+MAX_STATEMENT_CHARS = 500
+
+
+class RequestTrace:
+    # One per request, set by the request middleware. Tasks and threads spawned
+    # while handling the request copy the context but share this object, so
+    # stages recorded anywhere below the middleware land here. Detail for
+    # exemplars is appended as raw tuples and only formatted by exemplar(),
+    # which the middleware calls for slow requests alone.
+    __slots__ = (
+        "cache_lookups",
+        "llm_attempts",
+        "request_id",
+        "stages",
+        "statements",
+        "statements_dropped",
+    )
+
+    def __init__(self, request_id: str = "") -> None:
+        self.request_id = request_id
+        # stage name -> [total milliseconds, calls]
+        self.stages: dict[str, list[float]] = {}
+        # (statement, milliseconds, rowcount)
+        self.statements: list[tuple[str, float, int]] = []
+        self.statements_dropped = 0
+        # (attempt, outcome, status code, milliseconds)
+        self.llm_attempts: list[tuple[int, str, int | None, float]] = []
+        # cache name -> [hits, misses]
+        self.cache_lookups: dict[str, list[int]] = {}
+
+    def record(self, stage: str, duration_ms: float) -> None:
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [duration_ms, 1]
+        else:
+            entry[0] += duration_ms
+            entry[1] += 1
+
+    def add_statement(self, statement: str, duration_ms: float, rowcount: int) -> None:
+        if len(self.statements) < MAX_TRACED_STATEMENTS:
+            self.statements.append((statement, duration_ms, rowcount))
+        else:
+            self.statements_dropped += 1
+
+    def add_cache_lookup(self, cache: str, hit: bool) -> None:
+        entry = self.cache_lookups.get(cache)
+        if entry is None:
+            entry = self.cache_lookups[cache] = [0, 0]
+        entry[0 if hit else 1] += 1
+
+    def exemplar(self) -> dict:
+        return {
+            "stages": self.stage_summary(),
+            "statements": [
+                {
+                    "statement": " ".join(statement.split())[:MAX_STATEMENT_CHARS],
+                    "duration_ms": round(duration_ms, 2),
+                    "rows": rowcount if rowcount >= 0 else None,
+                }
+                for statement, duration_ms, rowcount in self.statements
+            ],
+            "statements_dropped": self.statements_dropped,
+            "llm_attempts": [
+                {
+                    "attempt": attempt,
+                    "outcome": outcome,
+                    "status_code": status_code,
+                    "duration_ms": round(duration_ms, 2),
+                }
+                for attempt, outcome, status_code, duration_ms in self.llm_attempts
+            ],
+            "cache": {
+                cache: {"hits": hits, "misses": misses}
+                for cache, (hits, misses) in self.cache_lookups.items()
+            },
+        }
+
+    @property
+    def statement_count(self) -> int:
+        entry = self.stages.get(STAGE_DB)
+        return int(entry[1]) if entry is not None else 0
+
+    def repeated_statements(self, limit: int = 3) -> list[dict]:
+        # Most frequent query shapes among the kept statements; a shape issued
+        # once per row of an earlier result is the usual N+1 culprit.
+        counts = Counter(normalize_statement(statement) for statement, _, _ in self.statements)
+        return [
+            {"statement": statement, "count": count}
+            for statement, count in counts.most_common(limit)
+            if count > 1
+        ]
+
+    def stage_summary(self) -> dict[str, dict]:
+        return {
+            stage: {"ms": round(total_ms, 2), "count": int(calls)}
+            for stage, (total_ms, calls) in self.stages.items()
+        }
+
+    def server_timing(self, total_ms: float) -> str:
+        # Stages can overlap (DB time inside auth) and need not add up to total.
+        entries = [f"{stage};dur={stage_ms:.1f}" for stage, (stage_ms, _) in self.stages.items()]
+        entries.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[RequestTrace | None] = ContextVar("nvc_request_trace", default=None)
+
+
+def begin_request_trace(request_id: str = "") -> tuple[RequestTrace, Token]:
+    trace = RequestTrace(request_id)
+    return trace, _current_trace.set(trace)
+
+
+def end_request_trace(token: Token) -> None:
+    _current_trace.reset(token)
+
+
+def current_trace() -> RequestTrace | None:
+    return _current_trace.get()
+
+
+def record_stage(stage: str, duration_ms: float) -> None:
+    # A no-op outside a request (scripts, background flushes).
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(stage, duration_ms)
+
+
+def record_statement(statement: str, duration_ms: float, rowcount: int) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(STAGE_DB, duration_ms)
+        trace.add_statement(statement, duration_ms, rowcount)
+
+
+def record_llm_attempt(
+    attempt: int,
+    outcome: str,
+    status_code: int | None,
+    duration_ms: float,
+) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.llm_attempts.append((attempt, outcome, status_code, duration_ms))
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_cache_lookup(cache, hit)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started_at = perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(stage, (perf_counter() - started_at) * 1000)
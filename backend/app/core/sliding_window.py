@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from array import array
+
+from app.core.histogram import LatencyHistogram
+
+# (label, slot seconds, slot count): one ring per reported window.
+WINDOWS = (
+    ("1m", 1, 60),
+    ("5m", 5, 60),
+    ("1h", 60, 60),
+)
+
+
+class SlidingWindow:
+    # A ring of fixed-width time slots. A slot is identified by its epoch (wall
+    # clock seconds // slot width), so rings from different processes line up
+    # and merge slot by slot; a stale slot is cleared when its index comes round
+    # again. Slot histograms are allocated on first use and then reused.
+    __slots__ = (
+        "_counts",
+        "_epochs",
+        "_errors",
+        "_histograms",
+        "_slow",
+        "slot_count",
+        "slot_seconds",
+    )
+
+    def __init__(self, slot_seconds: int, slot_count: int) -> None:
+        self.slot_seconds = slot_seconds
+        self.slot_count = slot_count
+        self._epochs = array("q", [-1]) * slot_count
+        self._counts = array("q", bytes(8 * slot_count))
+        self._errors = array("q", bytes(8 * slot_count))
+        self._slow = array("q", bytes(8 * slot_count))
+        self._histograms: list[LatencyHistogram | None] = [None] * slot_count
+
+    @property
+    def seconds(self) -> int:
+        return self.slot_seconds * self.slot_count
+
+    def record(self, now: float, latency_ms: float, *, is_error: bool, is_slow: bool) -> None:
+        epoch = int(now // self.slot_seconds)
+        index = self._slot_for(epoch)
+        self._counts[index] += 1
+        if is_error:
+            self._errors[index] += 1
+        if is_slow:
+            self._slow[index] += 1
+        histogram = self._histograms[index]
+        if histogram is None:
+            histogram = self._histograms[index] = LatencyHistogram()
+        histogram.record(latency_ms)
+
+    def merge(self, other: SlidingWindow) -> None:
+        # Newer slots win; equal epochs add up; older ones are already stale.
+        for index, epoch in enumerate(other._epochs):
+            if epoch < 0 or not other._counts[index] or epoch < self._epochs[index]:
+                continue
+            self._slot_for(epoch)
+            self._counts[index] += other._counts[index]
+            self._errors[index] += other._errors[index]
+            self._slow[index] += other._slow[index]
+            histogram = self._histograms[index]
+            if histogram is None:
+                self._histograms[index] = other._histograms[index].copy()
+            else:
+                histogram.merge(other._histograms[index])
+
+    def summary(self, now: float) -> tuple[int, int, int, LatencyHistogram]:
+        # (requests, errors, slow, latency) over the slots still inside the window.
+        current = int(now // self.slot_seconds)
+        requests = errors = slow = 0
+        latency = LatencyHistogram()
+        for index, epoch in enumerate(self._epochs):
+            if not current - self.slot_count < epoch <= current or not self._counts[index]:
+                continue
+            requests += self._counts[index]
+            errors += self._errors[index]
+            slow += self._slow[index]
+            latency.merge(self._histograms[index])
+        return requests, errors, slow, latency
+
+    def to_state(self) -> list[list]:
+        return [
+            [
+                epoch,
+                self._counts[index],
+                self._errors[index],
+                self._slow[index],
+                self._histograms[index].to_dict(),
+            ]
+            for index, epoch in enumerate(self._epochs)
+            if epoch >= 0 and self._counts[index]
+        ]
+
+    @classmethod
+    def from_state(cls, slot_seconds: int, slot_count: int, state: list[list]) -> SlidingWindow:
+        window = cls(slot_seconds, slot_count)
+        for epoch, count, errors, slow, histogram in state:
+            index = window._slot_for(int(epoch))
+            window._counts[index] = int(count)
+            window._errors[index] = int(errors)
+            window._slow[index] = int(slow)
+            window._histograms[index] = LatencyHistogram.from_dict(histogram)
+        return window
+
+    def _slot_for(self, epoch: int) -> int:
+        index = epoch % self.slot_count
+        if self._epochs[index] != epoch:
+            self._epochs[index] = epoch
+            self._counts[index] = 0
+            self._errors[index] = 0
+            self._slow[index] = 0
+            histogram = self._histograms[index]
+            if histogram is not None:
+                histogram.clear()
+        return index
+
+
+def new_windows() -> tuple[SlidingWindow, ...]:
+    return tuple(SlidingWindow(slot_seconds, slot_count) for _, slot_seconds, slot_count in WINDOWS)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from functools import lru_cache
+
+# Normalized statements are kept to this length in metrics and logs.
+MAX_NORMALIZED_CHARS = 500
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_BIND_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_REPEATED_LISTS = re.compile(r"\(\?, \.\.\.\)(?:\s*,\s*\(\?, \.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_statement(statement: str) -> str:
+    # One fingerprint per query shape: literals and bind parameters become "?",
+    # and IN lists or multi-row VALUES of any length collapse to one entry, so
+    # a loop issuing the same query with different ids is counted as one.
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _BIND_PARAMETER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(?, ...)", normalized)
+    normalized = _REPEATED_LISTS.sub("(?, ...), ...", normalized)
+    return normalized[:MAX_NORMALIZED_CHARS]
+
+
+@lru_cache(maxsize=1024)
+def statement_id(normalized: str) -> str:
+    # Short stable label for exporters that should not carry SQL text.
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
@@ -1,15 +1,25 @@
+import hashlib
+import time
 from uuid import UUID
 
-import httpx
 import jwt
 from fastapi import HTTPException, status
-from jwt import PyJWKClient
 
+from app.core.cache import LruTtlCache
 from app.core.config import settings
+from app.core.jwks import JwksManager
 from app.core.security import AuthUser, extract_bearer_token
+from app.core.supabase_user import supabase_user_fallback
 
 SUPPORTED_JWT_ALGS = ["RS256", "ES256", "EdDSA"]
-_jwks_client: PyJWKClient | None = None
+
+# Keyed by a SHA-256 of the token so raw bearer tokens are never retained.
+# A Supabase JWT cannot be revoked before exp anyway, so caching the verified
+# user until then (less skew) accepts exactly what jwt.decode would accept.
+auth_claims_cache: LruTtlCache[bytes, AuthUser] = LruTtlCache(
+    max_entries=max(1, settings.auth_claims_cache_size),
+    name="auth_claims",
+)
 
 
 def _resolve_issuer() -> str:
@@ -27,11 +37,13 @@ def _resolve_jwks_url() -> str:
     return f"{_resolve_issuer()}/.well-known/jwks.json"
 
 
-def _get_jwks_client() -> PyJWKClient:
-    global _jwks_client
-    if _jwks_client is None:
-        _jwks_client = PyJWKClient(_resolve_jwks_url())
-    return _jwks_client
+# Verification only ever reads keys from memory; network I/O happens in the
+# startup prefetch, the scheduled refresh, or one shared fetch per unknown kid.
+jwks_manager = JwksManager(
+    url_resolver=_resolve_jwks_url,
+    refresh_interval_seconds=settings.jwks_refresh_interval_seconds,
+    min_refresh_interval_seconds=settings.jwks_min_refresh_interval_seconds,
+)
 
 
 def _auth_user_from_claims(claims: dict) -> AuthUser:
@@ -61,10 +73,28 @@ def _auth_user_from_claims(claims: dict) -> AuthUser:
     )
 
 
-def _decode_token_with_jwks(token: str) -> AuthUser:
+def _claims_cache_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def _get_cached_auth_user(token: str) -> AuthUser | None:
+    if settings.auth_claims_cache_size <= 0:
+        return None
+    return auth_claims_cache.get(_claims_cache_key(token))
+
+
+def _cache_auth_user(token: str, user: AuthUser, exp: float) -> None:
+    if settings.auth_claims_cache_size <= 0:
+        return
+    ttl_seconds = exp - time.time() - settings.auth_claims_cache_skew_seconds
+    if ttl_seconds > 0:
+        auth_claims_cache.set(_claims_cache_key(token), user, ttl_seconds=ttl_seconds)
+
+
+async def _decode_token_with_jwks(token: str) -> AuthUser:
     issuer = _resolve_issuer()
-    jwk_client = _get_jwks_client()
-    signing_key = jwk_client.get_signing_key_from_jwt(token)
+    header = jwt.get_unverified_header(token)
+    signing_key = await jwks_manager.get_signing_key(header.get("kid"))
     claims = jwt.decode(
         token,
         signing_key.key,
@@ -73,7 +103,9 @@ def _decode_token_with_jwks(token: str) -> AuthUser:
         issuer=issuer,
         options={"require": ["sub", "exp", "iat"]},
     )
-    return _auth_user_from_claims(claims)
+    user = _auth_user_from_claims(claims)
+    _cache_auth_user(token, user, float(claims["exp"]))
+    return user
 
 
 async def _fetch_user_from_supabase(token: str) -> AuthUser:
@@ -85,56 +117,19 @@ async def _fetch_user_from_supabase(token: str) -> AuthUser:
 
     url = f"{settings.supabase_url.rstrip('/')}/auth/v1/user"
     apikey = settings.supabase_anon_key or settings.supabase_service_role_key
-    headers = {"Authorization": f"Bearer {token}"}
-    if apikey:
-        headers["apikey"] = apikey
-
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, headers=headers)
-    except httpx.HTTPError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="failed to validate access token",
-        ) from exc
-
-    if response.status_code != status.HTTP_200_OK:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="invalid or expired access token",
-        )
-
-    payload = response.json()
-    user_id_raw = payload.get("id")
-    try:
-        user_id = UUID(user_id_raw)
-    except (TypeError, ValueError) as exc:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="invalid access token subject",
-        ) from exc
-
-    user_metadata = payload.get("user_metadata")
-    display_name = (
-        user_metadata.get("full_name")
-        if isinstance(user_metadata, dict)
-        else None
-    )
-    email = payload.get("email")
-
-    return AuthUser(
-        user_id=user_id,
-        email=email if isinstance(email, str) else None,
-        display_name=display_name if isinstance(display_name, str) else None,
-    )
+    return await supabase_user_fallback.fetch_user(token, url=url, apikey=apikey)
 
 
 async def verify_supabase_access_token(authorization: str | None) -> AuthUser:
     token = extract_bearer_token(authorization)
 
+    cached_user = _get_cached_auth_user(token)
+    if cached_user is not None:
+        return cached_user
+
     # First attempt: local JWT verification using Supabase JWKS.
     try:
-        return _decode_token_with_jwks(token)
+        return await _decode_token_with_jwks(token)
     except Exception:
         # Fallback: remote validation via Supabase user endpoint.
         return await _fetch_user_from_supabase(token)
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import time
+from collections import Counter
+from collections.abc import Callable
+from threading import Lock
+from time import monotonic
+from uuid import UUID
+
+import httpx
+import jwt
+from fastapi import HTTPException, status
+
+from app.core.cache import LruTtlCache
+from app.core.config import settings
+from app.core.security import AuthUser
+
+OUTCOME_CACHE_HIT = "cache_hit"
+OUTCOME_NEGATIVE_HIT = "negative_hit"
+OUTCOME_VERIFIED = "verified"
+OUTCOME_REJECTED = "rejected"
+OUTCOME_ERROR = "error"
+OUTCOME_CIRCUIT_OPEN = "circuit_open"
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+USER_ENDPOINT_TIMEOUT_SECONDS = 10.0
+# Upper bound on tokens remembered per process, for each of the two caches.
+MAX_CACHED_TOKENS = 10000
+
+# These mean "try again later", not "this token is bad".
+_TRANSIENT_STATUSES = {408, 425, 429}
+
+
+class SupabaseUserFallback:
+    def __init__(
+        self,
+        *,
+        cache_ttl_seconds: float,
+        negative_ttl_seconds: float,
+        failure_threshold: int,
+        open_seconds: float,
+        clock: Callable[[], float] = monotonic,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self._lock = Lock()
+        self._clock = clock
+        self._transport = transport
+        self._cache_ttl_seconds = max(0.0, cache_ttl_seconds)
+        self._negative_ttl_seconds = max(0.0, negative_ttl_seconds)
+        self._failure_threshold = max(1, failure_threshold)
+        self._open_seconds = max(1.0, open_seconds)
+        self._users: LruTtlCache[bytes, AuthUser] = LruTtlCache(
+            max_entries=MAX_CACHED_TOKENS, clock=clock, name="supabase_user"
+        )
+        self._rejections: LruTtlCache[bytes, bool] = LruTtlCache(
+            max_entries=MAX_CACHED_TOKENS, clock=clock, name="supabase_user_rejections"
+        )
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._probe_started_at: float | None = None
+        self._circuit_opens = 0
+        self._outcomes: Counter[str] = Counter()
+
+    def configure(
+        self,
+        *,
+        cache_ttl_seconds: float | None = None,
+        negative_ttl_seconds: float | None = None,
+        failure_threshold: int | None = None,
+        open_seconds: float | None = None,
+    ) -> None:
+        with self._lock:
+            if cache_ttl_seconds is not None:
+                self._cache_ttl_seconds = max(0.0, cache_ttl_seconds)
+            if negative_ttl_seconds is not None:
+                self._negative_ttl_seconds = max(0.0, negative_ttl_seconds)
+            if failure_threshold is not None:
+                self._failure_threshold = max(1, failure_threshold)
+            if open_seconds is not None:
+                self._open_seconds = max(1.0, open_seconds)
+
+    def reset(self) -> None:
+        self._users.clear()
+        self._rejections.clear()
+        with self._lock:
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+            self._probe_started_at = None
+            self._circuit_opens = 0
+            self._outcomes.clear()
+
+    async def close(self) -> None:
+        client = self._client
+        client_loop = self._client_loop
+        self._client = None
+        self._client_loop = None
+        if (
+            client is not None
+            and not client.is_closed
+            and client_loop is asyncio.get_running_loop()
+        ):
+            await client.aclose()
+
+    async def fetch_user(self, token: str, *, url: str, apikey: str | None) -> AuthUser:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        if self._cache_ttl_seconds > 0:
+            cached_user = self._users.get(key)
+            if cached_user is not None:
+                self._count(OUTCOME_CACHE_HIT)
+                return cached_user
+        if self._negative_ttl_seconds > 0 and self._rejections.get(key):
+            self._count(OUTCOME_NEGATIVE_HIT)
+            raise _invalid_token_error()
+
+        retry_after = self._acquire()
+        probe_started_at = self._probe_started_at
+        if retry_after is not None:
+            # Supabase is failing; answer now instead of queueing on its timeout.
+            self._count(OUTCOME_CIRCUIT_OPEN)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="authentication service unavailable",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+        headers = {"Authorization": f"Bearer {token}"}
+        if apikey:
+            headers["apikey"] = apikey
+        try:
+            response = await self._get_client().get(url, headers=headers)
+        except httpx.HTTPError as exc:
+            self._record_failure()
+            raise _validation_failed_error() from exc
+        except BaseException:
+            # Cancelled mid-call: free the half-open probe slot for the next request.
+            self._release_probe(probe_started_at)
+            raise
+
+        if response.status_code >= 500 or response.status_code in _TRANSIENT_STATUSES:
+            self._record_failure()
+            raise _validation_failed_error()
+        self._record_success()
+
+        if response.status_code != status.HTTP_200_OK:
+            self._count(OUTCOME_REJECTED)
+            if self._negative_ttl_seconds > 0:
+                self._rejections.set(key, True, ttl_seconds=self._negative_ttl_seconds)
+            raise _invalid_token_error()
+
+        user = _auth_user_from_payload(response.json())
+        self._count(OUTCOME_VERIFIED)
+        ttl_seconds = self._positive_ttl_seconds(token)
+        if ttl_seconds > 0:
+            self._users.set(key, user, ttl_seconds=ttl_seconds)
+        return user
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "circuit_state": self._state_locked(),
+                "consecutive_failures": self._consecutive_failures,
+                "circuit_opens": self._circuit_opens,
+                "outcomes": {
+                    outcome: count for outcome, count in sorted(self._outcomes.items()) if count
+                },
+                "cached_users": self._users.stats()["size"],
+                "cached_rejections": self._rejections.stats()["size"],
+            }
+
+    def _positive_ttl_seconds(self, token: str) -> float:
+        # Never serve a cached user past the token's own exp. Supabase has just
+        # accepted the token, so reading exp without the signature is safe here.
+        ttl_seconds = self._cache_ttl_seconds
+        try:
+            exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except jwt.PyJWTError:
+            return ttl_seconds
+        if isinstance(exp, (int, float)):
+            ttl_seconds = min(ttl_seconds, exp - time.time())
+        return ttl_seconds
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Pooled keep-alive connections, bound to the loop that created them.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=USER_ENDPOINT_TIMEOUT_SECONDS,
+                transport=self._transport,
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _acquire(self) -> float | None:
+        # Returns None when the call may proceed, otherwise seconds until retry.
+        with self._lock:
+            now = self._clock()
+            if self._open_until == 0.0:
+                return None
+            if now < self._open_until:
+                return self._open_until - now
+            # Half-open: one probe at a time; a probe that never reported back
+            # (e.g. the request was cancelled) is replaced after open_seconds.
+            if (
+                self._probe_started_at is not None
+                and now - self._probe_started_at < self._open_seconds
+            ):
+                return self._open_seconds - (now - self._probe_started_at)
+            self._probe_started_at = now
+            return None
+
+    def _record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+            self._probe_started_at = None
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._outcomes[OUTCOME_ERROR] += 1
+            self._consecutive_failures += 1
+            half_open = self._probe_started_at is not None
+            self._probe_started_at = None
+            if half_open or self._consecutive_failures >= self._failure_threshold:
+                self._open_until = self._clock() + self._open_seconds
+                self._circuit_opens += 1
+
+    def _release_probe(self, started_at: float | None) -> None:
+        with self._lock:
+            if started_at is not None and self._probe_started_at == started_at:
+                self._probe_started_at = None
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self._outcomes[outcome] += 1
+
+    def _state_locked(self) -> str:
+        if self._open_until == 0.0:
+            return STATE_CLOSED
+        if self._clock() < self._open_until:
+            return STATE_OPEN
+        return STATE_HALF_OPEN
+
+
+def _invalid_token_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="invalid or expired access token",
+    )
+
+
+def _validation_failed_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="failed to validate access token",
+    )
+
+
+def _auth_user_from_payload(payload: dict) -> AuthUser:
+    user_id_raw = payload.get("id")
+    try:
+        user_id = UUID(user_id_raw)
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="invalid access token subject",
+        ) from exc
+
+    user_metadata = payload.get("user_metadata")
+    display_name = (
+        user_metadata.get("full_name")
+        if isinstance(user_metadata, dict)
+        else None
+    )
+    email = payload.get("email")
+
+    return AuthUser(
+        user_id=user_id,
+        email=email if isinstance(email, str) else None,
+        display_name=display_name if isinstance(display_name, str) else None,
+    )
+
+
+# The /auth/v1/user fallback only runs when local JWKS verification fails
+# (e.g. legacy HS256 tokens or a misconfigured issuer); the caches keep a
+# retried token from costing a round trip per request.
+supabase_user_fallback = SupabaseUserFallback(
+    cache_ttl_seconds=settings.supabase_user_cache_ttl_seconds,
+    negative_ttl_seconds=settings.supabase_user_negative_ttl_seconds,
+    failure_threshold=settings.supabase_user_breaker_failures,
+    open_seconds=settings.supabase_user_breaker_open_seconds,
+)
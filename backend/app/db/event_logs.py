@@ -0,0 +1,115 @@
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.security import apply_rls_role, apply_rls_user
+
+
+@dataclass(slots=True)
+class EventLogRow:
+    user_id: UUID
+    user_email: str
+    user_display_name: str
+    session_id: UUID | None
+    event_name: str
+    event_props: dict
+    client_ts: datetime | None
+    server_ts: datetime
+
+
+async def insert_event_logs(db: AsyncSession, rows: Sequence[EventLogRow]) -> int:
+    # Runs outside any request, so there is no request RLS context: the batch
+    # is written under the authenticated role with each user's claims in turn
+    # (user_id was taken from the verified token when the batch was accepted),
+    # and session_id is re-checked against ownership below (foreign ids are
+    # stored as NULL).
+    if not rows:
+        return 0
+
+    by_user: dict[UUID, list[EventLogRow]] = {}
+    for row in rows:
+        by_user.setdefault(row.user_id, []).append(row)
+
+    await apply_rls_role(db)
+    inserted = 0
+    for user_id, user_rows in by_user.items():
+        await apply_rls_user(db, user_id)
+        inserted += await _insert_user_event_logs(db, user_rows)
+    return inserted
+
+
+async def _insert_user_event_logs(db: AsyncSession, rows: list[EventLogRow]) -> int:
+    user = rows[0]
+    await db.execute(
+        text(
+            """
+            INSERT INTO users (id, email, display_name)
+            VALUES (:id, :email, :display_name)
+            ON CONFLICT DO NOTHING
+            """
+        ),
+        {
+            "id": str(user.user_id),
+            "email": user.user_email,
+            "display_name": user.user_display_name,
+        },
+    )
+
+    result = await db.execute(
+        text(
+            """
+            INSERT INTO event_logs (
+                user_id,
+                session_id,
+                event_name,
+                event_props,
+                client_ts,
+                server_ts
+            )
+            SELECT
+                e.user_id,
+                s.id,
+                e.event_name,
+                COALESCE(e.event_props, '{}'::jsonb),
+                e.client_ts,
+                e.server_ts
+            FROM ROWS FROM (
+                jsonb_to_recordset(CAST(:events AS jsonb)) AS (
+                    user_id UUID,
+                    session_id UUID,
+                    event_name TEXT,
+                    event_props JSONB,
+                    client_ts TIMESTAMPTZ,
+                    server_ts TIMESTAMPTZ
+                )
+            ) WITH ORDINALITY
+              AS e(user_id, session_id, event_name, event_props, client_ts, server_ts, ord)
+            JOIN users u ON u.id = e.user_id
+            LEFT JOIN sessions s ON s.id = e.session_id AND s.user_id = e.user_id
+            ORDER BY e.ord
+            """
+        ),
+        {
+            "events": json.dumps(
+                [
+                    {
+                        "user_id": str(row.user_id),
+                        "session_id": str(row.session_id) if row.session_id else None,
+                        "event_name": row.event_name,
+                        "event_props": row.event_props,
+                        "client_ts": row.client_ts.isoformat() if row.client_ts else None,
+                        "server_ts": row.server_ts.isoformat(),
+                    }
+                    for row in rows
+                ],
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        },
+    )
+    return int(result.rowcount or 0)
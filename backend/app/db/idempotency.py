@@ -0,0 +1,148 @@
+import json
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LruTtlCache
+from app.core.config import settings
+
+IdempotencyCacheKey = tuple[UUID, UUID, str, UUID]
+
+idempotency_response_cache: LruTtlCache[IdempotencyCacheKey, bytes] = LruTtlCache(
+    max_entries=max(1, settings.idempotency_cache_size),
+    ttl_seconds=settings.idempotency_ttl_hours * 3600,
+    name="idempotency",
+)
+
+
+def get_cached_idempotent_response(key: IdempotencyCacheKey) -> bytes | None:
+    if settings.idempotency_cache_size <= 0:
+        return None
+    return idempotency_response_cache.get(key)
+
+
+def cache_idempotent_response(
+    key: IdempotencyCacheKey,
+    response_bytes: bytes,
+    ttl_seconds: float | None = None,
+) -> None:
+    # ttl_seconds: what is left of the row's TTL; defaults to a full
+    # IDEMPOTENCY_TTL_HOURS for a row that was just stored.
+    if settings.idempotency_cache_size <= 0:
+        return
+    if ttl_seconds is not None and ttl_seconds <= 0:
+        return
+    idempotency_response_cache.set(key, response_bytes, ttl_seconds=ttl_seconds)
+
+
+async def get_idempotent_response_bytes(
+    db: AsyncSession,
+    key: IdempotencyCacheKey,
+) -> bytes | None:
+    user_id, session_id, endpoint, client_message_id = key
+    result = await db.execute(
+        text(
+            """
+            SELECT
+              response_bytes,
+              response_body,
+              EXTRACT(EPOCH FROM expires_at - NOW()) AS ttl_seconds
+            FROM idempotency_keys
+            WHERE user_id = :user_id
+              AND session_id = :session_id
+              AND endpoint = :endpoint
+              AND client_message_id = :client_message_id
+              AND expires_at > NOW()
+            LIMIT 1
+            """
+        ),
+        {
+            "user_id": str(user_id),
+            "session_id": str(session_id),
+            "endpoint": endpoint,
+            "client_message_id": str(client_message_id),
+        },
+    )
+    row = result.mappings().first()
+    if not row:
+        return None
+    if row["response_bytes"] is not None:
+        response_bytes = bytes(row["response_bytes"])
+    else:
+        response_bytes = json.dumps(
+            row["response_body"], ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+    # The cached copy must not outlive the row, which the purge job deletes.
+    cache_idempotent_response(key, response_bytes, float(row["ttl_seconds"]))
+    return response_bytes
+
+
+async def store_idempotent_response(
+    db: AsyncSession,
+    key: IdempotencyCacheKey,
+    response_bytes: bytes,
+) -> bool:
+    # An expired row that has not been purged yet is taken over; a live row is
+    # left alone and reported as a conflict (False).
+    user_id, session_id, endpoint, client_message_id = key
+    result = await db.execute(
+        text(
+            """
+            INSERT INTO idempotency_keys (
+                user_id,
+                session_id,
+                endpoint,
+                client_message_id,
+                response_bytes,
+                expires_at
+            )
+            VALUES (
+                :user_id,
+                :session_id,
+                :endpoint,
+                :client_message_id,
+                :response_bytes,
+                NOW() + make_interval(hours => :ttl_hours)
+            )
+            ON CONFLICT ON CONSTRAINT uq_idempotency_message DO UPDATE
+            SET response_bytes = EXCLUDED.response_bytes,
+                response_body = NULL,
+                created_at = NOW(),
+                expires_at = EXCLUDED.expires_at
+            WHERE idempotency_keys.expires_at <= NOW()
+            RETURNING id
+            """
+        ),
+        {
+            "user_id": str(user_id),
+            "session_id": str(session_id),
+            "endpoint": endpoint,
+            "client_message_id": str(client_message_id),
+            "response_bytes": response_bytes,
+            "ttl_hours": settings.idempotency_ttl_hours,
+        },
+    )
+    return result.first() is not None
+
+
+async def purge_expired_idempotency_keys(db: AsyncSession, batch_size: int = 1000) -> int:
+    # One bounded batch per call keeps lock time and WAL bursts small; callers
+    # loop (committing between batches) until a short batch comes back.
+    result = await db.execute(
+        text(
+            """
+            DELETE FROM idempotency_keys
+            WHERE id IN (
+              SELECT id
+              FROM idempotency_keys
+              WHERE expires_at <= NOW()
+              ORDER BY expires_at
+              LIMIT :batch_size
+              FOR UPDATE SKIP LOCKED
+            )
+            """
+        ),
+        {"batch_size": max(1, batch_size)},
+    )
+    return int(result.rowcount or 0)
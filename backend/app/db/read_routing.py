@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Callable
+from threading import Lock
+from time import monotonic
+from uuid import UUID
+
+from app.core.cache import LruTtlCache
+from app.core.config import settings
+
+ROUTE_REPLICA = "replica"
+ROUTE_PRIMARY_NO_REPLICA = "primary_no_replica"
+ROUTE_PRIMARY_PINNED = "primary_pinned"
+ROUTE_PRIMARY_REPLICA_DOWN = "primary_replica_down"
+ROUTE_PRIMARY_FALLBACK = "primary_fallback"
+
+# Upper bound on users tracked for read-your-writes pinning per process. Pins
+# are not shared between worker processes, so a read landing on another worker
+# than the write is routed as if the user had not written.
+MAX_PINNED_USERS = 10000
+
+
+class ReadRouter:
+    def __init__(
+        self,
+        *,
+        pin_seconds: float,
+        retry_seconds: float,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self._lock = Lock()
+        self._clock = clock
+        self._pin_seconds = max(0.0, pin_seconds)
+        self._retry_seconds = max(1.0, retry_seconds)
+        self._pins: LruTtlCache[UUID, bool] = LruTtlCache(
+            max_entries=MAX_PINNED_USERS,
+            ttl_seconds=self._pin_seconds,
+            clock=clock,
+        )
+        self._replica_down_until = 0.0
+        self._decisions: Counter[str] = Counter()
+
+    def configure(
+        self,
+        *,
+        pin_seconds: float | None = None,
+        retry_seconds: float | None = None,
+    ) -> None:
+        with self._lock:
+            if pin_seconds is not None:
+                self._pin_seconds = max(0.0, pin_seconds)
+                self._pins.configure(ttl_seconds=self._pin_seconds)
+            if retry_seconds is not None:
+                self._retry_seconds = max(1.0, retry_seconds)
+
+    def reset(self) -> None:
+        self._pins.clear()
+        with self._lock:
+            self._replica_down_until = 0.0
+            self._decisions.clear()
+
+    def record_write(self, user_id: UUID) -> None:
+        if self._pin_seconds > 0:
+            self._pins.set(user_id, True)
+
+    def choose(self, user_id: UUID, *, replica_configured: bool) -> str:
+        if not replica_configured:
+            route = ROUTE_PRIMARY_NO_REPLICA
+        elif self._pins.get(user_id):
+            # The user wrote recently; the replica may not have caught up yet.
+            route = ROUTE_PRIMARY_PINNED
+        elif self._clock() < self._replica_down_until:
+            route = ROUTE_PRIMARY_REPLICA_DOWN
+        else:
+            route = ROUTE_REPLICA
+        with self._lock:
+            self._decisions[route] += 1
+        return route
+
+    def record_replica_failure(self) -> None:
+        # The replica read that triggered this is served by primary instead, so
+        # move its decision from "replica" to "primary_fallback".
+        with self._lock:
+            self._replica_down_until = self._clock() + self._retry_seconds
+            self._decisions[ROUTE_REPLICA] -= 1
+            self._decisions[ROUTE_PRIMARY_FALLBACK] += 1
+
+    def stats(self, *, replica_configured: bool) -> dict:
+        with self._lock:
+            return {
+                "replica_configured": replica_configured,
+                "replica_available": replica_configured
+                and self._clock() >= self._replica_down_until,
+                "decisions": {
+                    route: count for route, count in sorted(self._decisions.items()) if count
+                },
+            }
+
+
+read_router = ReadRouter(
+    pin_seconds=settings.replica_read_pin_seconds,
+    retry_seconds=settings.replica_retry_seconds,
+)
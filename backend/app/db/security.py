@@ -1,3 +1,5 @@
+from uuid import UUID
+
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -6,11 +8,20 @@ from app.core.security import AuthUser
 
 async def apply_request_rls_context(db: AsyncSession, user: AuthUser) -> None:
     # Run queries as the Supabase authenticated role so RLS policies are actually enforced.
+    await apply_rls_role(db)
+    await apply_rls_user(db, user.user_id)
+
+
+async def apply_rls_role(db: AsyncSession) -> None:
     await db.execute(text("SET LOCAL ROLE authenticated"))
     await db.execute(
         text("SELECT set_config('request.jwt.claim.role', 'authenticated', true)")
     )
+
+
+async def apply_rls_user(db: AsyncSession, user_id: UUID) -> None:
+    # Transaction-local, so it can be switched between users within one transaction.
     await db.execute(
         text("SELECT set_config('request.jwt.claim.sub', :user_id, true)"),
-        {"user_id": str(user.user_id)},
+        {"user_id": str(user_id)},
     )
@@ -1,9 +1,26 @@
+import json
+import logging
 from collections.abc import AsyncGenerator
+from time import perf_counter
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.pool import NullPool
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import NullPool, QueuePool
 
 from app.core.config import settings
+from app.core.observability import observability_registry
+from app.core.request_trace import current_trace, record_statement
+from app.core.statements import normalize_statement
+
+slow_query_logger = logging.getLogger("nvc.db.slow_query")
+
+# A replica that is down should fail fast so reads can fall back to primary.
+REPLICA_CONNECT_TIMEOUT_SECONDS = 2
 
 engine_kwargs = {
     "pool_pre_ping": True,
@@ -16,15 +33,92 @@ engine_kwargs = {
 if settings.app_env.lower() in {"production", "test"}:
     engine_kwargs["poolclass"] = NullPool
 
-engine = create_async_engine(settings.sqlalchemy_database_url, **engine_kwargs)
 
-SessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autoflush=False,
-    autocommit=False,
-)
+def _session_factory(bind: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False,
+        autocommit=False,
+    )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info["query_started_at"] = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started_at = conn.info.pop("query_started_at", None)
+    if started_at is None:
+        return
+    duration_ms = (perf_counter() - started_at) * 1000
+    rowcount = cursor.rowcount
+    record_statement(statement, duration_ms, rowcount)
+    normalized = normalize_statement(statement)
+    is_slow = duration_ms >= settings.slow_query_ms
+    observability_registry.observe_statement(
+        normalized, duration_ms, rowcount=rowcount, is_slow=is_slow
+    )
+    if is_slow:
+        trace = current_trace()
+        slow_query_logger.warning(
+            json.dumps(
+                {
+                    "request_id": trace.request_id if trace is not None else None,
+                    "statement": normalized,
+                    "duration_ms": round(duration_ms, 2),
+                    "rows": rowcount if rowcount >= 0 else None,
+                    "executemany": executemany,
+                },
+                ensure_ascii=False,
+                sort_keys=True,
+            )
+        )
+
+
+def _instrument(bind: AsyncEngine) -> AsyncEngine:
+    # Cursor events run inside the greenlet that carries the caller's context,
+    # so statement time is charged to the request that issued it.
+    event.listen(bind.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(bind.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    return bind
+
+
+engine = _instrument(create_async_engine(settings.sqlalchemy_database_url, **engine_kwargs))
+
+SessionLocal = _session_factory(engine)
+
+# Optional read replica; None unless DATABASE_REPLICA_URL is set.
+replica_engine: AsyncEngine | None = None
+ReplicaSessionLocal: async_sessionmaker[AsyncSession] | None = None
+if settings.sqlalchemy_replica_database_url:
+    replica_engine = _instrument(
+        create_async_engine(
+            settings.sqlalchemy_replica_database_url,
+            **{
+                **engine_kwargs,
+                "connect_args": {
+                    **engine_kwargs["connect_args"],
+                    "timeout": REPLICA_CONNECT_TIMEOUT_SECONDS,
+                },
+            },
+        )
+    )
+    ReplicaSessionLocal = _session_factory(replica_engine)
+
+
+def pool_stats(bind: AsyncEngine) -> dict | None:
+    # NullPool keeps no connections, so there is nothing to report.
+    pool = bind.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+    }
 
 
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
@@ -0,0 +1,135 @@
+from datetime import date, datetime
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def bump_user_weekly_stats(
+    db: AsyncSession,
+    user_id: UUID,
+    occurred_at: datetime,
+    *,
+    practice_count: int = 0,
+    summary_count: int = 0,
+    real_world_used_count: int = 0,
+    outcome_score: int | None = None,
+) -> None:
+    await db.execute(
+        text(
+            """
+            INSERT INTO user_weekly_stats (
+                user_id,
+                week_start,
+                practice_count,
+                summary_count,
+                real_world_used_count,
+                outcome_score_sum,
+                outcome_score_count
+            )
+            VALUES (
+                :user_id,
+                nvc_week_start(:occurred_at),
+                :practice_count,
+                :summary_count,
+                :real_world_used_count,
+                :outcome_score_sum,
+                :outcome_score_count
+            )
+            ON CONFLICT (user_id, week_start) DO UPDATE
+            SET practice_count = user_weekly_stats.practice_count + EXCLUDED.practice_count,
+                summary_count = user_weekly_stats.summary_count + EXCLUDED.summary_count,
+                real_world_used_count = (
+                    user_weekly_stats.real_world_used_count + EXCLUDED.real_world_used_count
+                ),
+                outcome_score_sum = user_weekly_stats.outcome_score_sum + EXCLUDED.outcome_score_sum,
+                outcome_score_count = (
+                    user_weekly_stats.outcome_score_count + EXCLUDED.outcome_score_count
+                ),
+                updated_at = NOW()
+            """
+        ),
+        {
+            "user_id": str(user_id),
+            "occurred_at": occurred_at,
+            "practice_count": practice_count,
+            "summary_count": summary_count,
+            "real_world_used_count": real_world_used_count,
+            "outcome_score_sum": outcome_score or 0,
+            "outcome_score_count": 0 if outcome_score is None else 1,
+        },
+    )
+
+
+async def backfill_user_weekly_stats(
+    db: AsyncSession,
+    *,
+    user_id: UUID | None = None,
+    since: date | None = None,
+) -> int:
+    # Recompute from source tables; stale rows in the window are cleared first so
+    # weeks whose activity disappeared do not keep old counts.
+    params = {
+        "user_id": str(user_id) if user_id else None,
+        "since": since,
+    }
+    await db.execute(
+        text(
+            """
+            DELETE FROM user_weekly_stats
+            WHERE (CAST(:user_id AS uuid) IS NULL OR user_id = CAST(:user_id AS uuid))
+              AND (
+                CAST(:since AS date) IS NULL
+                OR week_start >= date_trunc('week', CAST(:since AS date))::date
+              )
+            """
+        ),
+        params,
+    )
+    result = await db.execute(
+        text(
+            """
+            INSERT INTO user_weekly_stats (
+                user_id,
+                week_start,
+                practice_count,
+                summary_count,
+                real_world_used_count,
+                outcome_score_sum,
+                outcome_score_count
+            )
+            SELECT
+              activity.user_id,
+              activity.week_start,
+              SUM(activity.practice_count),
+              SUM(activity.summary_count),
+              SUM(activity.real_world_used_count),
+              SUM(activity.outcome_score_sum),
+              SUM(activity.outcome_score_count)
+            FROM (
+              SELECT s.user_id, nvc_week_start(s.created_at) AS week_start,
+                     1 AS practice_count, 0 AS summary_count, 0 AS real_world_used_count,
+                     0 AS outcome_score_sum, 0 AS outcome_score_count
+              FROM sessions s
+              UNION ALL
+              SELECT s.user_id, nvc_week_start(sm.created_at), 0, 1, 0, 0, 0
+              FROM summaries sm
+              JOIN sessions s ON s.id = sm.session_id
+              UNION ALL
+              SELECT r.user_id, nvc_week_start(r.created_at), 0, 0,
+                     CASE WHEN r.used_in_real_world THEN 1 ELSE 0 END,
+                     COALESCE(r.outcome_score, 0),
+                     CASE WHEN r.outcome_score IS NULL THEN 0 ELSE 1 END
+              FROM reflections r
+            ) activity
+            WHERE (CAST(:user_id AS uuid) IS NULL OR activity.user_id = CAST(:user_id AS uuid))
+              AND (
+                CAST(:since AS date) IS NULL
+                OR activity.week_start >= date_trunc('week', CAST(:since AS date))::date
+              )
+            GROUP BY activity.user_id, activity.week_start
+            """
+        ),
+        params,
+    )
+    return int(result.rowcount or 0)
@@ -1,5 +1,6 @@
 import json
 import logging
+from contextlib import asynccontextmanager
 from time import perf_counter
 from uuid import uuid4
 
@@ -9,6 +10,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from app.api.history_cache import session_history_cache
+from app.api.routers.events import router as events_router
 from app.api.routers.health import router as health_router
 from app.api.routers.progress import router as progress_router
 from app.api.routers.reflections import router as reflections_router
@@ -21,10 +24,24 @@ from app.core.errors import (
     build_error_payload,
     map_status_to_error_code,
 )
+from app.core.loop_monitor import event_loop_monitor
 from app.core.observability import observability_registry
+from app.core.profiler import sampling_profiler
+from app.core.rate_limit import (
+    rate_limit_backend_from_settings,
+    rate_limit_policies_from_settings,
+    rate_limiter,
+)
+from app.core.request_trace import STAGE_DB, begin_request_trace, end_request_trace
+from app.core.supabase_auth import auth_claims_cache, jwks_manager
+from app.core.supabase_user import supabase_user_fallback
+from app.db.idempotency import idempotency_response_cache
+from app.db.read_routing import read_router
+from app.services.event_buffer import event_buffer
 
 logger = logging.getLogger("nvc.api")
 request_logger = logging.getLogger("nvc.api.request")
+statement_budget_logger = logging.getLogger("nvc.db.statement_budget")
 
 
 def _request_id_from(request: Request) -> str:
@@ -34,12 +51,13 @@ def _request_id_from(request: Request) -> str:
     return str(uuid4())
 
 
-def _route_template_from(request: Request) -> str:
+def _route_template_from(request: Request) -> str | None:
+    # None when no route matched (404s, scanners probing random paths).
     route = request.scope.get("route")
     template = getattr(route, "path", None)
     if isinstance(template, str) and template:
         return template
-    return request.url.path
+    return None
 
 
 def _configure_logging() -> None:
@@ -55,7 +73,13 @@ def _configure_logging() -> None:
     request_logger.setLevel(level)
 
 
-def _error_response(status_code: int, error_code: ErrorCode, message: str, request: Request):
+def _error_response(
+    status_code: int,
+    error_code: ErrorCode,
+    message: str,
+    request: Request,
+    headers: dict[str, str] | None = None,
+):
     return JSONResponse(
         status_code=status_code,
         content=build_error_payload(
@@ -63,19 +87,90 @@ def _error_response(status_code: int, error_code: ErrorCode, message: str, reque
             message=message,
             request_id=_request_id_from(request),
         ),
+        headers=headers,
     )
 
 
+@asynccontextmanager
+async def _lifespan(_: FastAPI):
+    event_buffer.start()
+    observability_registry.start()
+    if settings.event_loop_monitor_enabled:
+        event_loop_monitor.start()
+    if settings.auth_mode == "supabase":
+        await jwks_manager.start()
+    try:
+        yield
+    finally:
+        await jwks_manager.close()
+        await supabase_user_fallback.close()
+        await event_loop_monitor.close()
+        await observability_registry.close()
+        # Drain buffered analytics events before the worker exits.
+        await event_buffer.close()
+
+
 def create_app() -> FastAPI:
     _configure_logging()
     observability_registry.configure(
-        max_recent_errors=settings.observability_recent_error_limit
+        max_recent_errors=settings.observability_recent_error_limit,
+        max_slow_exemplars=settings.observability_slow_exemplar_limit,
+        unmatched_path_capacity=settings.observability_unmatched_path_capacity,
+        statement_capacity=settings.observability_statement_capacity,
+        shard_dir=settings.observability_shard_dir or "",
+        flush_interval_seconds=settings.observability_shard_flush_seconds,
     )
     observability_registry.reset()
+    sampling_profiler.configure(
+        max_seconds=settings.profiler_max_seconds,
+        min_interval_seconds=settings.profiler_min_interval_seconds,
+    )
+    sampling_profiler.reset()
+    event_loop_monitor.configure(
+        probe_interval_seconds=settings.event_loop_probe_interval_ms / 1000,
+        stall_seconds=settings.event_loop_stall_ms / 1000,
+    )
+    event_loop_monitor.reset()
+    idempotency_response_cache.configure(
+        max_entries=max(1, settings.idempotency_cache_size),
+        ttl_seconds=settings.idempotency_ttl_hours * 3600,
+    )
+    session_history_cache.configure(max_entries=max(1, settings.history_cache_size))
+    auth_claims_cache.configure(max_entries=max(1, settings.auth_claims_cache_size))
+    auth_claims_cache.clear()
+    jwks_manager.configure(
+        refresh_interval_seconds=settings.jwks_refresh_interval_seconds,
+        min_refresh_interval_seconds=settings.jwks_min_refresh_interval_seconds,
+    )
+    jwks_manager.reset()
+    supabase_user_fallback.configure(
+        cache_ttl_seconds=settings.supabase_user_cache_ttl_seconds,
+        negative_ttl_seconds=settings.supabase_user_negative_ttl_seconds,
+        failure_threshold=settings.supabase_user_breaker_failures,
+        open_seconds=settings.supabase_user_breaker_open_seconds,
+    )
+    supabase_user_fallback.reset()
+    rate_limiter.configure(
+        enabled=settings.rate_limit_enabled,
+        policies=rate_limit_policies_from_settings(),
+        backend=rate_limit_backend_from_settings(),
+    )
+    rate_limiter.reset()
+    read_router.configure(
+        pin_seconds=settings.replica_read_pin_seconds,
+        retry_seconds=settings.replica_retry_seconds,
+    )
+    read_router.reset()
+    event_buffer.configure(
+        max_pending=settings.event_buffer_max_events,
+        batch_size=settings.event_flush_batch_size,
+        flush_interval_seconds=settings.event_flush_interval_ms / 1000,
+    )
     app = FastAPI(
         title="NVC Practice Coach API",
         version="0.1.0",
         description="FastAPI backend for NVC Practice Coach MVP",
+        lifespan=_lifespan,
     )
 
     origins = [item.strip() for item in settings.cors_origins.split(",") if item.strip()]
@@ -92,19 +187,31 @@ def create_app() -> FastAPI:
     async def add_request_id_header(request: Request, call_next):
         request_id = request.headers.get("x-request-id", "").strip() or str(uuid4())
         request.state.request_id = request_id
+        trace, trace_token = begin_request_trace(request_id)
         started_at = perf_counter()
         response = None
         status_code = 500
         path = request.url.path
-        route = path
+        template = None
         try:
             response = await call_next(request)
             status_code = response.status_code
-            route = _route_template_from(request)
+            template = _route_template_from(request)
             return response
         finally:
-            latency_ms = (perf_counter() - started_at) * 1000
+            ended_at = perf_counter()
+            latency_ms = (ended_at - started_at) * 1000
+            end_request_trace(trace_token)
+            route = template or path
             is_slow = latency_ms >= settings.slow_request_ms
+            statement_count = trace.statement_count
+            statement_budget = settings.sql_statement_budget
+            budget_exceeded = 0 < statement_budget < statement_count
+            exemplar = None
+            if is_slow:
+                exemplar = trace.exemplar()
+                # Stalls that overlapped the request, whichever code caused them.
+                exemplar["loop_stalls"] = event_loop_monitor.stalls_between(started_at, ended_at)
             observability_registry.observe(
                 request_id=request_id,
                 method=request.method,
@@ -113,6 +220,10 @@ def create_app() -> FastAPI:
                 status_code=status_code,
                 latency_ms=latency_ms,
                 is_slow=is_slow,
+                stages=trace.stages,
+                route_matched=template is not None,
+                exemplar=exemplar,
+                statement_budget_exceeded=budget_exceeded,
             )
             request_logger.info(
                 json.dumps(
@@ -124,13 +235,35 @@ def create_app() -> FastAPI:
                         "status_code": status_code,
                         "latency_ms": round(latency_ms, 2),
                         "is_slow": is_slow,
+                        "stages": trace.stage_summary(),
                     },
                     ensure_ascii=False,
                     sort_keys=True,
                 )
             )
+            if budget_exceeded:
+                # Many round trips from one request usually mean a query in a loop.
+                statement_budget_logger.warning(
+                    json.dumps(
+                        {
+                            "request_id": request_id,
+                            "method": request.method,
+                            "route": route,
+                            "statements": statement_count,
+                            "statement_budget": statement_budget,
+                            "db_ms": trace.stage_summary()[STAGE_DB]["ms"],
+                            "repeated": trace.repeated_statements(),
+                        },
+                        ensure_ascii=False,
+                        sort_keys=True,
+                    )
+                )
             if response is not None:
                 response.headers["X-Request-ID"] = request_id
+                response.headers["Server-Timing"] = trace.server_timing(latency_ms)
+                rate_limit_headers = getattr(request.state, "rate_limit_headers", None)
+                if rate_limit_headers:
+                    response.headers.update(rate_limit_headers)
 
     @app.exception_handler(ApiError)
     async def api_error_handler(request: Request, exc: ApiError):
@@ -150,6 +283,7 @@ def create_app() -> FastAPI:
             map_status_to_error_code(exc.status_code),
             message,
             request,
+            headers=getattr(exc, "headers", None),
         )
 
     @app.exception_handler(StarletteHTTPException)
@@ -160,6 +294,7 @@ def create_app() -> FastAPI:
             map_status_to_error_code(exc.status_code),
             message,
             request,
+            headers=getattr(exc, "headers", None),
         )
 
     @app.exception_handler(Exception)
@@ -177,6 +312,7 @@ def create_app() -> FastAPI:
     app.include_router(sessions_router)
     app.include_router(reflections_router)
     app.include_router(progress_router)
+    app.include_router(events_router)
 
     return app
 
@@ -1,7 +1,7 @@
-from pydantic import BaseModel
-from pydantic import Field
 from datetime import datetime
 
+from pydantic import BaseModel, Field
+
 
 class HealthResponse(BaseModel):
     status: str
@@ -23,8 +23,223 @@ class RecentErrorItem(BaseModel):
     latency_ms: float = Field(ge=0)
 
 
+class EventIngestStats(BaseModel):
+    pending: int = Field(ge=0)
+    max_pending: int = Field(ge=1)
+    accepted: int = Field(ge=0)
+    rejected: int = Field(ge=0)
+    written: int = Field(ge=0)
+    dropped: int = Field(ge=0)
+    flushes: int = Field(ge=0)
+    failed_flushes: int = Field(ge=0)
+
+
+class ReadRoutingStats(BaseModel):
+    replica_configured: bool
+    replica_available: bool
+    decisions: dict[str, int]
+
+
+class CacheStats(BaseModel):
+    size: int = Field(ge=0)
+    max_entries: int = Field(ge=1)
+    hits: int = Field(ge=0)
+    misses: int = Field(ge=0)
+    evictions: int = Field(ge=0)
+
+
+class JwksStats(BaseModel):
+    keys: int = Field(ge=0)
+    refreshes: int = Field(ge=0)
+    refresh_failures: int = Field(ge=0)
+    unknown_kid_refreshes: int = Field(ge=0)
+    last_refresh_age_seconds: float | None = Field(default=None, ge=0)
+
+
+class SupabaseUserFallbackStats(BaseModel):
+    circuit_state: str
+    consecutive_failures: int = Field(ge=0)
+    circuit_opens: int = Field(ge=0)
+    outcomes: dict[str, int]
+    cached_users: int = Field(ge=0)
+    cached_rejections: int = Field(ge=0)
+
+
+class RateLimitStats(BaseModel):
+    enabled: bool
+    backend: str
+    allowed: dict[str, int]
+    rejected: dict[str, int]
+    backend_errors: int = Field(ge=0)
+
+
+class LatencyHistogramItem(BaseModel):
+    endpoint: str
+    status_class: str
+    count: int = Field(ge=0)
+    p50_ms: float = Field(ge=0)
+    p90_ms: float = Field(ge=0)
+    p95_ms: float = Field(ge=0)
+    p99_ms: float = Field(ge=0)
+    max_ms: float = Field(ge=0)
+
+
+class StageTimingItem(BaseModel):
+    endpoint: str
+    stage: str
+    requests: int = Field(ge=0)
+    calls: int = Field(ge=0)
+    total_ms: float = Field(ge=0)
+    avg_ms: float = Field(ge=0)
+    p50_ms: float = Field(ge=0)
+    p95_ms: float = Field(ge=0)
+    p99_ms: float = Field(ge=0)
+
+
+class WindowStatsItem(BaseModel):
+    window: str
+    seconds: int = Field(ge=1)
+    requests: int = Field(ge=0)
+    requests_per_second: float = Field(ge=0)
+    error_rate: float = Field(ge=0, le=1)
+    slow_rate: float = Field(ge=0, le=1)
+    p50_ms: float = Field(ge=0)
+    p95_ms: float = Field(ge=0)
+    p99_ms: float = Field(ge=0)
+
+
+class SqlStatementItem(BaseModel):
+    statement_id: str
+    count: int = Field(ge=0)
+    total_ms: float = Field(ge=0)
+    avg_ms: float = Field(ge=0)
+    p50_ms: float = Field(ge=0)
+    p95_ms: float = Field(ge=0)
+    p99_ms: float = Field(ge=0)
+    max_ms: float = Field(ge=0)
+    rows: int = Field(ge=0)
+    slow_count: int = Field(ge=0)
+
+
+class SqlEndpointItem(BaseModel):
+    endpoint: str
+    requests: int = Field(ge=0)
+    statements: int = Field(ge=0)
+    avg_statements: float = Field(ge=0)
+    max_statements: int = Field(ge=0)
+    avg_db_ms: float = Field(ge=0)
+    budget_exceeded: int = Field(ge=0)
+
+
+class SqlStats(BaseModel):
+    statements: int = Field(ge=0)
+    total_ms: float = Field(ge=0)
+    slow_query_threshold_ms: int = Field(ge=1)
+    slow_statements: int = Field(ge=0)
+    statement_budget: int = Field(ge=0)
+    budget_exceeded_requests: int = Field(ge=0)
+    top_statements: list[SqlStatementItem]
+    endpoints: list[SqlEndpointItem]
+
+
+class LlmPurposeItem(BaseModel):
+    purpose: str
+    calls: int = Field(ge=0)
+    attempts: int = Field(ge=0)
+    avg_attempts: float = Field(ge=0)
+    attempts_per_call: dict[str, int]
+    outcomes: dict[str, int]
+    retry_reasons: dict[str, int]
+    timeouts: int = Field(ge=0)
+    parse_failures: int = Field(ge=0)
+    fallbacks: int = Field(ge=0)
+    fallback_rate: float = Field(ge=0, le=1)
+    fallback_reasons: dict[str, int]
+    prompt_tokens: int = Field(ge=0)
+    completion_tokens: int = Field(ge=0)
+    upstream_p50_ms: float = Field(ge=0)
+    upstream_p95_ms: float = Field(ge=0)
+    upstream_p99_ms: float = Field(ge=0)
+    upstream_max_ms: float = Field(ge=0)
+    call_p50_ms: float = Field(ge=0)
+    call_p95_ms: float = Field(ge=0)
+    call_p99_ms: float = Field(ge=0)
+
+
+class LoopStallItem(BaseModel):
+    timestamp: datetime
+    lag_ms: float = Field(ge=0)
+    stack: list[str]
+
+
+class EventLoopStats(BaseModel):
+    probe_interval_ms: int = Field(ge=1)
+    stall_threshold_ms: int = Field(ge=1)
+    probes: int = Field(ge=0)
+    p50_ms: float = Field(ge=0)
+    p95_ms: float = Field(ge=0)
+    p99_ms: float = Field(ge=0)
+    max_ms: float = Field(ge=0)
+    stalls: int = Field(ge=0)
+    recent_stalls: list[LoopStallItem]
+
+
+class SlowRequestStatementItem(BaseModel):
+    statement: str
+    duration_ms: float = Field(ge=0)
+    rows: int | None = None
+
+
+class SlowRequestLlmAttemptItem(BaseModel):
+    attempt: int = Field(ge=1)
+    outcome: str
+    status_code: int | None = None
+    duration_ms: float = Field(ge=0)
+
+
+class SlowRequestCacheItem(BaseModel):
+    hits: int = Field(ge=0)
+    misses: int = Field(ge=0)
+
+
+class StageSummaryItem(BaseModel):
+    ms: float = Field(ge=0)
+    count: int = Field(ge=0)
+
+
+class SlowRequestItem(BaseModel):
+    timestamp: datetime
+    request_id: str
+    method: str
+    path: str
+    route: str
+    status_code: int
+    latency_ms: float = Field(ge=0)
+    stages: dict[str, StageSummaryItem]
+    statements: list[SlowRequestStatementItem]
+    statements_dropped: int = Field(ge=0)
+    llm_attempts: list[SlowRequestLlmAttemptItem]
+    cache: dict[str, SlowRequestCacheItem]
+    loop_stalls: list[LoopStallItem] = Field(default_factory=list)
+
+
+class SlowRequestsResponse(BaseModel):
+    slow_request_threshold_ms: int = Field(ge=1)
+    items: list[SlowRequestItem]
+
+
+class SqlStatementTextItem(BaseModel):
+    statement_id: str
+    statement: str
+
+
+class SqlStatementsResponse(BaseModel):
+    items: list[SqlStatementTextItem]
+
+
 class ObservabilityMetricsResponse(BaseModel):
     started_at: datetime
+    workers: int = Field(default=1, ge=1)
     total_requests: int = Field(ge=0)
     status_counts: dict[str, int]
     avg_latency_ms: float = Field(ge=0)
@@ -34,3 +249,15 @@ class ObservabilityMetricsResponse(BaseModel):
     slow_request_threshold_ms: int = Field(ge=1)
     top_endpoints: list[EndpointCountItem]
     recent_errors: list[RecentErrorItem]
+    latency_histograms: list[LatencyHistogramItem] = Field(default_factory=list)
+    stage_timings: list[StageTimingItem] = Field(default_factory=list)
+    windows: list[WindowStatsItem] = Field(default_factory=list)
+    sql: SqlStats | None = None
+    llm: list[LlmPurposeItem] = Field(default_factory=list)
+    event_loop: EventLoopStats | None = None
+    event_ingest: EventIngestStats | None = None
+    read_routing: ReadRoutingStats | None = None
+    auth_claims_cache: CacheStats | None = None
+    jwks: JwksStats | None = None
+    supabase_user_fallback: SupabaseUserFallbackStats | None = None
+    rate_limit: RateLimitStats | None = None
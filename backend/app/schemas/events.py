@@ -0,0 +1,32 @@
+import json
+from typing import Any
+from uuid import UUID
+
+from pydantic import AwareDatetime, BaseModel, Field, field_validator
+
+EVENT_BATCH_MAX_EVENTS = 100
+EVENT_PROPS_MAX_BYTES = 4096
+
+
+class ClientEvent(BaseModel):
+    event_name: str = Field(min_length=1, max_length=64, pattern=r"^[A-Za-z0-9_.:-]+$")
+    session_id: UUID | None = None
+    event_props: dict[str, Any] = Field(default_factory=dict)
+    # A timestamp without an offset cannot be stored as a point in time.
+    client_ts: AwareDatetime | None = None
+
+    @field_validator("event_props")
+    @classmethod
+    def limit_event_props_size(cls, value: dict[str, Any]) -> dict[str, Any]:
+        encoded = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        if len(encoded.encode("utf-8")) > EVENT_PROPS_MAX_BYTES:
+            raise ValueError(f"event_props must be at most {EVENT_PROPS_MAX_BYTES} bytes")
+        return value
+
+
+class EventBatchRequest(BaseModel):
+    events: list[ClientEvent] = Field(min_length=1, max_length=EVENT_BATCH_MAX_EVENTS)
+
+
+class EventBatchResponse(BaseModel):
+    accepted: int = Field(ge=0)
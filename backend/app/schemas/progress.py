@@ -9,3 +9,7 @@ class WeeklyProgressResponse(BaseModel):
     summary_count: int = Field(ge=0)
     real_world_used_count: int = Field(ge=0)
     avg_outcome_score: float = Field(ge=0, le=5)
+
+
+class WeeklyProgressTrendResponse(BaseModel):
+    weeks: list[WeeklyProgressResponse]
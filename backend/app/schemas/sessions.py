@@ -27,6 +27,11 @@ class RewriteStyle(StrEnum):
     NEUTRAL = "NEUTRAL"
 
 
+class ExportFormat(StrEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 class SessionCreateRequest(BaseModel):
     scene_id: UUID
     target_turns: int = Field(ge=5, le=8)
@@ -116,7 +121,8 @@ class SessionHistoryListResponse(BaseModel):
     items: list[SessionHistoryListItem]
     limit: int = Field(ge=1, le=50)
     offset: int = Field(ge=0)
-    total: int = Field(ge=0)
+    total: int | None = Field(default=None, ge=0)
+    next_cursor: str | None = None
 
 
 class SessionHistoryFeedback(BaseModel):
@@ -163,3 +169,52 @@ class SessionHistoryDetailResponse(BaseModel):
     turns: list[SessionHistoryTurn]
     summary: SummaryCreateResponse | None = None
     reflection: SessionHistoryReflection | None = None
+
+
+class SessionExportRewrite(BaseModel):
+    rewrite_id: UUID
+    rewrite_style: RewriteStyle
+    rewritten_content: str
+    created_at: datetime
+
+
+class SessionExportTurn(SessionHistoryTurn):
+    rewrites: list[SessionExportRewrite] = Field(default_factory=list)
+
+
+class SessionExportRecord(SessionHistoryDetailResponse):
+    turns: list[SessionExportTurn]
+
+
+class SearchMatchSource(StrEnum):
+    SCENE = "SCENE"
+    USER_MESSAGE = "USER_MESSAGE"
+    ASSISTANT_MESSAGE = "ASSISTANT_MESSAGE"
+
+
+class SearchHighlight(BaseModel):
+    start: int = Field(ge=0)
+    length: int = Field(ge=1)
+
+
+class SessionSearchMatch(BaseModel):
+    source: SearchMatchSource
+    turn: int | None = Field(default=None, ge=0)
+    snippet: str
+    highlights: list[SearchHighlight]
+
+
+class SessionSearchItem(BaseModel):
+    session_id: UUID
+    scene_id: UUID
+    scene_title: str
+    state: SessionState
+    created_at: datetime
+    score: float = Field(ge=0)
+    matches: list[SessionSearchMatch]
+
+
+class SessionSearchResponse(BaseModel):
+    query: str
+    items: list[SessionSearchItem]
+    limit: int = Field(ge=1, le=20)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable, Sequence
+
+from app.core.config import settings
+from app.db.event_logs import EventLogRow, insert_event_logs
+
+logger = logging.getLogger("nvc.events")
+
+EventWriter = Callable[[Sequence[EventLogRow]], Awaitable[int]]
+
+
+async def _write_with_new_session(rows: Sequence[EventLogRow]) -> int:
+    from app.db.session import SessionLocal
+
+    async with SessionLocal() as db:
+        inserted = await insert_event_logs(db, rows)
+        await db.commit()
+    return inserted
+
+
+class EventBuffer:
+    def __init__(
+        self,
+        *,
+        max_pending: int,
+        batch_size: int,
+        flush_interval_seconds: float,
+        writer: EventWriter = _write_with_new_session,
+    ) -> None:
+        self._max_pending = max(1, max_pending)
+        self._batch_size = max(1, batch_size)
+        self._flush_interval_seconds = max(0.01, flush_interval_seconds)
+        self._writer = writer
+        self._pending: deque[EventLogRow] = deque()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._closed = False
+        self._accepted = 0
+        self._rejected = 0
+        self._written = 0
+        self._dropped = 0
+        self._flushes = 0
+        self._failed_flushes = 0
+
+    def configure(
+        self,
+        *,
+        max_pending: int | None = None,
+        batch_size: int | None = None,
+        flush_interval_seconds: float | None = None,
+    ) -> None:
+        if max_pending is not None:
+            self._max_pending = max(1, max_pending)
+        if batch_size is not None:
+            self._batch_size = max(1, batch_size)
+        if flush_interval_seconds is not None:
+            self._flush_interval_seconds = max(0.01, flush_interval_seconds)
+
+    def offer(self, rows: Sequence[EventLogRow]) -> bool:
+        # All-or-nothing so a client retrying a rejected batch never duplicates
+        # the half that was accepted.
+        if self._closed or len(self._pending) + len(rows) > self._max_pending:
+            self._rejected += len(rows)
+            return False
+        self._pending.extend(rows)
+        self._accepted += len(rows)
+        self._ensure_flusher()
+        if len(self._pending) >= self._batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def start(self) -> None:
+        self._closed = False
+        self._ensure_flusher()
+
+    async def close(self) -> None:
+        self._closed = True
+        task = self._task
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            self._wakeup.set()
+            await task
+        else:
+            await self.flush()
+        self._task = None
+        self._wakeup = None
+
+    async def flush(self) -> None:
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self._batch_size, len(self._pending)))]
+            self._flushes += 1
+            try:
+                self._written += await self._writer(batch)
+            except Exception:
+                # A failing batch is dropped rather than retried so one poison row
+                # cannot wedge the buffer; the count shows up in stats().
+                self._failed_flushes += 1
+                self._dropped += len(batch)
+                logger.exception("event batch flush failed", extra={"events": len(batch)})
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "max_pending": self._max_pending,
+            "accepted": self._accepted,
+            "rejected": self._rejected,
+            "written": self._written,
+            "dropped": self._dropped,
+            "flushes": self._flushes,
+            "failed_flushes": self._failed_flushes,
+        }
+
+    def _ensure_flusher(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # A task bound to another (possibly finished) loop cannot be reused, so
+        # the flusher follows whichever loop is currently serving requests.
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run(self._wakeup))
+
+    async def _run(self, wakeup: asyncio.Event) -> None:
+        while True:
+            # asyncio.timeout rather than wait_for: wait_for can swallow a
+            # cancellation that races with the wakeup and keep the loop alive.
+            try:
+                async with asyncio.timeout(self._flush_interval_seconds):
+                    await wakeup.wait()
+            except TimeoutError:
+                pass
+            wakeup.clear()
+            await self.flush()
+            if self._closed:
+                return
+
+
+event_buffer = EventBuffer(
+    max_pending=settings.event_buffer_max_events,
+    batch_size=settings.event_flush_batch_size,
+    flush_interval_seconds=settings.event_flush_interval_ms / 1000,
+)
@@ -1,11 +1,21 @@
 import asyncio
 import json
+import logging
 import re
 from dataclasses import dataclass
+from time import perf_counter
 
 import httpx
 
 from app.core.config import settings
+from app.core.observability import observability_registry
+from app.core.request_trace import (
+    STAGE_ANALYSIS,
+    STAGE_LLM,
+    current_trace,
+    record_llm_attempt,
+    timed_stage,
+)
 from app.schemas.sessions import (
     FeedbackPayload,
     OfnrDimensionFeedback,
@@ -42,6 +52,42 @@ REQUEST_HINTS = ("你愿意", "可以", "能否", "可否", "请你", "是否可
 OBSERVATION_HINTS = ("我观察到", "我注意到", "过去", "本周", "昨天", "两次", "三次", "延期", "延迟")
 WEAK_OBSERVATION_HINTS = ("这次", "最近", "这周")
 
+LLM_TIMEOUT_SECONDS = 20.0
+LLM_MAX_ATTEMPTS = 3
+LLM_RETRY_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+LLM_OUTCOME_OK = "ok"
+LLM_OUTCOME_EMPTY = "empty"
+LLM_OUTCOME_RETRYABLE_STATUS = "retryable_status"
+LLM_OUTCOME_HTTP_ERROR = "http_error"
+LLM_OUTCOME_TIMEOUT = "timeout"
+LLM_OUTCOME_NETWORK_ERROR = "network_error"
+LLM_OUTCOME_PARSE_ERROR = "parse_error"
+
+_RETRYABLE_OUTCOMES = {
+    LLM_OUTCOME_RETRYABLE_STATUS,
+    LLM_OUTCOME_TIMEOUT,
+    LLM_OUTCOME_NETWORK_ERROR,
+}
+
+# What the completion was for; callers fall back to canned text on None.
+LLM_PURPOSE_ASSISTANT = "assistant"
+LLM_PURPOSE_REWRITE = "rewrite"
+# Fallback reason when no LLM_API_KEY is configured; otherwise the final outcome.
+LLM_FALLBACK_DISABLED = "disabled"
+
+llm_logger = logging.getLogger("nvc.llm")
+
+
+@dataclass(slots=True)
+class CompletionAttempt:
+    outcome: str
+    status_code: int | None = None
+    text: str | None = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    duration_ms: float = 0.0
+
 
 @dataclass(slots=True)
 class AnalysisResult:
@@ -66,6 +112,11 @@ def _make_dimension(status: OfnrStatus, reason: str, suggestion: str) -> OfnrDim
 
 
 def analyze_message(content: str) -> AnalysisResult:
+    with timed_stage(STAGE_ANALYSIS):
+        return _analyze_message(content)
+
+
+def _analyze_message(content: str) -> AnalysisResult:
     text = content.strip()
     lowered = text.lower()
 
@@ -237,10 +288,33 @@ def build_rewrite_sentence(source_text: str) -> str:
     return f"{observation}，{feeling}，因为{need}。{request}？"
 
 
-async def _call_openai_compatible(messages: list[dict], temperature: float = 0.4, max_tokens: int = 300) -> str | None:
+async def _call_openai_compatible(
+    messages: list[dict],
+    temperature: float = 0.4,
+    max_tokens: int = 300,
+    *,
+    purpose: str,
+) -> str | None:
     if not settings.llm_api_key:
+        _observe_llm_call(purpose, [], 0.0, LLM_FALLBACK_DISABLED)
         return None
+    started_at = perf_counter()
+    # Retries and backoff sleeps count too: they are time the caller waited.
+    with timed_stage(STAGE_LLM):
+        attempts = await _request_completion(messages, temperature, max_tokens)
+    final = attempts[-1]
+    _observe_llm_call(
+        purpose,
+        attempts,
+        (perf_counter() - started_at) * 1000,
+        None if final.text else final.outcome,
+    )
+    return final.text
 
+
+async def _request_completion(
+    messages: list[dict], temperature: float, max_tokens: int
+) -> list[CompletionAttempt]:
     url = f"{settings.openai_base_url.rstrip('/')}/chat/completions"
     payload = {
         "model": settings.llm_model,
@@ -253,55 +327,125 @@ async def _call_openai_compatible(messages: list[dict], temperature: float = 0.4
         "Content-Type": "application/json",
     }
 
-    retry_statuses = {408, 409, 425, 429, 500, 502, 503, 504}
-    max_attempts = 3
-
-    for attempt in range(max_attempts):
-        try:
-            async with httpx.AsyncClient(timeout=20.0) as client:
-                response = await client.post(url, headers=headers, json=payload)
-                if response.status_code in retry_statuses and attempt < max_attempts - 1:
-                    await asyncio.sleep(0.5 * (attempt + 1))
-                    continue
-
-                response.raise_for_status()
-                data = response.json()
-                choices = data.get("choices") if isinstance(data, dict) else None
-                if not isinstance(choices, list) or not choices:
-                    return None
-
-                message = choices[0].get("message") if isinstance(choices[0], dict) else None
-                content = message.get("content") if isinstance(message, dict) else None
-
-                if isinstance(content, str):
-                    normalized = content.strip()
-                    return normalized or None
-
-                if isinstance(content, list):
-                    text_parts = []
-                    for item in content:
-                        if isinstance(item, dict) and item.get("type") == "text":
-                            text_value = item.get("text")
-                            if isinstance(text_value, str):
-                                text_parts.append(text_value.strip())
-                    merged = " ".join(part for part in text_parts if part)
-                    return merged or None
-
-                return None
-        except httpx.HTTPStatusError as exc:
-            status_code = exc.response.status_code if exc.response is not None else None
-            if status_code in retry_statuses and attempt < max_attempts - 1:
-                await asyncio.sleep(0.5 * (attempt + 1))
-                continue
-            return None
-        except httpx.HTTPError:
-            if attempt < max_attempts - 1:
-                await asyncio.sleep(0.5 * (attempt + 1))
-                continue
-            return None
-        except (KeyError, IndexError, ValueError, TypeError, AttributeError, json.JSONDecodeError):
-            return None
-    return None
+    attempts = []
+    for attempt_no in range(1, LLM_MAX_ATTEMPTS + 1):
+        started_at = perf_counter()
+        attempt = await _attempt_completion(url, headers, payload)
+        attempt.duration_ms = (perf_counter() - started_at) * 1000
+        record_llm_attempt(attempt_no, attempt.outcome, attempt.status_code, attempt.duration_ms)
+        attempts.append(attempt)
+        if attempt.outcome in _RETRYABLE_OUTCOMES and attempt_no < LLM_MAX_ATTEMPTS:
+            await asyncio.sleep(0.5 * attempt_no)
+            continue
+        break
+    return attempts
+
+
+async def _attempt_completion(url: str, headers: dict, payload: dict) -> CompletionAttempt:
+    # One call to the completions endpoint.
+    try:
+        async with httpx.AsyncClient(timeout=LLM_TIMEOUT_SECONDS) as client:
+            response = await client.post(url, headers=headers, json=payload)
+    except httpx.TimeoutException:
+        return CompletionAttempt(LLM_OUTCOME_TIMEOUT)
+    except httpx.HTTPError:
+        return CompletionAttempt(LLM_OUTCOME_NETWORK_ERROR)
+
+    status_code = response.status_code
+    if status_code in LLM_RETRY_STATUSES:
+        return CompletionAttempt(LLM_OUTCOME_RETRYABLE_STATUS, status_code)
+    if not response.is_success:
+        return CompletionAttempt(LLM_OUTCOME_HTTP_ERROR, status_code)
+    try:
+        data = response.json()
+        text = _completion_text(data)
+    except (KeyError, IndexError, ValueError, TypeError, AttributeError):
+        return CompletionAttempt(LLM_OUTCOME_PARSE_ERROR, status_code)
+    prompt_tokens, completion_tokens = _completion_usage(data)
+    return CompletionAttempt(
+        LLM_OUTCOME_OK if text else LLM_OUTCOME_EMPTY,
+        status_code,
+        text or None,
+        prompt_tokens,
+        completion_tokens,
+    )
+
+
+def _completion_usage(data: dict) -> tuple[int, int]:
+    # Token counts are optional in OpenAI-compatible responses.
+    usage = data.get("usage")
+    if not isinstance(usage, dict):
+        return 0, 0
+    counts = []
+    for key in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(key)
+        counts.append(value if isinstance(value, int) and value > 0 else 0)
+    return counts[0], counts[1]
+
+
+def _observe_llm_call(
+    purpose: str,
+    attempts: list[CompletionAttempt],
+    duration_ms: float,
+    fallback_reason: str | None,
+) -> None:
+    attempt_items = [
+        (attempt.outcome, attempt.status_code, attempt.duration_ms) for attempt in attempts
+    ]
+    prompt_tokens = sum(attempt.prompt_tokens for attempt in attempts)
+    completion_tokens = sum(attempt.completion_tokens for attempt in attempts)
+    observability_registry.observe_llm_call(
+        purpose,
+        attempts=attempt_items,
+        duration_ms=duration_ms,
+        fallback_reason=fallback_reason,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+    )
+    if not attempts:
+        return
+    trace = current_trace()
+    llm_logger.info(
+        json.dumps(
+            {
+                "request_id": trace.request_id if trace is not None else None,
+                "purpose": purpose,
+                "attempts": [
+                    {"outcome": outcome, "status_code": status_code, "ms": round(ms, 2)}
+                    for outcome, status_code, ms in attempt_items
+                ],
+                "latency_ms": round(duration_ms, 2),
+                "fallback": fallback_reason,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+    )
+
+
+def _completion_text(data: dict) -> str:
+    choices = data.get("choices") if isinstance(data, dict) else None
+    if not isinstance(choices, list) or not choices:
+        raise ValueError("completion has no choices")
+
+    message = choices[0].get("message") if isinstance(choices[0], dict) else None
+    content = message.get("content") if isinstance(message, dict) else None
+
+    if isinstance(content, str):
+        return content.strip()
+
+    if isinstance(content, list):
+        text_parts = []
+        for item in content:
+            if isinstance(item, dict) and item.get("type") == "text":
+                text_value = item.get("text")
+                if isinstance(text_value, str):
+                    text_parts.append(text_value.strip())
+        return " ".join(part for part in text_parts if part)
+
+    raise ValueError("completion has no text content")
 
 
 async def generate_assistant_reply_online(
@@ -321,6 +465,7 @@ async def generate_assistant_reply_online(
         [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
         temperature=0.5,
         max_tokens=220,
+        purpose=LLM_PURPOSE_ASSISTANT,
     )
 
 
@@ -342,6 +487,7 @@ async def generate_rewrite_online(source_text: str) -> str | None:
         [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
         temperature=0.2,
         max_tokens=200,
+        purpose=LLM_PURPOSE_REWRITE,
     )
 
 
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Mapping
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from app.schemas.sessions import (
+    ExportFormat,
+    OfnrFeedback,
+    SessionExportRecord,
+    SessionExportRewrite,
+    SessionExportTurn,
+    SessionHistoryFeedback,
+    SessionHistoryReflection,
+    SessionHistoryScene,
+    SessionState,
+    SummaryCreateResponse,
+)
+
+# Small enough that clients see steady progress, large enough to avoid a
+# send() per row on big histories.
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+EXPORT_CSV_COLUMNS = (
+    "session_id",
+    "session_state",
+    "session_created_at",
+    "session_ended_at",
+    "target_turns",
+    "current_turn",
+    "scene_id",
+    "scene_title",
+    "scene_template_id",
+    "scene_goal",
+    "scene_context",
+    "turn",
+    "user_message_id",
+    "user_content",
+    "assistant_content",
+    "overall_score",
+    "risk_level",
+    "ofnr",
+    "next_best_sentence",
+    "rewrites",
+    "summary_opening_line",
+    "summary_request_line",
+    "summary_fallback_line",
+    "summary_risk_triggers",
+    "reflection_used_in_real_world",
+    "reflection_outcome_score",
+    "reflection_blocker_code",
+    "reflection_blocker_note",
+)
+
+# Spreadsheet apps evaluate cells starting with these as formulas.
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def parse_ofnr_detail(value: dict | str | None) -> OfnrFeedback | None:
+    if value is None:
+        return None
+    payload = value
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    return OfnrFeedback.model_validate(payload)
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def build_export_turn(row: Mapping[str, Any]) -> SessionExportTurn | None:
+    if row["user_message_id"] is None:
+        return None
+    feedback = None
+    if row["overall_score"] is not None or row["next_best_sentence"] is not None:
+        try:
+            parsed_ofnr = parse_ofnr_detail(row["ofnr_detail"])
+        except (ValueError, TypeError, json.JSONDecodeError):
+            parsed_ofnr = None
+        feedback = SessionHistoryFeedback(
+            overall_score=row["overall_score"],
+            risk_level=row["risk_level"],
+            ofnr=parsed_ofnr,
+            next_best_sentence=row["next_best_sentence"],
+        )
+    rewrites = [
+        SessionExportRewrite.model_validate(item) for item in _json_value(row["rewrites"]) or []
+    ]
+    return SessionExportTurn(
+        turn=row["turn_no"],
+        user_message_id=row["user_message_id"],
+        user_content=row["user_content"],
+        assistant_message_id=row["assistant_message_id"],
+        assistant_content=row["assistant_content"],
+        feedback=feedback,
+        rewrites=rewrites,
+    )
+
+
+def build_export_record(
+    row: Mapping[str, Any],
+    turns: list[SessionExportTurn],
+) -> SessionExportRecord:
+    summary = None
+    if row["summary_id"]:
+        summary = SummaryCreateResponse(
+            summary_id=row["summary_id"],
+            opening_line=row["opening_line"],
+            request_line=row["request_line"],
+            fallback_line=row["fallback_line"] or "",
+            risk_triggers=_json_value(row["risk_triggers"]) or [],
+            created_at=row["summary_created_at"],
+        )
+    reflection = None
+    if row["reflection_id"]:
+        reflection = SessionHistoryReflection(
+            reflection_id=row["reflection_id"],
+            used_in_real_world=bool(row["used_in_real_world"]),
+            outcome_score=row["outcome_score"],
+            blocker_code=row["blocker_code"],
+            blocker_note=row["blocker_note"],
+            created_at=row["reflection_created_at"],
+        )
+    return SessionExportRecord(
+        session_id=row["session_id"],
+        scene=SessionHistoryScene(
+            scene_id=row["scene_id"],
+            title=row["scene_title"],
+            goal=row["scene_goal"],
+            context=row["scene_context"],
+            template_id=row["scene_template_id"],
+        ),
+        state=SessionState(row["state"]),
+        current_turn=row["current_turn"],
+        target_turns=row["target_turns"],
+        created_at=row["created_at"],
+        ended_at=row["ended_at"],
+        turns=turns,
+        summary=summary,
+        reflection=reflection,
+    )
+
+
+def _csv_cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (UUID, int, float)):
+        return str(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    text_value = str(value)
+    if text_value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + text_value
+    return text_value
+
+
+def build_export_csv_row(row: Mapping[str, Any]) -> list[str]:
+    ofnr_detail = _json_value(row["ofnr_detail"])
+    has_reflection = row["reflection_id"] is not None
+    return [
+        _csv_cell(value)
+        for value in (
+            row["session_id"],
+            row["state"],
+            row["created_at"],
+            row["ended_at"],
+            row["target_turns"],
+            row["current_turn"],
+            row["scene_id"],
+            row["scene_title"],
+            row["scene_template_id"],
+            row["scene_goal"],
+            row["scene_context"],
+            row["turn_no"],
+            row["user_message_id"],
+            row["user_content"],
+            row["assistant_content"],
+            row["overall_score"],
+            row["risk_level"],
+            ofnr_detail,
+            row["next_best_sentence"],
+            _json_value(row["rewrites"]) if row["user_message_id"] is not None else None,
+            row["opening_line"],
+            row["request_line"],
+            row["fallback_line"],
+            _json_value(row["risk_triggers"]) if row["summary_id"] is not None else None,
+            row["used_in_real_world"] if has_reflection else None,
+            row["outcome_score"],
+            row["blocker_code"],
+            row["blocker_note"],
+        )
+    ]
+
+
+class _CsvEncoder:
+    def __init__(self) -> None:
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def encode(self, values: list[str] | tuple[str, ...]) -> bytes:
+        self._writer.writerow(values)
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data.encode("utf-8")
+
+
+async def iter_session_export(
+    rows: AsyncIterator[Mapping[str, Any]],
+    export_format: ExportFormat,
+) -> AsyncIterator[bytes]:
+    # Rows arrive one per (session, turn), ordered by session. Only the current
+    # session is held in memory, so memory stays flat however long the history.
+    pending: list[bytes] = []
+    pending_bytes = 0
+    flushed_once = False
+
+    def take() -> bytes:
+        nonlocal pending_bytes, flushed_once
+        chunk = b"".join(pending)
+        pending.clear()
+        pending_bytes = 0
+        flushed_once = True
+        return chunk
+
+    if export_format == ExportFormat.CSV:
+        encoder = _CsvEncoder()
+        # The BOM lets spreadsheet apps detect UTF-8 for non-ASCII content.
+        yield "\ufeff".encode("utf-8") + encoder.encode(EXPORT_CSV_COLUMNS)
+        async for row in rows:
+            line = encoder.encode(build_export_csv_row(row))
+            pending.append(line)
+            pending_bytes += len(line)
+            if not flushed_once or pending_bytes >= EXPORT_FLUSH_BYTES:
+                yield take()
+        if pending:
+            yield take()
+        return
+
+    current_row: Mapping[str, Any] | None = None
+    turns: list[SessionExportTurn] = []
+    async for row in rows:
+        if current_row is not None and row["session_id"] != current_row["session_id"]:
+            line = build_export_record(current_row, turns).model_dump_json().encode("utf-8") + b"\n"
+            pending.append(line)
+            pending_bytes += len(line)
+            turns = []
+            if not flushed_once or pending_bytes >= EXPORT_FLUSH_BYTES:
+                yield take()
+        current_row = row
+        turn = build_export_turn(row)
+        if turn is not None:
+            turns.append(turn)
+    if current_row is not None:
+        pending.append(build_export_record(current_row, turns).model_dump_json().encode("utf-8") + b"\n")
+    if pending:
+        yield take()
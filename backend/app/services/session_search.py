@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+ELLIPSIS = "…"
+
+# Same ranges as nvc_search_lexemes (migrations 0007 and 0012).
+_CJK_RUN = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+")
+# ASCII runs the index can serve: nvc_search_lexemes keeps word trigrams.
+_ASCII_RUN = re.compile("[a-z0-9]{3,}")
+
+
+@dataclass(slots=True)
+class SearchSnippet:
+    text: str
+    highlights: list[tuple[int, int]]
+
+
+def search_index_query(keyword: str) -> str | None:
+    # Input for nvc_search_tsquery that only narrows rows a substring match of
+    # keyword could hit. CJK characters are indexed as unigrams and bigrams and
+    # ASCII words as trigrams, so every CJK run and every ASCII run of 3+
+    # characters of the keyword is in the index wherever the keyword occurs,
+    # even mid-word ("view" inside "review"). None means nothing in the keyword
+    # is indexed (only punctuation or 1-2 letter runs) and it cannot be served.
+    normalized = keyword.lower()
+    runs = _CJK_RUN.findall(normalized) + _ASCII_RUN.findall(normalized)
+    return " ".join(runs) if runs else None
+
+
+def build_search_snippet(content: str, keyword: str, radius: int = 36) -> SearchSnippet:
+    # Highlights are (start, length) offsets into the snippet text so clients can
+    # render emphasis without trusting markup from the server.
+    normalized_keyword = keyword.strip()
+    pattern = re.compile(re.escape(normalized_keyword), re.IGNORECASE) if normalized_keyword else None
+    matches = list(pattern.finditer(content)) if pattern else []
+    if not matches:
+        if len(content) <= radius * 2:
+            return SearchSnippet(text=content, highlights=[])
+        return SearchSnippet(text=content[: radius * 2] + ELLIPSIS, highlights=[])
+
+    first = matches[0]
+    window_start = max(0, first.start() - radius)
+    window_end = min(len(content), first.end() + radius)
+    prefix = ELLIPSIS if window_start > 0 else ""
+    suffix = ELLIPSIS if window_end < len(content) else ""
+
+    highlights = [
+        (match.start() - window_start + len(prefix), match.end() - match.start())
+        for match in matches
+        if match.start() >= window_start and match.end() <= window_end
+    ]
+    return SearchSnippet(
+        text=f"{prefix}{content[window_start:window_end]}{suffix}",
+        highlights=highlights,
+    )
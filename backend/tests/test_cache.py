@@ -0,0 +1,51 @@
+from app.core.cache import LruTtlCache
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_ttl_cache_evicts_least_recently_used():
+    cache: LruTtlCache[str, int] = LruTtlCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_lru_ttl_cache_expires_entries():
+    clock = _FakeClock()
+    cache: LruTtlCache[str, str] = LruTtlCache(max_entries=4, ttl_seconds=10, clock=clock)
+    cache.set("default", "x")
+    cache.set("short", "y", ttl_seconds=1)
+
+    clock.now += 2
+    assert cache.get("short") is None
+    assert cache.get("default") == "x"
+
+    clock.now += 10
+    assert cache.get("default") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_ttl_cache_configure_shrinks_capacity():
+    cache: LruTtlCache[int, int] = LruTtlCache(max_entries=3)
+    for key in range(3):
+        cache.set(key, key)
+
+    cache.configure(max_entries=1)
+    assert cache.stats()["size"] == 1
+    assert cache.get(2) == 2
@@ -35,6 +35,20 @@ def test_prod_allows_mock_auth_with_explicit_override():
     assert cfg.allow_mock_auth_in_production is True
 
 
+def test_profiler_requires_an_ops_token():
+    payload = _base_kwargs()
+    payload["PROFILER_ENABLED"] = "true"
+    payload["OPS_TOKEN"] = "  "
+
+    with pytest.raises(ValueError):
+        Settings(**payload)
+
+    payload["OPS_TOKEN"] = "ops-secret"
+    cfg = Settings(**payload)
+    assert cfg.profiler_enabled is True
+    assert cfg.ops_token == "ops-secret"
+
+
 def test_observability_config_numeric_normalization():
     payload = _base_kwargs()
     payload["SLOW_REQUEST_MS"] = "0"
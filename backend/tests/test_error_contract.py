@@ -43,3 +43,16 @@ def test_validation_error_uses_error_contract():
     payload = response.json()
     _assert_error_contract(payload)
     assert payload["error_code"] == "VALIDATION_ERROR"
+
+
+def test_invalid_history_cursor_uses_error_contract():
+    client = TestClient(create_app())
+    response = client.get(
+        "/api/v1/sessions?cursor=not-a-cursor",
+        headers=TEST_USER_HEADER,
+    )
+    assert response.status_code == 400
+
+    payload = response.json()
+    _assert_error_contract(payload)
+    assert payload["error_code"] == "VALIDATION_ERROR"
@@ -0,0 +1,43 @@
+import random
+
+from app.core.heavy_hitters import SpaceSaving
+
+
+def test_frequent_keys_survive_adversarial_unique_keys():
+    rng = random.Random(3)
+    sketch = SpaceSaving(capacity=16)
+    for step in range(20000):
+        if step % 4 == 0:
+            sketch.add("GET /real")
+        elif step % 10 == 1:
+            sketch.add("POST /also-real")
+        else:
+            sketch.add(f"GET /probe/{rng.getrandbits(64):x}")
+
+    assert len(sketch) == 16
+    assert sketch.total == 20000
+    counts = {key: (count, error) for key, count, error in sketch.top()}
+    for key, true_count in (("GET /real", 5000), ("POST /also-real", 2000)):
+        count, error = counts[key]
+        assert count - error <= true_count <= count
+    assert sketch.top(1)[0][0] == "GET /real"
+
+
+def test_merged_sketches_keep_bounds_and_capacity():
+    left, right = SpaceSaving(capacity=4), SpaceSaving(capacity=4)
+    for key, times in (("a", 50), ("b", 30), ("c", 5), ("d", 4), ("e", 3)):
+        for _ in range(times):
+            left.add(key)
+    for key, times in (("a", 10), ("f", 40), ("g", 2), ("h", 1)):
+        for _ in range(times):
+            right.add(key)
+
+    merged = SpaceSaving.from_state(4, left.to_state())
+    merged.merge(SpaceSaving.from_state(4, right.to_state()))
+
+    assert len(merged) == 4
+    assert merged.total == left.total + right.total
+    counts = {key: (count, error) for key, count, error in merged.top()}
+    for key, true_count in (("a", 60), ("f", 40), ("b", 30)):
+        count, error = counts[key]
+        assert count - error <= true_count <= count
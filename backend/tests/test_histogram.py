@@ -0,0 +1,68 @@
+import random
+
+from app.core.histogram import (
+    BUCKET_COUNT,
+    MAX_VALUE_US,
+    LatencyHistogram,
+    bucket_index,
+    bucket_upper_bound_us,
+)
+
+
+def test_buckets_are_contiguous_with_bounded_relative_error():
+    for value_us in range(0, 200_000, 7):
+        index = bucket_index(value_us)
+        upper = bucket_upper_bound_us(index)
+        assert upper >= value_us
+        assert index == 0 or bucket_upper_bound_us(index - 1) < value_us
+        assert upper - value_us <= max(1, value_us * 0.0625)
+    assert bucket_index(MAX_VALUE_US * 2) == BUCKET_COUNT - 1
+
+
+def test_percentiles_track_exact_values_within_bucket_width():
+    rng = random.Random(7)
+    values = sorted(rng.expovariate(1 / 80) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    percentiles = histogram.percentiles_ms()
+    for percentile in (50.0, 90.0, 95.0, 99.0):
+        exact = values[int(len(values) * percentile / 100) - 1]
+        assert exact <= percentiles[percentile] <= exact * 1.07 + 0.001
+    assert histogram.count == 20000
+    assert histogram.max_us == int(values[-1] * 1000)
+
+
+def test_merged_histograms_equal_one_histogram_of_all_values():
+    rng = random.Random(11)
+    values = [rng.uniform(0.1, 3000) for _ in range(5000)]
+    combined, left, right = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for index, value in enumerate(values):
+        combined.record(value)
+        (left if index % 2 else right).record(value)
+
+    left.merge(LatencyHistogram.from_dict(right.to_dict()))
+
+    assert left.to_dict() == combined.to_dict()
+    assert left.percentiles_ms() == combined.percentiles_ms()
+
+
+def test_empty_histogram_reports_zeroes():
+    assert LatencyHistogram().percentiles_ms() == {50.0: 0.0, 90.0: 0.0, 95.0: 0.0, 99.0: 0.0}
+
+
+def test_cumulative_counts_never_overstate_le_bounds():
+    rng = random.Random(3)
+    values_ms = [rng.expovariate(1 / 40) for _ in range(3000)]
+    histogram = LatencyHistogram()
+    for value in values_ms:
+        histogram.record(value)
+    bounds_us = (5_000, 25_000, 100_000, 1_000_000)
+
+    cumulative = histogram.cumulative_counts(bounds_us)
+
+    assert cumulative == sorted(cumulative)
+    for bound_us, count in zip(bounds_us, cumulative):
+        exact = sum(1 for value in values_ms if int(value * 1000) <= bound_us)
+        assert exact * 0.9 <= count <= exact
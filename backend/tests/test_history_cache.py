@@ -0,0 +1,25 @@
+from uuid import uuid4
+
+from app.api.history_cache import build_history_etag, etag_matches
+
+
+def test_history_etag_changes_with_session_progress():
+    session_id = uuid4()
+    base = build_history_etag(session_id, 2, "ACTIVE", False, False)
+
+    assert base == build_history_etag(session_id, 2, "ACTIVE", False, False)
+    assert base.startswith('"') and base.endswith('"')
+    assert base != build_history_etag(session_id, 3, "ACTIVE", False, False)
+    assert base != build_history_etag(session_id, 2, "COMPLETED", False, False)
+    assert base != build_history_etag(session_id, 2, "ACTIVE", True, False)
+    assert base != build_history_etag(session_id, 2, "ACTIVE", False, True)
+    assert base != build_history_etag(uuid4(), 2, "ACTIVE", False, False)
+
+
+def test_etag_matches_handles_lists_weak_tags_and_wildcard():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"zzz", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"abd"', etag)
@@ -0,0 +1,86 @@
+import asyncio
+from uuid import UUID, uuid4
+
+from fastapi.testclient import TestClient
+
+from app.api.routers import sessions
+from app.api.routers.sessions import MESSAGE_ENDPOINT_KEY
+from app.core.cache import LruTtlCache
+from app.db import idempotency
+from app.db.idempotency import get_idempotent_response_bytes, idempotency_response_cache
+from app.main import create_app
+
+USER_ID = UUID("8a4c3f2a-2f88-4c74-9bc0-3123d26df302")
+TEST_USER_HEADER = {"Authorization": f"Bearer mock_{USER_ID}"}
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Result:
+    def __init__(self, row: dict) -> None:
+        self._row = row
+
+    def mappings(self):
+        return self
+
+    def first(self) -> dict:
+        return self._row
+
+
+class _Session:
+    def __init__(self, row: dict) -> None:
+        self._row = row
+
+    async def execute(self, _statement, _params):
+        return _Result(self._row)
+
+
+def test_message_retry_is_served_from_recent_key_cache_without_db(monkeypatch):
+    client = TestClient(create_app())
+    session_id = uuid4()
+    client_message_id = uuid4()
+    cached_body = b'{"user_message_id":"cached"}'
+    idempotency_response_cache.set(
+        (USER_ID, session_id, MESSAGE_ENDPOINT_KEY, client_message_id),
+        cached_body,
+    )
+    db_lookups = []
+
+    async def _db_lookup(_db, key):
+        db_lookups.append(key)
+
+    # The router imported the function by name; patch the copy it calls.
+    monkeypatch.setattr(sessions, "get_idempotent_response_bytes", _db_lookup)
+    try:
+        response = client.post(
+            f"/api/v1/sessions/{session_id}/messages",
+            headers=TEST_USER_HEADER,
+            json={"client_message_id": str(client_message_id), "content": "重试"},
+        )
+    finally:
+        idempotency_response_cache.clear()
+
+    assert response.status_code == 200
+    assert response.content == cached_body
+    assert response.headers["content-type"] == "application/json"
+    assert db_lookups == []
+
+
+def test_replay_loaded_from_db_is_cached_only_until_the_row_expires(monkeypatch):
+    clock = _Clock()
+    cache = LruTtlCache(max_entries=8, ttl_seconds=72 * 3600, clock=clock)
+    monkeypatch.setattr(idempotency, "idempotency_response_cache", cache)
+    key = (USER_ID, uuid4(), MESSAGE_ENDPOINT_KEY, uuid4())
+    db = _Session({"response_bytes": b"{}", "response_body": None, "ttl_seconds": 30.0})
+
+    assert asyncio.run(get_idempotent_response_bytes(db, key)) == b"{}"
+    clock.now += 29
+    assert cache.get(key) == b"{}"
+    clock.now += 2
+    assert cache.get(key) is None
@@ -0,0 +1,121 @@
+import asyncio
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.core.jwks import JwksManager
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _jwk(kid: str) -> dict:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return {**jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key(), as_dict=True), "kid": kid}
+
+
+class _FakeFetcher:
+    def __init__(self, *jwks: dict) -> None:
+        self.keys = list(jwks)
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self, _url: str) -> dict:
+        self.calls += 1
+        # Yield so concurrent callers really overlap with the in-flight fetch.
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise OSError("jwks unreachable")
+        return {"keys": list(self.keys)}
+
+
+def _manager(fetcher: _FakeFetcher, clock: _FakeClock | None = None) -> JwksManager:
+    return JwksManager(
+        url_resolver=lambda: "https://example.supabase.co/auth/v1/.well-known/jwks.json",
+        refresh_interval_seconds=600,
+        min_refresh_interval_seconds=30,
+        fetcher=fetcher,
+        clock=clock or _FakeClock(),
+    )
+
+
+def test_prefetched_keys_are_served_from_memory():
+    fetcher = _FakeFetcher(_jwk("k1"))
+    manager = _manager(fetcher)
+
+    async def _run():
+        await manager.refresh()
+        await manager.get_signing_key("k1")
+        await manager.get_signing_key("k1")
+
+    asyncio.run(_run())
+    assert fetcher.calls == 1
+    assert manager.stats()["keys"] == 1
+
+
+def test_unknown_kid_burst_triggers_a_single_fetch():
+    clock = _FakeClock()
+    fetcher = _FakeFetcher(_jwk("k1"))
+    manager = _manager(fetcher, clock)
+
+    async def _run():
+        await manager.refresh()
+        # Key rotation: a new kid appears once the cooldown has passed.
+        clock.now += 31
+        fetcher.keys.append(_jwk("k2"))
+        return await asyncio.gather(*(manager.get_signing_key("k2") for _ in range(20)))
+
+    keys = asyncio.run(_run())
+    assert len(keys) == 20
+    assert fetcher.calls == 2
+    assert manager.stats()["unknown_kid_refreshes"] == 1
+
+
+def test_unknown_kid_refetch_is_rate_limited():
+    clock = _FakeClock()
+    fetcher = _FakeFetcher(_jwk("k1"))
+    manager = _manager(fetcher, clock)
+
+    async def _lookup(kid):
+        with pytest.raises(jwt.PyJWKClientError):
+            await manager.get_signing_key(kid)
+
+    asyncio.run(manager.refresh())
+    asyncio.run(_lookup("random-1"))
+    asyncio.run(_lookup("random-2"))
+    assert fetcher.calls == 1
+
+    clock.now += 31
+    asyncio.run(_lookup("random-3"))
+    assert fetcher.calls == 2
+
+
+def test_failed_refresh_keeps_last_good_keys():
+    fetcher = _FakeFetcher(_jwk("k1"))
+    manager = _manager(fetcher)
+    asyncio.run(manager.refresh())
+
+    fetcher.fail = True
+    assert asyncio.run(manager.refresh()) is False
+    assert asyncio.run(manager.get_signing_key("k1")) is not None
+    stats = manager.stats()
+    assert stats["keys"] == 1
+    assert stats["refresh_failures"] == 1
+
+
+def test_token_without_kid_needs_a_single_key_set():
+    fetcher = _FakeFetcher(_jwk("k1"))
+    manager = _manager(fetcher)
+    asyncio.run(manager.refresh())
+    assert asyncio.run(manager.get_signing_key(None)) is not None
+
+    fetcher.keys.append(_jwk("k2"))
+    asyncio.run(manager.refresh())
+    with pytest.raises(jwt.PyJWKClientError):
+        asyncio.run(manager.get_signing_key(None))
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.loop_monitor import EventLoopMonitor
+from app.core.observability import observability_registry
+from app.main import create_app
+
+OPS_HEADERS = {"X-Ops-Token": "ops-secret"}
+
+
+@pytest.fixture(autouse=True)
+def _reset_observability_registry():
+    observability_registry.reset()
+    yield
+    observability_registry.reset()
+
+
+def _block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def test_monitor_records_lag_and_captures_the_blocking_stack(caplog):
+    monitor = EventLoopMonitor(probe_interval_seconds=0.02, stall_seconds=0.1)
+
+    async def _run():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        blocked_at = time.perf_counter()
+        _block_the_loop(0.3)
+        # Give the probe a turn to notice it woke up late.
+        await asyncio.sleep(0.05)
+        await monitor.close()
+        return blocked_at
+
+    with caplog.at_level(logging.WARNING, logger="nvc.event_loop"):
+        blocked_at = asyncio.run(_run())
+
+    event_loop = observability_registry.snapshot(slow_request_threshold_ms=1000)["event_loop"]
+    assert event_loop["probes"] >= 3
+    assert event_loop["stalls"] == 1
+    assert event_loop["max_ms"] >= 200
+    stall = event_loop["recent_stalls"][0]
+    assert stall["lag_ms"] >= 200
+    # Outermost first, ending at the call that was blocking the loop.
+    assert stall["stack"][-1].startswith("_block_the_loop (tests/test_loop_monitor.py:")
+    assert any(line.startswith("test_monitor_records_lag") for line in stall["stack"])
+
+    assert monitor.stalls_between(blocked_at, time.perf_counter()) == [stall]
+    assert monitor.stalls_between(0.0, blocked_at - 1) == []
+
+    logged = [json.loads(record.getMessage()) for record in caplog.records]
+    assert logged[0]["event"] == "event_loop_stall"
+    assert logged[0]["stack"] == stall["stack"]
+
+
+def test_slow_request_exemplar_carries_loop_stalls(monkeypatch):
+    monkeypatch.setattr(settings, "slow_request_ms", 100)
+    monkeypatch.setattr(settings, "event_loop_probe_interval_ms", 20)
+    monkeypatch.setattr(settings, "event_loop_stall_ms", 100)
+    monkeypatch.setattr(settings, "ops_token", "ops-secret")
+    app = create_app()
+
+    @app.get("/blocking")
+    async def blocking_handler():
+        _block_the_loop(0.3)
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        time.sleep(0.1)
+        assert client.get("/blocking").status_code == 200
+        items = client.get("/ops/slow-requests", headers=OPS_HEADERS).json()["items"]
+        metrics = client.get("/ops/metrics").json()
+        prometheus = client.get("/ops/metrics/prometheus", headers=OPS_HEADERS).text
+
+    blocked = next(item for item in items if item["route"] == "/blocking")
+    assert len(blocked["loop_stalls"]) == 1
+    stack = blocked["loop_stalls"][0]["stack"]
+    assert any(".<locals>.blocking_handler (tests/test_loop_monitor.py:" in line for line in stack)
+
+    event_loop = metrics["event_loop"]
+    assert event_loop["probe_interval_ms"] == 20
+    assert event_loop["stall_threshold_ms"] == 100
+    assert event_loop["stalls"] >= 1
+    assert event_loop["recent_stalls"][0]["stack"] == stack
+    assert "nvc_event_loop_lag_seconds_count " in prometheus
+    assert "nvc_event_loop_stalls_total " in prometheus
@@ -1,4 +1,11 @@
+import asyncio
+
+import httpx
+
+from app.core.config import settings
+from app.core.observability import observability_registry
 from app.schemas.sessions import RiskLevel
+from app.services import nvc_service
 from app.services.nvc_service import analyze_message, build_rewrite_sentence
 
 
@@ -18,3 +25,58 @@ def test_analyze_message_has_lower_score_for_aggressive_text():
     aggressive = analyze_message("你们总是拖延，根本不专业。")
     neutral = analyze_message("我观察到最近两周延期了两次，我有些焦虑，我需要更稳定的节奏，你愿意今天一起确认计划吗？")
     assert aggressive.feedback.overall_score < neutral.feedback.overall_score
+
+
+def test_llm_calls_report_attempts_retries_fallbacks_and_tokens(monkeypatch):
+    responses = iter(
+        [
+            httpx.Response(503),
+            httpx.Response(
+                200,
+                json={
+                    "choices": [{"message": {"content": "好的，我们今天对齐一下。"}}],
+                    "usage": {"prompt_tokens": 40, "completion_tokens": 12},
+                },
+            ),
+            httpx.Response(200, content=b"not json"),
+        ]
+    )
+    transport = httpx.MockTransport(lambda request: next(responses))
+    real_client = httpx.AsyncClient
+
+    async def _no_sleep(_seconds):
+        return None
+
+    monkeypatch.setattr(settings, "llm_api_key", "test-key")
+    monkeypatch.setattr(
+        nvc_service.httpx,
+        "AsyncClient",
+        lambda **kwargs: real_client(transport=transport, **kwargs),
+    )
+    monkeypatch.setattr(nvc_service.asyncio, "sleep", _no_sleep)
+    observability_registry.reset()
+
+    assistant_reply = asyncio.run(nvc_service.generate_assistant_reply("上下文", "你好"))
+    rewrite = asyncio.run(nvc_service.generate_rewrite("你们总是拖延"))
+    monkeypatch.setattr(settings, "llm_api_key", "")
+    asyncio.run(nvc_service.generate_rewrite("你们总是拖延"))
+
+    assert assistant_reply == "好的，我们今天对齐一下。"
+    assert rewrite == build_rewrite_sentence("你们总是拖延")
+    llm = {
+        item["purpose"]: item
+        for item in observability_registry.snapshot(slow_request_threshold_ms=1000)["llm"]
+    }
+    assistant = llm["assistant"]
+    assert assistant["calls"] == 1
+    assert assistant["attempts_per_call"] == {"2": 1}
+    assert assistant["retry_reasons"] == {"503": 1}
+    assert assistant["outcomes"] == {"ok": 1, "retryable_status": 1}
+    assert assistant["fallbacks"] == 0
+    assert (assistant["prompt_tokens"], assistant["completion_tokens"]) == (40, 12)
+    rewrite_stats = llm["rewrite"]
+    assert rewrite_stats["calls"] == 2
+    assert rewrite_stats["parse_failures"] == 1
+    assert rewrite_stats["fallback_rate"] == 1.0
+    assert rewrite_stats["fallback_reasons"] == {"disabled": 1, "parse_error": 1}
+    observability_registry.reset()
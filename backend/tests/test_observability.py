@@ -1,13 +1,34 @@
 import json
 import logging
+import os
+import threading
+import time
+from datetime import UTC, datetime
 
 import pytest
 from fastapi.testclient import TestClient
 
 from app.core.config import settings
-from app.core.observability import observability_registry
+from app.core.observability import ObservabilityRegistry, observability_registry
+from app.core.prometheus import CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE
+from app.core.prometheus import format_labels
+from app.core.request_trace import (
+    record_cache_lookup,
+    record_llm_attempt,
+    record_stage,
+    record_statement,
+    timed_stage,
+)
+from app.db import session as db_session
 from app.main import create_app
 
+OPS_HEADERS = {"X-Ops-Token": "ops-secret"}
+
+
+@pytest.fixture(autouse=True)
+def _ops_token(monkeypatch):
+    monkeypatch.setattr(settings, "ops_token", "ops-secret")
+
 
 @pytest.fixture(autouse=True)
 def _reset_observability_registry():
@@ -35,6 +56,388 @@ def test_metrics_endpoint_tracks_status_counts():
     assert len(metrics["top_endpoints"]) >= 1
 
 
+def test_metrics_report_latency_percentiles_per_route_and_status_class():
+    client = TestClient(create_app())
+    for _ in range(5):
+        assert client.get("/health").status_code == 200
+    client.get("/path-not-found")
+
+    histograms = client.get("/ops/metrics").json()["latency_histograms"]
+    health = next(item for item in histograms if item["endpoint"] == "GET /health")
+    assert health["status_class"] == "2xx"
+    assert health["count"] == 5
+    assert 0 <= health["p50_ms"] <= health["p90_ms"] <= health["p99_ms"] <= health["max_ms"]
+    assert any(item["status_class"] == "4xx" for item in histograms)
+
+
+def test_prometheus_endpoint_renders_text_exposition():
+    client = TestClient(create_app())
+    for _ in range(3):
+        assert client.get("/health").status_code == 200
+
+    assert client.get("/ops/metrics/prometheus").status_code == 403
+    response = client.get("/ops/metrics/prometheus", headers=OPS_HEADERS)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == PROMETHEUS_CONTENT_TYPE
+    lines = response.text.splitlines()
+    assert 'nvc_http_requests_total{method="GET",route="/health",status="200"} 3' in lines
+    labels = 'method="GET",route="/health",status_class="2xx"'
+    assert f"nvc_http_request_duration_seconds_bucket{{{labels},le=\"+Inf\"}} 3" in lines
+    assert f"nvc_http_request_duration_seconds_count{{{labels}}} 3" in lines
+    buckets = [
+        int(line.rsplit(" ", 1)[1])
+        for line in lines
+        if line.startswith(f"nvc_http_request_duration_seconds_bucket{{{labels}")
+    ]
+    assert buckets == sorted(buckets)
+    assert '# TYPE nvc_cache_hits_total counter' in lines
+    assert any(line.startswith('nvc_cache_entries{cache="idempotency"}') for line in lines)
+    assert any(line.startswith('nvc_rate_limit_enabled{backend="memory"}') for line in lines)
+
+
+def test_prometheus_label_values_are_escaped():
+    assert format_labels((("route", 'a"b\\c\nd'),)) == '{route="a\\"b\\\\c\\nd"}'
+
+
+def test_request_stages_reach_header_log_and_metrics(caplog):
+    caplog.set_level(logging.INFO, logger="nvc.api.request")
+    app = create_app()
+
+    @app.get("/_staged")
+    async def _staged():
+        with timed_stage("db"):
+            pass
+        record_stage("db", 2.0)
+        record_stage("llm", 5.0)
+        return {"ok": True}
+
+    @app.get("/_staged_sync")
+    def _staged_sync():
+        # Sync handlers run in a worker thread with a copy of the context.
+        record_stage("analysis", 1.5)
+        return {"ok": True}
+
+    client = TestClient(app)
+    response = client.get("/_staged")
+    sync_response = client.get("/_staged_sync")
+
+    server_timing = response.headers["Server-Timing"].split(", ")
+    assert server_timing[1] == "llm;dur=5.0"
+    assert server_timing[0].startswith("db;dur=2.")
+    assert server_timing[-1].startswith("total;dur=")
+    assert sync_response.headers["Server-Timing"].startswith("analysis;dur=1.5, total;dur=")
+
+    logged = [
+        json.loads(record.message)
+        for record in caplog.records
+        if record.name == "nvc.api.request"
+    ]
+    staged_log = next(entry for entry in logged if entry["route"] == "/_staged")
+    assert staged_log["stages"]["db"]["count"] == 2
+    assert staged_log["stages"]["llm"] == {"ms": 5.0, "count": 1}
+
+    timings = client.get("/ops/metrics").json()["stage_timings"]
+    db_timing = next(item for item in timings if item["stage"] == "db")
+    assert db_timing["endpoint"] == "GET /_staged"
+    assert db_timing["requests"] == 1
+    assert db_timing["calls"] == 2
+
+    lines = client.get("/ops/metrics/prometheus", headers=OPS_HEADERS).text.splitlines()
+    labels = 'method="GET",route="/_staged",stage="llm"'
+    assert f"nvc_http_request_stage_duration_seconds_count{{{labels}}} 1" in lines
+    assert f"nvc_http_request_stage_calls_total{{{labels}}} 1" in lines
+
+
+def test_slow_requests_keep_stage_sql_llm_and_cache_exemplars(monkeypatch):
+    monkeypatch.setattr(settings, "slow_request_ms", 50)
+    app = create_app()
+
+    @app.get("/_slow/{item_id}")
+    def _slow(item_id: str):
+        record_cache_lookup("session_history", hit=False)
+        record_cache_lookup("session_history", hit=True)
+        record_statement("SELECT id\n  FROM sessions\n WHERE id = $1", 4.0, 1)
+        record_statement("UPDATE sessions SET turn_count = turn_count + 1", 2.0, -1)
+        record_llm_attempt(1, "timeout", None, 20.0)
+        record_llm_attempt(2, "ok", 200, 30.0)
+        time.sleep(0.06)
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.get("/_slow/abc").status_code == 200
+
+    assert client.get("/ops/slow-requests").status_code == 403
+    payload = client.get("/ops/slow-requests", headers=OPS_HEADERS).json()
+    assert payload["slow_request_threshold_ms"] == 50
+    # Other requests can cross a 50ms threshold on a loaded machine too.
+    (item,) = [item for item in payload["items"] if item["route"] == "/_slow/{item_id}"]
+    assert item["path"] == "/_slow/abc"
+    assert item["route"] == "/_slow/{item_id}"
+    assert item["latency_ms"] >= 50
+    assert item["stages"]["db"] == {"ms": 6.0, "count": 2}
+    assert item["statements"][0] == {
+        "statement": "SELECT id FROM sessions WHERE id = $1",
+        "duration_ms": 4.0,
+        "rows": 1,
+    }
+    assert item["statements"][1]["rows"] is None
+    assert item["statements_dropped"] == 0
+    assert [attempt["outcome"] for attempt in item["llm_attempts"]] == ["timeout", "ok"]
+    assert item["cache"] == {"session_history": {"hits": 1, "misses": 1}}
+
+
+class _FakeConnection:
+    def __init__(self) -> None:
+        self.info: dict = {}
+
+
+class _FakeCursor:
+    rowcount = 1
+
+
+def _execute(statement: str) -> None:
+    # Drives the engine event hooks the way a cursor execute would.
+    connection = _FakeConnection()
+    db_session._before_cursor_execute(connection, None, statement, (), None, False)
+    db_session._after_cursor_execute(connection, _FakeCursor(), statement, (), None, False)
+
+
+def test_statement_events_feed_sql_metrics_slow_log_and_budget(caplog, monkeypatch):
+    monkeypatch.setattr(settings, "sql_statement_budget", 3)
+    caplog.set_level(logging.INFO, logger="nvc.db")
+    app = create_app()
+
+    @app.get("/_n_plus_one")
+    def _n_plus_one():
+        _execute("SELECT id FROM sessions WHERE user_id = $1")
+        for message_id in range(4):
+            _execute(f"SELECT content FROM messages WHERE id = {message_id}")
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.get("/_n_plus_one").status_code == 200
+    with monkeypatch.context() as patch:
+        patch.setattr(settings, "slow_query_ms", 1)
+        patch.setattr(db_session, "perf_counter", iter([0.0, 0.005]).__next__)
+        # Outside any request, e.g. the event buffer flushing in the background.
+        _execute("UPDATE sessions SET turn_count = turn_count + 1")
+
+    sql = client.get("/ops/metrics").json()["sql"]
+    assert sql["statements"] == 6
+    assert sql["statement_budget"] == 3
+    assert sql["slow_statements"] == 1
+    assert sql["budget_exceeded_requests"] == 1
+    # The open snapshot carries ids only; the SQL behind them needs the token.
+    assert all("statement" not in item for item in sql["top_statements"])
+    assert client.get("/ops/sql-statements").status_code == 403
+    texts = client.get("/ops/sql-statements", headers=OPS_HEADERS).json()["items"]
+    assert [item["statement_id"] for item in texts] == [
+        item["statement_id"] for item in sql["top_statements"]
+    ]
+    statement_ids = {item["statement_id"]: item["statement"] for item in texts}
+    by_statement = {statement_ids[item["statement_id"]]: item for item in sql["top_statements"]}
+    repeated = by_statement["SELECT content FROM messages WHERE id = ?"]
+    assert repeated["count"] == 4
+    assert repeated["rows"] == 4
+    assert by_statement["UPDATE sessions SET turn_count = turn_count + ?"]["slow_count"] == 1
+    endpoint = next(item for item in sql["endpoints"] if item["endpoint"] == "GET /_n_plus_one")
+    assert endpoint["avg_statements"] == 5
+    assert endpoint["max_statements"] == 5
+    assert endpoint["budget_exceeded"] == 1
+
+    logged = {record.name: json.loads(record.message) for record in caplog.records}
+    budget_log = logged["nvc.db.statement_budget"]
+    assert budget_log["route"] == "/_n_plus_one"
+    assert budget_log["statements"] == 5
+    assert budget_log["repeated"] == [
+        {"statement": "SELECT content FROM messages WHERE id = ?", "count": 4}
+    ]
+    assert logged["nvc.db.slow_query"]["request_id"] is None
+
+    lines = client.get("/ops/metrics/prometheus", headers=OPS_HEADERS).text.splitlines()
+    assert 'nvc_http_statement_budget_exceeded_total{method="GET",route="/_n_plus_one"} 1' in lines
+    assert (
+        f'nvc_db_statement_duration_seconds_count{{statement_id="{repeated["statement_id"]}"}} 4'
+        in lines
+    )
+
+
+def test_statement_shapes_beyond_capacity_fold_into_other():
+    registry = ObservabilityRegistry(statement_capacity=2)
+    for index in range(5):
+        registry.observe_statement(f"SELECT * FROM table_{index}", 1.0)
+
+    statements = registry.snapshot(slow_request_threshold_ms=1000)["sql"]["top_statements"]
+    texts = {item["statement_id"]: item["statement"] for item in registry.sql_statements()}
+    counts = {texts[item["statement_id"]]: item["count"] for item in statements}
+    assert counts == {"SELECT * FROM table_0": 1, "SELECT * FROM table_1": 1, "<other>": 3}
+
+
+def test_stage_recording_outside_a_request_is_a_noop():
+    record_stage("db", 1.0)
+    with timed_stage("llm"):
+        pass
+
+    client = TestClient(create_app())
+    assert client.get("/health").headers["Server-Timing"].startswith("total;dur=")
+
+
+def _observe(registry: ObservabilityRegistry, route: str, status_code: int = 200) -> None:
+    registry.observe(
+        request_id="req",
+        method="GET",
+        path=route,
+        route=route,
+        status_code=status_code,
+        latency_ms=12.0,
+        is_slow=False,
+        stages={"db": [3.0, 2]},
+    )
+
+
+def test_observations_from_many_threads_are_merged_on_read():
+    registry = ObservabilityRegistry()
+
+    def _worker():
+        for _ in range(250):
+            _observe(registry, "/threaded")
+
+    threads = [threading.Thread(target=_worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = registry.snapshot(slow_request_threshold_ms=1000)
+    assert snapshot["workers"] == 1
+    assert snapshot["total_requests"] == 1000
+    assert snapshot["latency_histograms"][0]["count"] == 1000
+    assert snapshot["stage_timings"][0]["calls"] == 2000
+    assert registry.export_series()["requests"][("GET", "/threaded", 200)] == 1000
+
+
+def test_windows_report_recent_rates_after_long_uptime():
+    now = [1_000_000.0]
+    registry = ObservabilityRegistry(clock=lambda: now[0])
+    for _ in range(3600):
+        _observe(registry, "/steady")
+        now[0] += 1.0
+    # A fresh burst of errors dominates the 1m window but not the totals.
+    for _ in range(30):
+        _observe(registry, "/steady", status_code=500)
+        now[0] += 0.5
+
+    snapshot = registry.snapshot(slow_request_threshold_ms=1000)
+    windows = {item["window"]: item for item in snapshot["windows"]}
+
+    assert list(windows) == ["1m", "5m", "1h"]
+    # The window is the current (partial) slot plus the 59 before it.
+    assert windows["1m"]["requests"] == 30 + 44
+    assert windows["1m"]["requests_per_second"] == round(74 / 60, 3)
+    assert windows["1m"]["error_rate"] == round(30 / 74, 4)
+    assert windows["5m"]["requests"] == 30 + 280
+    assert windows["1h"]["p50_ms"] >= 12.0
+    assert snapshot["server_error_count"] / snapshot["total_requests"] < 0.01
+
+
+def test_unmatched_paths_and_methods_keep_label_cardinality_bounded():
+    client = TestClient(create_app())
+    for _ in range(20):
+        assert client.get("/health").status_code == 200
+    for index in range(300):
+        assert client.get(f"/probe-{index}").status_code == 404
+    for _ in range(5):
+        client.get("/wp-login.php")
+    client.request("BREW", "/health")
+
+    metrics = client.get("/ops/metrics").json()
+    top = {item["endpoint"]: item["count"] for item in metrics["top_endpoints"]}
+    assert top["GET /health"] == 20
+    assert top["GET /wp-login.php"] >= 1
+    assert sum(top.values()) == metrics["total_requests"]
+    assert metrics["top_endpoints"][-1]["endpoint"] == "other"
+
+    series = observability_registry.export_series()
+    routes = {route for _, route, _ in series["requests"]}
+    assert routes == {"/health", "/ops/metrics", "<unmatched>"}
+    assert ("OTHER", "/health", 405) in series["requests"]
+
+
+def test_worker_shards_in_a_shared_directory_are_aggregated(tmp_path):
+    # Two registries stand in for two worker processes sharing the directory.
+    first = ObservabilityRegistry(max_recent_errors=5)
+    second = ObservabilityRegistry(max_recent_errors=5)
+    for registry in (first, second):
+        registry.configure(shard_dir=str(tmp_path))
+    for _ in range(3):
+        _observe(first, "/first")
+    _observe(first, "/first", status_code=503)
+    _observe(second, "/second")
+    first.observe(
+        request_id="slow",
+        method="GET",
+        path="/first",
+        route="/first",
+        status_code=200,
+        latency_ms=1500.0,
+        is_slow=True,
+        exemplar={"stages": {"db": {"ms": 1400.0, "count": 1}}},
+    )
+    stall = {"timestamp": datetime.now(UTC), "lag_ms": 450.0, "stack": ["handler (x.py:1)"]}
+    first.observe_loop_lag(450.0, stall=stall)
+    second.observe_loop_lag(1.0)
+    first.write_shard()
+    (tmp_path / "corrupt.json").write_text("{", encoding="utf-8")
+
+    snapshot = second.snapshot(slow_request_threshold_ms=1000)
+
+    assert snapshot["workers"] == 2
+    assert snapshot["total_requests"] == 6
+    assert snapshot["status_counts"] == {"200": 5, "503": 1}
+    assert snapshot["recent_errors"][0]["route"] == "/first"
+    histograms = {
+        (item["endpoint"], item["status_class"]): item["count"]
+        for item in snapshot["latency_histograms"]
+    }
+    assert histograms == {
+        ("GET /first", "2xx"): 4,
+        ("GET /first", "5xx"): 1,
+        ("GET /second", "2xx"): 1,
+    }
+    assert second.export_series()["stage_calls"][("GET", "/first", "db")] == 8
+    assert snapshot["windows"][0]["requests"] == 6
+    assert [item["request_id"] for item in second.slow_requests()] == ["slow"]
+    assert snapshot["event_loop"]["probes"] == 2
+    assert snapshot["event_loop"]["recent_stalls"] == [stall]
+
+    # Resetting a worker withdraws its shard from the aggregate.
+    first.reset()
+    assert second.snapshot(slow_request_threshold_ms=1000)["total_requests"] == 1
+
+
+def test_stale_worker_shards_are_ignored_and_deleted(tmp_path):
+    first = ObservabilityRegistry()
+    second = ObservabilityRegistry()
+    for registry in (first, second):
+        registry.configure(shard_dir=str(tmp_path), flush_interval_seconds=5)
+    _observe(first, "/first")
+    first.write_shard()
+    (stale_path,) = tmp_path.glob("*.json")
+    _observe(second, "/second")
+
+    assert second.snapshot(slow_request_threshold_ms=1000)["workers"] == 2
+
+    # Not rewritten for more than three flush intervals: a dead worker.
+    stale_at = time.time() - 16
+    os.utime(stale_path, (stale_at, stale_at))
+    snapshot = second.snapshot(slow_request_threshold_ms=1000)
+
+    assert snapshot["workers"] == 1
+    assert snapshot["total_requests"] == 1
+    assert not stale_path.exists()
+
+
 def test_server_error_is_aggregated_to_recent_errors():
     app = create_app()
 
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.profiler import SamplingProfiler
+from app.main import create_app
+
+OPS_HEADERS = {"X-Ops-Token": "ops-secret"}
+
+
+@pytest.fixture
+def profiler_settings(monkeypatch):
+    monkeypatch.setattr(settings, "profiler_enabled", True)
+    monkeypatch.setattr(settings, "ops_token", "ops-secret")
+    monkeypatch.setattr(settings, "profiler_max_seconds", 2)
+    monkeypatch.setattr(settings, "profiler_min_interval_seconds", 60)
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_endpoint_is_hidden_unless_enabled():
+    client = TestClient(create_app())
+    assert client.get("/ops/profile?seconds=0.1", headers=OPS_HEADERS).status_code == 404
+
+
+def test_profile_endpoint_returns_collapsed_thread_stacks(profiler_settings):
+    client = TestClient(create_app())
+    assert client.get("/ops/profile?seconds=0.1").status_code == 403
+    assert (
+        client.get("/ops/profile?seconds=0.1", headers={"X-Ops-Token": "wrong"}).status_code
+        == 403
+    )
+    assert client.get("/ops/profile?seconds=5", headers=OPS_HEADERS).status_code == 400
+
+    stop = threading.Event()
+    spinner = threading.Thread(target=_spin, args=(stop,), name="spinner")
+    spinner.start()
+    try:
+        response = client.get("/ops/profile?seconds=0.3&interval_ms=5", headers=OPS_HEADERS)
+    finally:
+        stop.set()
+        spinner.join()
+
+    assert response.status_code == 200
+    assert response.headers["X-Profile-Mode"] == "threads"
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    stacks = [line.rsplit(" ", 1) for line in response.text.splitlines()]
+    spinner_stacks = [stack for stack, _ in stacks if stack.startswith("spinner;")]
+    assert spinner_stacks
+    assert any("_spin (tests/test_profiler.py:" in stack for stack in spinner_stacks)
+    assert all(count.isdigit() for _, count in stacks)
+
+    # One profile per PROFILER_MIN_INTERVAL_SECONDS per worker.
+    limited = client.get("/ops/profile?seconds=0.1", headers=OPS_HEADERS)
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) > 0
+
+
+def test_task_mode_reports_await_chains_of_parked_tasks():
+    async def _wait_for_reply(event: asyncio.Event) -> None:
+        await _parked(event)
+
+    async def _parked(event: asyncio.Event) -> None:
+        await event.wait()
+
+    async def _run():
+        event = asyncio.Event()
+        task = asyncio.create_task(_wait_for_reply(event))
+        result = await SamplingProfiler(min_interval_seconds=0).profile(0.1, 10, "tasks")
+        event.set()
+        await task
+        return result
+
+    result = asyncio.run(_run())
+
+    assert result.samples > 0
+    stack, count = result.collapsed().splitlines()[0].rsplit(" ", 1)
+    frames = stack.split(";")
+    assert frames[0].startswith("task ") and frames[0].endswith("_wait_for_reply")
+    assert [frame.split(" (")[0].rsplit(".", 1)[-1] for frame in frames[1:]] == [
+        "_wait_for_reply",
+        "_parked",
+        "wait",
+    ]
+    assert frames[-1].startswith("Event.wait (asyncio/locks.py:")
+    assert int(count) == result.samples
@@ -0,0 +1,611 @@
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+from uuid import UUID, uuid4
+
+import asyncpg
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.db.idempotency import idempotency_response_cache
+from app.db.session import engine
+from app.main import create_app
+
+RUN_PLAN_TESTS = os.getenv("RUN_PLAN_TESTS", "0") == "1"
+pytestmark = pytest.mark.skipif(
+    not RUN_PLAN_TESTS,
+    reason="set RUN_PLAN_TESTS=1 to run query-plan regression tests (seeds the database)",
+)
+
+# 1.0 seeds ~100k users / 1M sessions / 10M messages; the default keeps a local
+# run to well under a minute while still being large enough for the planner to
+# prefer indexes over sequential scans on every per-user query.
+PLAN_TEST_SCALE = float(os.getenv("PLAN_TEST_SCALE", "0.01"))
+# Multiplies every latency budget, for slow CI runners.
+PLAN_TEST_BUDGET_FACTOR = float(os.getenv("PLAN_TEST_BUDGET_FACTOR", "1"))
+
+USERS = max(200, int(100_000 * PLAN_TEST_SCALE))
+SCENES_PER_USER = 2
+SESSIONS_PER_USER = 10
+TURNS_PER_SESSION = 5
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+MIGRATIONS = sorted(
+    path
+    for path in (ROOT_DIR / "db" / "migrations").glob("*.sql")
+    # 0003 wires Supabase's auth schema, which a plain local Postgres lacks.
+    if not path.name.startswith("0003_")
+)
+
+# A sequential scan over any of these is a regression for a per-user request.
+LARGE_TABLES = {
+    "users",
+    "scenes",
+    "sessions",
+    "messages",
+    "feedback_items",
+    "rewrites",
+    "summaries",
+    "reflections",
+    "idempotency_keys",
+    "user_weekly_stats",
+}
+
+# Foreign keys that deliberately have no supporting index.
+UNINDEXED_FOREIGN_KEY_ALLOWLIST = {
+    # Append-only analytics; sessions are never deleted, so the index would only
+    # slow down bulk ingestion.
+    ("event_logs", ("session_id",)),
+}
+
+SEED_SQL = """
+INSERT INTO users (id, email, display_name)
+SELECT md5('u' || g)::uuid, 'plan-' || g || '@seed.local', 'Seed ' || g
+FROM generate_series(0, {users} - 1) AS g;
+
+INSERT INTO scenes (
+  id, user_id, title, template_id, counterparty_role, relationship_level,
+  goal, context, power_dynamic, created_at, updated_at
+)
+SELECT
+  md5('sc' || g)::uuid,
+  md5('u' || (g % {users}))::uuid,
+  (ARRAY['季度评审沟通', '跨团队排期冲突', '和经理对齐目标', 'Release planning'])[g % 4 + 1],
+  (ARRAY['PEER_FEEDBACK', 'MANAGER_ALIGNMENT', 'CROSS_TEAM_CONFLICT', 'CUSTOM'])[g % 4 + 1],
+  (ARRAY['PEER', 'MANAGER', 'REPORT', 'CLIENT', 'OTHER'])[g % 5 + 1],
+  (ARRAY['SMOOTH', 'NEUTRAL', 'TENSE'])[g % 3 + 1],
+  '确认下一步安排',
+  '这个需求已经延期两次，影响发布节奏',
+  (ARRAY['USER_HIGHER', 'PEER_LEVEL', 'COUNTERPART_HIGHER'])[g % 3 + 1],
+  NOW() - INTERVAL '400 days',
+  NOW() - INTERVAL '400 days'
+FROM generate_series(0, {users} * {scenes_per_user} - 1) AS g;
+
+INSERT INTO sessions (
+  id, user_id, scene_id, state, target_turns, current_turn, started_at, ended_at,
+  created_at, last_user_message, last_assistant_message, last_overall_score,
+  last_risk_level, has_summary, has_reflection
+)
+SELECT
+  md5('s' || g)::uuid,
+  md5('u' || (g % {users}))::uuid,
+  md5('sc' || ((g % {users}) + {users} * ((g / {users}) % {scenes_per_user})))::uuid,
+  st.state,
+  {turns},
+  CASE WHEN st.state = 'COMPLETED' THEN {turns} ELSE 2 END,
+  ts.created_at,
+  CASE WHEN st.state = 'COMPLETED' THEN ts.created_at + INTERVAL '20 minutes' END,
+  ts.created_at,
+  '我们固定每周二下午评审，可以吗？',
+  '好的，我来确认会议室。',
+  60 + g % 40,
+  (ARRAY['LOW', 'MEDIUM', 'HIGH'])[g % 3 + 1],
+  st.state = 'COMPLETED' AND g % 10 < 6,
+  st.state = 'COMPLETED' AND g % 10 < 3
+FROM generate_series(0, {users} * {sessions_per_user} - 1) AS g
+CROSS JOIN LATERAL (
+  SELECT CASE
+    WHEN abs(hashtext('st' || g)) % 100 < 70 THEN 'COMPLETED'
+    WHEN abs(hashtext('st' || g)) % 100 < 95 THEN 'ACTIVE'
+    ELSE 'ABANDONED'
+  END AS state
+) st
+CROSS JOIN LATERAL (
+  SELECT NOW() - make_interval(mins => abs(hashtext('ts' || g)) % (365 * 24 * 60)) AS created_at
+) ts;
+
+-- Fresh statistics keep the planner off nested loops for the bulk joins below.
+ANALYZE sessions;
+
+INSERT INTO messages (session_id, role, turn_no, content, created_at)
+SELECT
+  s.id,
+  CASE WHEN k % 2 = 0 THEN 'USER' ELSE 'ASSISTANT' END,
+  k / 2 + 1,
+  (ARRAY[
+    '你们总是拖延，根本不专业。',
+    '我注意到这个需求已经延期两次了。',
+    '我有点担心发布节奏会受影响。',
+    '你愿意和我一起确认新的里程碑吗？',
+    'Can we review the release plan on Tuesday?',
+    '我需要对交付时间有更多确定性。',
+    '好的，我们周二下午一起过一下排期。',
+    '谢谢你愿意花时间聊这个问题。'
+  ])[(abs(hashtext(s.id::text)) + k) % 8 + 1],
+  s.created_at + make_interval(mins => k)
+FROM sessions s
+CROSS JOIN generate_series(0, {turns} * 2 - 1) AS k
+WHERE s.state = 'COMPLETED' OR k < 4;
+
+ANALYZE messages;
+
+INSERT INTO feedback_items (
+  session_id, user_message_id, overall_score, risk_level, ofnr_detail,
+  next_best_sentence, created_at
+)
+SELECT
+  m.session_id,
+  m.id,
+  50 + abs(hashtext(m.id::text)) % 50,
+  'LOW',
+  '{{"observation": {{"status": "GOOD", "reason": "具体", "suggestion": "保持"}},
+    "feeling": {{"status": "GOOD", "reason": "表达感受", "suggestion": "保持"}},
+    "need": {{"status": "GOOD", "reason": "说明需要", "suggestion": "保持"}},
+    "request": {{"status": "GOOD", "reason": "请求具体", "suggestion": "保持"}}}}'::jsonb,
+  '我注意到需求延期两次。你愿意和我一起确认新的里程碑吗？',
+  m.created_at
+FROM messages m
+WHERE m.role = 'USER';
+
+INSERT INTO rewrites (session_id, source_message_id, rewrite_style, rewritten_content, created_at)
+SELECT
+  m.session_id,
+  m.id,
+  'NEUTRAL',
+  '我注意到需求延期两次，我有点担心发布节奏。你愿意和我一起确认新的里程碑吗？',
+  m.created_at + INTERVAL '30 seconds'
+FROM messages m
+WHERE m.role = 'USER'
+  AND abs(hashtext('rw' || m.id::text)) % 3 = 0;
+
+INSERT INTO summaries (session_id, opening_line, request_line, fallback_line, created_at)
+SELECT id, '我注意到需求延期两次', '你愿意确认新的里程碑吗？', '我们可否另约时间？', ended_at
+FROM sessions
+WHERE has_summary;
+
+INSERT INTO reflections (user_id, session_id, used_in_real_world, outcome_score, created_at)
+SELECT user_id, id, TRUE, 1 + abs(hashtext(id::text)) % 5, ended_at + INTERVAL '1 day'
+FROM sessions
+WHERE has_reflection;
+
+INSERT INTO idempotency_keys (
+  user_id, session_id, endpoint, client_message_id, response_bytes, created_at, expires_at
+)
+SELECT
+  s.user_id,
+  s.id,
+  'POST:/api/v1/sessions/{{session_id}}/messages',
+  md5('cm' || m.id)::uuid,
+  convert_to('{{}}', 'UTF8'),
+  m.created_at,
+  m.created_at + INTERVAL '72 hours'
+FROM messages m
+JOIN sessions s ON s.id = m.session_id
+WHERE m.role = 'USER';
+"""
+
+
+def _seed_uuid(prefix: str, index: int) -> UUID:
+    return UUID(hashlib.md5(f"{prefix}{index}".encode()).hexdigest())
+
+
+def _asyncpg_database_url() -> str:
+    raw = os.environ["DATABASE_URL"].strip()
+    if raw.startswith("postgresql+asyncpg://"):
+        return raw.replace("postgresql+asyncpg://", "postgresql://", 1)
+    return raw
+
+
+async def _connect() -> asyncpg.Connection:
+    return await asyncpg.connect(_asyncpg_database_url(), timeout=20)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _seed_database() -> None:
+    conn = await _connect()
+    try:
+        for migration in MIGRATIONS:
+            await conn.execute(migration.read_text(encoding="utf-8"))
+        seeded_users = await conn.fetchval(
+            "SELECT COUNT(*) FROM users WHERE email LIKE 'plan-%@seed.local'"
+        )
+        total_users = await conn.fetchval("SELECT COUNT(*) FROM users")
+        weekly_rows = await conn.fetchval("SELECT COUNT(*) FROM user_weekly_stats")
+        rewrite_rows = await conn.fetchval("SELECT COUNT(*) FROM rewrites")
+        if seeded_users == USERS and total_users == USERS and weekly_rows and rewrite_rows:
+            return
+        await conn.execute(
+            "TRUNCATE TABLE user_weekly_stats, idempotency_keys, event_logs, reflections, "
+            "summaries, rewrites, feedback_items, messages, sessions, scenes, users "
+            "RESTART IDENTITY CASCADE"
+        )
+        seed_sql = SEED_SQL.format(
+            users=USERS,
+            scenes_per_user=SCENES_PER_USER,
+            sessions_per_user=SESSIONS_PER_USER,
+            turns=TURNS_PER_SESSION,
+        )
+        # One statement per round trip: as a single multi-statement transaction
+        # the later inserts crawl over rows the same transaction just wrote.
+        for statement in seed_sql.split(";\n"):
+            if statement.strip():
+                await conn.execute(statement)
+    finally:
+        await conn.close()
+
+    from app.db.session import SessionLocal
+    from app.db.weekly_stats import backfill_user_weekly_stats
+
+    try:
+        async with SessionLocal() as db:
+            await backfill_user_weekly_stats(db)
+            await db.commit()
+    finally:
+        await engine.dispose()
+
+    conn = await _connect()
+    try:
+        await conn.execute("VACUUM ANALYZE")
+    finally:
+        await conn.close()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _seeded_database():
+    _run(_seed_database())
+    yield
+
+
+@dataclass
+class CapturedStatement:
+    statement: str
+    parameters: tuple
+
+
+@dataclass
+class PlanReport:
+    statement: str
+    execution_ms: float
+    seq_scans: list[str] = field(default_factory=list)
+
+
+def _capture_statements(request) -> list[CapturedStatement]:
+    captured: list[CapturedStatement] = []
+
+    def _before_cursor_execute(_conn, _cursor, statement, parameters, _context, _executemany):
+        captured.append(CapturedStatement(statement, tuple(parameters or ())))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        response = request()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    assert response.status_code < 400, response.text
+    return captured
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in LARGE_TABLES:
+        detail = plan["Relation Name"]
+        if plan.get("Filter"):
+            detail += f" (filter: {plan['Filter']})"
+        found.append(detail)
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+async def _explain(statements: list[CapturedStatement]) -> list[PlanReport]:
+    # Replays the request's statements in one rolled-back transaction so the RLS
+    # context (SET LOCAL ROLE / set_config) shapes the plans exactly as it did
+    # for the real request.
+    reports = []
+    conn = await _connect()
+    try:
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            for captured in statements:
+                keyword = captured.statement.lstrip().split(None, 1)[0].upper()
+                if keyword == "INSERT":
+                    # Already applied by the real request; single-row inserts
+                    # plan as a primary-key probe anyway.
+                    continue
+                if keyword not in {"SELECT", "WITH", "UPDATE", "DELETE"}:
+                    await conn.execute(captured.statement, *captured.parameters)
+                    continue
+                if "set_config(" in captured.statement:
+                    await conn.fetch(captured.statement, *captured.parameters)
+                    continue
+                rows = await conn.fetch(
+                    "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + captured.statement,
+                    *captured.parameters,
+                )
+                plan = json.loads(rows[0][0])[0]
+                reports.append(
+                    PlanReport(
+                        statement=" ".join(captured.statement.split())[:160],
+                        execution_ms=float(plan["Execution Time"]),
+                        seq_scans=_seq_scans(plan["Plan"]),
+                    )
+                )
+        finally:
+            await transaction.rollback()
+    finally:
+        await conn.close()
+    return reports
+
+
+def _assert_plans(reports: list[PlanReport], budget_ms: float) -> None:
+    budget = budget_ms * PLAN_TEST_BUDGET_FACTOR
+    problems = []
+    for report in reports:
+        for scan in report.seq_scans:
+            problems.append(f"Seq Scan on {scan}\n    in: {report.statement}")
+        if report.execution_ms > budget:
+            problems.append(
+                f"{report.execution_ms:.1f}ms exceeds {budget:.0f}ms budget\n"
+                f"    in: {report.statement}"
+            )
+    assert reports, "no plannable statements were captured"
+    assert not problems, "query plan regressions:\n" + "\n".join(problems)
+
+
+def _user_headers(user_index: int) -> dict[str, str]:
+    return {"Authorization": f"Bearer mock_{_seed_uuid('u', user_index)}"}
+
+
+def _seeded_session(state: str, *, has_summary: bool | None = None) -> tuple[int, UUID]:
+    async def _inner():
+        conn = await _connect()
+        try:
+            for user_index in range(USERS // 2, USERS):
+                row = await conn.fetchrow(
+                    """
+                    SELECT id
+                    FROM sessions
+                    WHERE user_id = $1
+                      AND state = $2
+                      AND ($3::boolean IS NULL OR has_summary = $3)
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                    """,
+                    _seed_uuid("u", user_index),
+                    state,
+                    has_summary,
+                )
+                if row:
+                    return user_index, row["id"]
+        finally:
+            await conn.close()
+        raise AssertionError(f"no seeded {state} session found")
+
+    return _run(_inner())
+
+
+def _monday(days_ago: int) -> date:
+    day = datetime.now(UTC).date() - timedelta(days=days_ago)
+    return day - timedelta(days=day.weekday())
+
+
+LIST_SESSION_QUERIES = {
+    "default": {},
+    "state": {"state": "COMPLETED"},
+    "keyword": {"keyword": "里程碑"},
+    "ascii_keyword": {"keyword": "release"},
+    "ascii_infix_keyword": {"keyword": "view"},
+    "date_range": {
+        "created_from": (datetime.now(UTC).date() - timedelta(days=90)).isoformat(),
+        "created_to": datetime.now(UTC).date().isoformat(),
+    },
+    "all_filters": {
+        "state": "COMPLETED",
+        "keyword": "延期",
+        "created_from": (datetime.now(UTC).date() - timedelta(days=180)).isoformat(),
+        "created_to": datetime.now(UTC).date().isoformat(),
+    },
+    "without_total": {"include_total": "false", "limit": 50},
+    "offset": {"offset": 5, "limit": 5},
+}
+
+
+@pytest.mark.parametrize("case", sorted(LIST_SESSION_QUERIES))
+def test_list_sessions_plans(case):
+    client = TestClient(create_app())
+    headers = _user_headers(USERS - 1)
+    params = LIST_SESSION_QUERIES[case]
+    statements = _capture_statements(
+        lambda: client.get("/api/v1/sessions", headers=headers, params=params)
+    )
+    _assert_plans(_run(_explain(statements)), budget_ms=50)
+
+
+def test_list_sessions_cursor_page_plan():
+    client = TestClient(create_app())
+    headers = _user_headers(USERS - 1)
+    first_page = client.get("/api/v1/sessions", headers=headers, params={"limit": 3})
+    assert first_page.status_code == 200
+    cursor = first_page.json()["next_cursor"]
+    assert cursor
+    statements = _capture_statements(
+        lambda: client.get(
+            "/api/v1/sessions",
+            headers=headers,
+            params={"limit": 3, "cursor": cursor, "include_total": "false"},
+        )
+    )
+    _assert_plans(_run(_explain(statements)), budget_ms=50)
+
+
+# "view" only occurs inside longer words ("review"), served by ASCII trigrams.
+@pytest.mark.parametrize("keyword", ["里程碑", "release", "view"])
+def test_search_sessions_plan(keyword):
+    client = TestClient(create_app())
+    headers = _user_headers(USERS - 1)
+    statements = _capture_statements(
+        lambda: client.get("/api/v1/sessions:search", headers=headers, params={"q": keyword})
+    )
+    _assert_plans(_run(_explain(statements)), budget_ms=100)
+
+
+def test_session_history_plan():
+    user_index, session_id = _seeded_session("COMPLETED", has_summary=True)
+    client = TestClient(create_app())
+    statements = _capture_statements(
+        lambda: client.get(
+            f"/api/v1/sessions/{session_id}/history", headers=_user_headers(user_index)
+        )
+    )
+    _assert_plans(_run(_explain(statements)), budget_ms=50)
+
+
+def test_export_sessions_plan():
+    client = TestClient(create_app())
+    statements = _capture_statements(
+        lambda: client.get("/api/v1/sessions:export", headers=_user_headers(USERS - 1))
+    )
+    _assert_plans(_run(_explain(statements)), budget_ms=100)
+
+
+@pytest.mark.parametrize("aligned", [True, False], ids=["rollup", "live"])
+def test_weekly_progress_plans(aligned):
+    week_start = _monday(21)
+    if not aligned:
+        week_start += timedelta(days=2)
+    client = TestClient(create_app())
+    statements = _capture_statements(
+        lambda: client.get(
+            "/api/v1/progress/weekly",
+            headers=_user_headers(USERS - 1),
+            params={"week_start": week_start.isoformat()},
+        )
+    )
+    _assert_plans(_run(_explain(statements)), budget_ms=50)
+
+
+def test_weekly_trend_plan():
+    client = TestClient(create_app())
+    statements = _capture_statements(
+        lambda: client.get(
+            "/api/v1/progress/weekly/trend",
+            headers=_user_headers(USERS - 1),
+            params={"weeks": 52},
+        )
+    )
+    _assert_plans(_run(_explain(statements)), budget_ms=50)
+
+
+def test_summary_lookup_plan():
+    user_index, session_id = _seeded_session("COMPLETED", has_summary=False)
+    client = TestClient(create_app())
+    statements = _capture_statements(
+        lambda: client.post(
+            f"/api/v1/sessions/{session_id}/summary", headers=_user_headers(user_index)
+        )
+    )
+    _assert_plans(_run(_explain(statements)), budget_ms=50)
+
+
+def test_message_idempotency_lookup_plan():
+    user_index, session_id = _seeded_session("ACTIVE")
+
+    async def _seeded_client_message_id():
+        conn = await _connect()
+        try:
+            return await conn.fetchval(
+                "SELECT client_message_id FROM idempotency_keys WHERE session_id = $1 LIMIT 1",
+                session_id,
+            )
+        finally:
+            await conn.close()
+
+    client_message_id = _run(_seeded_client_message_id())
+    # Move the key out of the past retention window so the DB lookup hits it.
+    async def _refresh_expiry():
+        conn = await _connect()
+        try:
+            await conn.execute(
+                "UPDATE idempotency_keys SET expires_at = NOW() + INTERVAL '1 hour' "
+                "WHERE session_id = $1",
+                session_id,
+            )
+        finally:
+            await conn.close()
+
+    _run(_refresh_expiry())
+    idempotency_response_cache.clear()
+    client = TestClient(create_app())
+    statements = _capture_statements(
+        lambda: client.post(
+            f"/api/v1/sessions/{session_id}/messages",
+            headers=_user_headers(user_index),
+            json={"client_message_id": str(client_message_id), "content": "重试同一条消息"},
+        )
+    )
+    _assert_plans(_run(_explain(statements)), budget_ms=50)
+
+
+def test_new_message_plan():
+    user_index, session_id = _seeded_session("ACTIVE")
+    client = TestClient(create_app())
+    statements = _capture_statements(
+        lambda: client.post(
+            f"/api/v1/sessions/{session_id}/messages",
+            headers=_user_headers(user_index),
+            json={"client_message_id": str(uuid4()), "content": "我注意到排期又变了，我有点担心。"},
+        )
+    )
+    _assert_plans(_run(_explain(statements)), budget_ms=50)
+
+
+def test_foreign_keys_have_supporting_indexes():
+    async def _unindexed_foreign_keys():
+        conn = await _connect()
+        try:
+            return await conn.fetch(
+                """
+                SELECT c.conrelid::regclass::text AS table_name,
+                       array_agg(a.attname ORDER BY k.ord) AS columns
+                FROM pg_constraint c
+                CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+                JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                WHERE c.contype = 'f'
+                  AND c.connamespace = 'public'::regnamespace
+                  AND NOT EXISTS (
+                    SELECT 1
+                    FROM pg_index i
+                    WHERE i.indrelid = c.conrelid
+                      AND (i.indkey::int2[])[0:cardinality(c.conkey) - 1] @> c.conkey
+                      AND (i.indkey::int2[])[0:cardinality(c.conkey) - 1] <@ c.conkey
+                  )
+                GROUP BY c.oid, c.conrelid
+                """
+            )
+        finally:
+            await conn.close()
+
+    missing = [
+        f"{row['table_name']}({', '.join(row['columns'])})"
+        for row in _run(_unindexed_foreign_keys())
+        if (row["table_name"], tuple(row["columns"])) not in UNINDEXED_FOREIGN_KEY_ALLOWLIST
+    ]
+    assert not missing, "foreign keys without a leading index: " + ", ".join(sorted(missing))
@@ -0,0 +1,110 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.core.rate_limit import (
+    MemoryRateLimitBackend,
+    RateLimiter,
+    RoutePolicy,
+    TokenBucketRule,
+    parse_rate_limit,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _limiter(clock: _Clock, *, user: str = "3/min", global_: str = "5/min") -> RateLimiter:
+    return RateLimiter(
+        enabled=True,
+        policies={
+            "rewrite": RoutePolicy(
+                user_rule=parse_rate_limit(user),
+                global_rule=parse_rate_limit(global_),
+            )
+        },
+        backend=MemoryRateLimitBackend(clock=clock),
+    )
+
+
+def test_parse_rate_limit():
+    assert parse_rate_limit("20/min") == TokenBucketRule(capacity=20, period_seconds=60)
+    assert parse_rate_limit("5/s") == TokenBucketRule(capacity=5, period_seconds=1)
+    assert parse_rate_limit("") is None
+    with pytest.raises(ValueError):
+        parse_rate_limit("20 per minute")
+
+
+def test_user_bucket_rejects_with_headers_and_refills():
+    clock = _Clock()
+    limiter = _limiter(clock)
+    user_id = uuid4()
+
+    decisions = [asyncio.run(limiter.check("rewrite", user_id)) for _ in range(4)]
+
+    assert [decision.allowed for decision in decisions] == [True, True, True, False]
+    assert decisions[0].headers() == {
+        "RateLimit-Limit": "3",
+        "RateLimit-Remaining": "2",
+        "RateLimit-Reset": "20",
+        "RateLimit-Policy": "3;w=60",
+    }
+    rejected = decisions[-1]
+    assert rejected.scope == "user"
+    assert rejected.headers()["Retry-After"] == "20"
+    assert rejected.headers()["RateLimit-Remaining"] == "0"
+
+    # One token refills every 20s.
+    clock.now += 20
+    assert asyncio.run(limiter.check("rewrite", user_id)).allowed
+    assert not asyncio.run(limiter.check("rewrite", user_id)).allowed
+    assert limiter.stats()["rejected"] == {"rewrite:user": 2}
+
+
+def test_global_bucket_is_shared_across_users():
+    limiter = _limiter(_Clock(), user="10/min", global_="5/min")
+
+    results = [asyncio.run(limiter.check("rewrite", uuid4())).allowed for _ in range(6)]
+
+    assert results == [True] * 5 + [False]
+    assert limiter.stats()["rejected"] == {"rewrite:global": 1}
+
+
+def test_rejected_request_spends_no_tokens_from_other_buckets():
+    limiter = _limiter(_Clock(), user="2/min", global_="3/min")
+    heavy, light = uuid4(), uuid4()
+
+    for _ in range(5):
+        asyncio.run(limiter.check("rewrite", heavy))
+
+    # heavy was only charged twice, so the shared bucket still has one token.
+    assert asyncio.run(limiter.check("rewrite", light)).allowed
+    assert not asyncio.run(limiter.check("rewrite", light)).allowed
+
+
+def test_unknown_route_or_disabled_limiter_is_not_limited():
+    limiter = _limiter(_Clock())
+    assert asyncio.run(limiter.check("messages", uuid4())) is None
+
+    limiter.configure(enabled=False)
+    assert asyncio.run(limiter.check("rewrite", uuid4())) is None
+
+
+def test_backend_failure_fails_open():
+    class _BrokenBackend:
+        name = "postgres"
+
+        async def acquire(self, keys, rules, cost=1.0):
+            raise OSError("connection refused")
+
+    limiter = _limiter(_Clock())
+    limiter.configure(backend=_BrokenBackend())
+
+    assert asyncio.run(limiter.check("rewrite", uuid4())) is None
+    assert limiter.stats()["backend_errors"] == 1
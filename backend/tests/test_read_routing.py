@@ -0,0 +1,80 @@
+import asyncio
+from uuid import uuid4
+
+from app.api import deps
+from app.core.security import AuthUser
+from app.db.read_routing import (
+    ROUTE_PRIMARY_FALLBACK,
+    ROUTE_PRIMARY_NO_REPLICA,
+    ROUTE_PRIMARY_PINNED,
+    ROUTE_PRIMARY_REPLICA_DOWN,
+    ROUTE_REPLICA,
+    ReadRouter,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_recent_writer_is_pinned_to_primary_until_pin_expires():
+    clock = _Clock()
+    router = ReadRouter(pin_seconds=5, retry_seconds=30, clock=clock)
+    writer, reader = uuid4(), uuid4()
+
+    router.record_write(writer)
+    assert router.choose(writer, replica_configured=True) == ROUTE_PRIMARY_PINNED
+    assert router.choose(reader, replica_configured=True) == ROUTE_REPLICA
+
+    clock.now += 5.1
+    assert router.choose(writer, replica_configured=True) == ROUTE_REPLICA
+    assert router.choose(writer, replica_configured=False) == ROUTE_PRIMARY_NO_REPLICA
+
+
+def test_replica_failure_routes_to_primary_for_retry_window():
+    clock = _Clock()
+    router = ReadRouter(pin_seconds=5, retry_seconds=30, clock=clock)
+    user_id = uuid4()
+
+    assert router.choose(user_id, replica_configured=True) == ROUTE_REPLICA
+    router.record_replica_failure()
+    assert router.choose(user_id, replica_configured=True) == ROUTE_PRIMARY_REPLICA_DOWN
+    assert not router.stats(replica_configured=True)["replica_available"]
+
+    clock.now += 30
+    assert router.choose(user_id, replica_configured=True) == ROUTE_REPLICA
+    assert router.stats(replica_configured=True)["decisions"] == {
+        ROUTE_PRIMARY_FALLBACK: 1,
+        ROUTE_PRIMARY_REPLICA_DOWN: 1,
+        ROUTE_REPLICA: 1,
+    }
+
+
+def test_zero_pin_window_disables_read_your_writes_pinning():
+    router = ReadRouter(pin_seconds=0, retry_seconds=30)
+    user_id = uuid4()
+    router.record_write(user_id)
+    assert router.choose(user_id, replica_configured=True) == ROUTE_REPLICA
+
+
+def test_write_session_pins_the_user_again_at_commit(monkeypatch):
+    clock = _Clock()
+    router = ReadRouter(pin_seconds=5, retry_seconds=30, clock=clock)
+    monkeypatch.setattr(deps, "read_router", router)
+    user = AuthUser(user_id=uuid4())
+
+    async def _write():
+        sessions = deps.get_write_db_session(user)
+        session = await anext(sessions)
+        # A long LLM call outlives the pin taken before the handler ran.
+        clock.now += 60
+        assert router.choose(user.user_id, replica_configured=True) == ROUTE_REPLICA
+        await session.commit()
+        assert router.choose(user.user_id, replica_configured=True) == ROUTE_PRIMARY_PINNED
+        await sessions.aclose()
+
+    asyncio.run(_write())
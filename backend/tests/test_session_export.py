@@ -0,0 +1,123 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import UTC, datetime
+from uuid import uuid4
+
+from app.schemas.sessions import ExportFormat
+from app.services import session_export
+from app.services.session_export import EXPORT_CSV_COLUMNS, iter_session_export
+
+CREATED_AT = datetime(2026, 3, 2, 9, 30, tzinfo=UTC)
+OFNR = {
+    dimension: {"status": "GOOD", "reason": "ok", "suggestion": "keep"}
+    for dimension in ("observation", "feeling", "need", "request")
+}
+
+
+def _row(session_id, turn_no=None, **overrides):
+    row = {
+        "session_id": session_id,
+        "scene_id": uuid4(),
+        "state": "COMPLETED",
+        "current_turn": 5,
+        "target_turns": 5,
+        "created_at": CREATED_AT,
+        "ended_at": None,
+        "scene_title": "导出",
+        "scene_goal": "对齐",
+        "scene_context": "背景",
+        "scene_template_id": "CUSTOM",
+        "summary_id": None,
+        "opening_line": None,
+        "request_line": None,
+        "fallback_line": None,
+        "risk_triggers": None,
+        "summary_created_at": None,
+        "reflection_id": None,
+        "used_in_real_world": None,
+        "outcome_score": None,
+        "blocker_code": None,
+        "blocker_note": None,
+        "reflection_created_at": None,
+        "turn_no": turn_no,
+        "user_message_id": uuid4() if turn_no else None,
+        "user_content": f"第 {turn_no} 轮" if turn_no else None,
+        "assistant_message_id": None,
+        "assistant_content": None,
+        "overall_score": 80 if turn_no else None,
+        "risk_level": "LOW" if turn_no else None,
+        "ofnr_detail": json.dumps(OFNR) if turn_no else None,
+        "next_best_sentence": "下一句" if turn_no else None,
+        "rewrites": None,
+    }
+    row.update(overrides)
+    return row
+
+
+async def _aiter(rows):
+    for row in rows:
+        yield row
+
+
+def _collect(rows, export_format):
+    async def _inner():
+        return [chunk async for chunk in iter_session_export(_aiter(rows), export_format)]
+
+    return asyncio.run(_inner())
+
+
+def test_ndjson_export_groups_turn_rows_into_one_record_per_session():
+    first, second = uuid4(), uuid4()
+    rewrite = {
+        "rewrite_id": str(uuid4()),
+        "rewrite_style": "NEUTRAL",
+        "rewritten_content": "改写",
+        "created_at": CREATED_AT.isoformat(),
+    }
+    rows = [
+        _row(first, 1),
+        _row(first, 2, rewrites=json.dumps([rewrite])),
+        _row(second, None, state="ACTIVE", current_turn=0),
+    ]
+    records = [json.loads(line) for line in b"".join(_collect(rows, ExportFormat.NDJSON)).splitlines()]
+    assert [record["session_id"] for record in records] == [str(first), str(second)]
+    assert [turn["turn"] for turn in records[0]["turns"]] == [1, 2]
+    assert records[0]["turns"][1]["rewrites"][0]["rewritten_content"] == "改写"
+    assert records[0]["turns"][0]["feedback"]["ofnr"]["need"]["status"] == "GOOD"
+    assert records[1]["turns"] == []
+
+
+def test_export_flushes_first_record_immediately_then_batches(monkeypatch):
+    monkeypatch.setattr(session_export, "EXPORT_FLUSH_BYTES", 10**9)
+    rows = [_row(uuid4(), 1) for _ in range(4)]
+    chunks = _collect(rows, ExportFormat.NDJSON)
+    # First session goes out on its own so the client sees bytes right away;
+    # the rest wait for the flush threshold (or the end of the stream).
+    assert len(chunks) == 2
+    assert chunks[0].count(b"\n") == 1
+    assert chunks[1].count(b"\n") == 3
+
+
+def test_csv_export_writes_header_and_neutralizes_formulas():
+    session_id = uuid4()
+    rows = [
+        _row(session_id, 1, user_content="=HYPERLINK(\"x\")"),
+        _row(session_id, 2, reflection_id=uuid4(), used_in_real_world=False, blocker_code="OTHER"),
+    ]
+    chunks = _collect(rows, ExportFormat.CSV)
+    assert chunks[0].startswith("\ufeff".encode("utf-8"))
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+    assert tuple(parsed[0]) == EXPORT_CSV_COLUMNS
+    body = [dict(zip(parsed[0], values)) for values in parsed[1:]]
+    assert body[0]["user_content"] == "'=HYPERLINK(\"x\")"
+    assert body[0]["reflection_used_in_real_world"] == ""
+    assert body[1]["reflection_used_in_real_world"] == "false"
+    assert json.loads(body[1]["ofnr"])["request"]["status"] == "GOOD"
+
+
+def test_csv_export_of_empty_history_is_header_only():
+    chunks = _collect([], ExportFormat.CSV)
+    assert len(chunks) == 1
+    assert chunks[0].decode("utf-8-sig").strip() == ",".join(EXPORT_CSV_COLUMNS)
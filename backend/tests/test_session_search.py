@@ -0,0 +1,36 @@
+from app.services.session_search import (
+    ELLIPSIS,
+    build_search_snippet,
+    search_index_query,
+)
+
+
+def test_build_search_snippet_highlights_all_hits_in_window():
+    snippet = build_search_snippet("我们先对齐接口，再对齐时间。", "对齐")
+    assert snippet.text == "我们先对齐接口，再对齐时间。"
+    assert snippet.highlights == [(3, 2), (9, 2)]
+    for start, length in snippet.highlights:
+        assert snippet.text[start : start + length] == "对齐"
+
+
+def test_build_search_snippet_trims_long_content_with_ellipsis():
+    content = "甲" * 100 + "里程碑" + "乙" * 100
+    snippet = build_search_snippet(content, "里程碑", radius=10)
+    assert snippet.text.startswith(ELLIPSIS)
+    assert snippet.text.endswith(ELLIPSIS)
+    start, length = snippet.highlights[0]
+    assert snippet.text[start : start + length] == "里程碑"
+
+
+def test_build_search_snippet_is_case_insensitive():
+    snippet = build_search_snippet("Please review the API contract", "api")
+    start, length = snippet.highlights[0]
+    assert snippet.text[start : start + length] == "API"
+
+
+def test_search_index_query_keeps_cjk_runs_and_ascii_runs_of_three():
+    assert search_index_query("跨团队") == "跨团队"
+    assert search_index_query("View练习 ab 好 code-review!!") == "练习 好 view code review"
+    assert search_index_query("view") == "view"
+    assert search_index_query("!!") is None
+    assert search_index_query("ab c-d") is None
@@ -0,0 +1,44 @@
+from app.core.sliding_window import SlidingWindow
+
+
+def test_summary_covers_only_slots_inside_the_window():
+    window = SlidingWindow(slot_seconds=1, slot_count=60)
+    for second in range(100):
+        window.record(1000.0 + second, 10.0, is_error=second % 10 == 0, is_slow=False)
+
+    requests, errors, slow, latency = window.summary(1099.5)
+
+    assert requests == 60
+    assert errors == 6
+    assert slow == 0
+    assert latency.count == 60
+    assert window.summary(1300.0)[0] == 0
+
+
+def test_reused_slot_forgets_the_previous_lap():
+    window = SlidingWindow(slot_seconds=5, slot_count=4)
+    window.record(100.0, 900.0, is_error=True, is_slow=True)
+    # Same slot index, one full lap (20s) later.
+    window.record(120.0, 1.0, is_error=False, is_slow=False)
+
+    requests, errors, slow, latency = window.summary(121.0)
+
+    assert (requests, errors, slow) == (1, 0, 0)
+    assert latency.max_us == 1000
+
+
+def test_merge_and_state_round_trip_align_slots_by_epoch():
+    left = SlidingWindow(slot_seconds=1, slot_count=60)
+    right = SlidingWindow(slot_seconds=1, slot_count=60)
+    left.record(500.2, 5.0, is_error=False, is_slow=False)
+    right.record(500.7, 50.0, is_error=True, is_slow=True)
+    # A stale slot on the left is replaced by the newer slot at the same index.
+    left.record(441.0, 5.0, is_error=False, is_slow=False)
+    right.record(501.0, 5.0, is_error=False, is_slow=False)
+
+    merged = SlidingWindow.from_state(1, 60, left.to_state())
+    merged.merge(SlidingWindow.from_state(1, 60, right.to_state()))
+
+    requests, errors, slow, latency = merged.summary(501.5)
+    assert (requests, errors, slow) == (3, 1, 1)
+    assert latency.max_us == 50000
@@ -0,0 +1,26 @@
+from app.core.statements import normalize_statement, statement_id
+
+
+def test_statements_differing_only_in_values_share_a_fingerprint():
+    first = normalize_statement(
+        "SELECT id, title\n  FROM sessions\n WHERE user_id = $1::UUID AND status = 'active' LIMIT 20"
+    )
+    second = normalize_statement(
+        "SELECT id, title FROM sessions WHERE user_id = $7::UUID AND status = 'it''s' LIMIT 5"
+    )
+
+    assert first == "SELECT id, title FROM sessions WHERE user_id = ?::UUID AND status = ? LIMIT ?"
+    assert first == second
+    assert statement_id(first) == statement_id(second)
+    assert len(statement_id(first)) == 12
+
+
+def test_in_lists_and_multi_row_values_collapse():
+    assert normalize_statement("SELECT * FROM scenes WHERE id IN ($1, $2, $3)") == (
+        "SELECT * FROM scenes WHERE id IN (?, ...)"
+    )
+    assert normalize_statement(
+        "INSERT INTO event_logs (user_id, name) VALUES ($1, $2), ($3, $4), ($5, $6)"
+    ) == "INSERT INTO event_logs (user_id, name) VALUES (?, ...), ..."
+    # Identifiers that contain digits are not literals.
+    assert normalize_statement("SELECT t1.c2 FROM t1") == "SELECT t1.c2 FROM t1"
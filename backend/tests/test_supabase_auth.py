@@ -1,21 +1,89 @@
 import asyncio
+import time
 from uuid import uuid4
 
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
 from fastapi import HTTPException
 
+from app.core import supabase_auth
+from app.core.cache import LruTtlCache
+from app.core.jwks import JwksManager
 from app.core.security import AuthUser
 from app.core.supabase_auth import verify_supabase_access_token
-from app.core import supabase_auth
 
+ISSUER = "https://example.supabase.co/auth/v1"
+_PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _CountingJwksManager(JwksManager):
+    def __init__(self) -> None:
+        async def _fetch(_url: str) -> dict:
+            jwk = jwt.algorithms.RSAAlgorithm.to_jwk(_PRIVATE_KEY.public_key(), as_dict=True)
+            return {"keys": [{**jwk, "kid": "k1"}]}
+
+        super().__init__(
+            url_resolver=lambda: f"{ISSUER}/.well-known/jwks.json",
+            refresh_interval_seconds=600,
+            min_refresh_interval_seconds=30,
+            fetcher=_fetch,
+        )
+        self.calls = 0
+        self.clock = _FakeClock()
+
+    async def get_signing_key(self, kid):
+        self.calls += 1
+        return await super().get_signing_key(kid)
+
+
+def _signed_token(user_id, expires_in: int) -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {
+            "sub": str(user_id),
+            "aud": "authenticated",
+            "iss": ISSUER,
+            "iat": now,
+            "exp": now + expires_in,
+            "email": "cached@example.com",
+        },
+        _PRIVATE_KEY,
+        algorithm="RS256",
+        headers={"kid": "k1"},
+    )
 
-def test_verify_supabase_access_token_uses_jwks_when_available(monkeypatch):
-    expected = AuthUser(user_id=uuid4(), email="user@example.com", display_name="User")
 
+@pytest.fixture
+def jwks_client(monkeypatch):
+    manager = _CountingJwksManager()
+    monkeypatch.setattr(supabase_auth, "jwks_manager", manager)
+    monkeypatch.setattr(supabase_auth, "_resolve_issuer", lambda: ISSUER)
+    monkeypatch.setattr(supabase_auth.settings, "auth_claims_cache_size", 10)
+    monkeypatch.setattr(supabase_auth.settings, "auth_claims_cache_skew_seconds", 30)
     monkeypatch.setattr(
         supabase_auth,
-        "_decode_token_with_jwks",
-        lambda token: expected,
+        "auth_claims_cache",
+        LruTtlCache(max_entries=10, clock=manager.clock),
     )
+    return manager
+
+
+def test_verify_supabase_access_token_uses_jwks_when_available(monkeypatch):
+    expected = AuthUser(user_id=uuid4(), email="user@example.com", display_name="User")
+
+    async def _decode(_token: str):
+        return expected
+
+    monkeypatch.setattr(supabase_auth, "_decode_token_with_jwks", _decode)
 
     async def _fallback(_token: str):
         raise AssertionError("fallback should not be called when jwks succeeds")
@@ -29,7 +97,7 @@ def test_verify_supabase_access_token_uses_jwks_when_available(monkeypatch):
 def test_verify_supabase_access_token_falls_back_to_user_endpoint(monkeypatch):
     expected = AuthUser(user_id=uuid4(), email="fallback@example.com", display_name="Fallback")
 
-    def _decode_fail(_token: str):
+    async def _decode_fail(_token: str):
         raise ValueError("decode failed")
 
     async def _fallback(_token: str):
@@ -48,3 +116,45 @@ def test_verify_supabase_access_token_requires_bearer_header():
         assert False, "expected HTTPException"
     except HTTPException as exc:
         assert exc.status_code == 401
+
+
+def test_verified_claims_are_cached_by_token_hash_until_exp(jwks_client):
+    user_id = uuid4()
+    token = _signed_token(user_id, expires_in=3600)
+
+    first = asyncio.run(verify_supabase_access_token(f"Bearer {token}"))
+    second = asyncio.run(verify_supabase_access_token(f"Bearer {token}"))
+
+    assert first == second
+    assert first.user_id == user_id
+    assert jwks_client.calls == 1
+    stats = supabase_auth.auth_claims_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["size"] == 1
+    assert token.encode() not in supabase_auth.auth_claims_cache._entries
+
+    # Entries lapse `skew` seconds before exp, after which the token is re-verified.
+    jwks_client.clock.now += 3600 - 30 + 1
+    asyncio.run(verify_supabase_access_token(f"Bearer {token}"))
+    assert jwks_client.calls == 2
+
+
+def test_tokens_expiring_within_skew_are_not_cached(jwks_client):
+    token = _signed_token(uuid4(), expires_in=20)
+
+    asyncio.run(verify_supabase_access_token(f"Bearer {token}"))
+    asyncio.run(verify_supabase_access_token(f"Bearer {token}"))
+
+    assert jwks_client.calls == 2
+    assert supabase_auth.auth_claims_cache.stats()["size"] == 0
+
+
+def test_claims_cache_can_be_disabled(jwks_client, monkeypatch):
+    monkeypatch.setattr(supabase_auth.settings, "auth_claims_cache_size", 0)
+    token = _signed_token(uuid4(), expires_in=3600)
+
+    asyncio.run(verify_supabase_access_token(f"Bearer {token}"))
+    asyncio.run(verify_supabase_access_token(f"Bearer {token}"))
+
+    assert jwks_client.calls == 2
+    assert supabase_auth.auth_claims_cache.stats()["misses"] == 0
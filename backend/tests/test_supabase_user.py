@@ -0,0 +1,159 @@
+import asyncio
+import time
+from uuid import uuid4
+
+import httpx
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.core.supabase_user import SupabaseUserFallback
+
+USER_URL = "https://example.supabase.co/auth/v1/user"
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FakeSupabase:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.status_code = 200
+        self.user_id = uuid4()
+        self.down = False
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.down:
+            raise httpx.ConnectError("supabase unreachable", request=request)
+        if self.status_code != 200:
+            return httpx.Response(self.status_code, json={"msg": "nope"})
+        return httpx.Response(
+            200,
+            json={
+                "id": str(self.user_id),
+                "email": "fallback@example.com",
+                "user_metadata": {"full_name": "Fallback"},
+            },
+        )
+
+
+def _fallback(supabase: _FakeSupabase, clock: _FakeClock) -> SupabaseUserFallback:
+    return SupabaseUserFallback(
+        cache_ttl_seconds=60,
+        negative_ttl_seconds=30,
+        failure_threshold=3,
+        open_seconds=30,
+        clock=clock,
+        transport=httpx.MockTransport(supabase.handler),
+    )
+
+
+def _fetch(fallback: SupabaseUserFallback, token: str):
+    return asyncio.run(fallback.fetch_user(token, url=USER_URL, apikey="anon"))
+
+
+def _status_of(fallback: SupabaseUserFallback, token: str) -> HTTPException:
+    with pytest.raises(HTTPException) as exc_info:
+        _fetch(fallback, token)
+    return exc_info.value
+
+
+def test_verified_users_are_cached_for_a_short_ttl():
+    supabase = _FakeSupabase()
+    clock = _FakeClock()
+    fallback = _fallback(supabase, clock)
+
+    first = _fetch(fallback, "legacy-token")
+    second = _fetch(fallback, "legacy-token")
+
+    assert first == second
+    assert first.user_id == supabase.user_id
+    assert first.display_name == "Fallback"
+    assert supabase.calls == 1
+
+    clock.now += 61
+    _fetch(fallback, "legacy-token")
+    assert supabase.calls == 2
+    assert fallback.stats()["outcomes"] == {"cache_hit": 1, "verified": 2}
+
+
+def test_cached_user_never_outlives_token_exp():
+    supabase = _FakeSupabase()
+    fallback = _fallback(supabase, _FakeClock())
+    token = jwt.encode({"exp": int(time.time()) - 1}, "fallback-test-secret-0123456789abcdef", algorithm="HS256")
+
+    _fetch(fallback, token)
+    _fetch(fallback, token)
+
+    assert supabase.calls == 2
+    assert fallback.stats()["cached_users"] == 0
+
+
+def test_rejected_tokens_are_negatively_cached():
+    supabase = _FakeSupabase()
+    supabase.status_code = 401
+    clock = _FakeClock()
+    fallback = _fallback(supabase, clock)
+
+    for _ in range(5):
+        assert _status_of(fallback, "bad-token").status_code == 401
+
+    assert supabase.calls == 1
+    stats = fallback.stats()
+    assert stats["outcomes"] == {"negative_hit": 4, "rejected": 1}
+    # Rejections are the service working as intended, not failures.
+    assert stats["circuit_state"] == "closed"
+
+    clock.now += 31
+    _status_of(fallback, "bad-token")
+    assert supabase.calls == 2
+
+
+def test_circuit_opens_after_consecutive_failures_and_probes_after_cooldown():
+    supabase = _FakeSupabase()
+    supabase.down = True
+    clock = _FakeClock()
+    fallback = _fallback(supabase, clock)
+
+    for index in range(3):
+        assert _status_of(fallback, f"token-{index}").status_code == 401
+    assert fallback.stats()["circuit_state"] == "open"
+
+    error = _status_of(fallback, "token-3")
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "30"}
+    assert supabase.calls == 3
+
+    # A failed half-open probe re-opens the circuit.
+    clock.now += 31
+    assert _status_of(fallback, "token-4").status_code == 401
+    assert _status_of(fallback, "token-5").status_code == 503
+    assert supabase.calls == 4
+
+    supabase.down = False
+    clock.now += 31
+    assert _fetch(fallback, "token-6").user_id == supabase.user_id
+    stats = fallback.stats()
+    assert stats["circuit_state"] == "closed"
+    assert stats["circuit_opens"] == 2
+    assert stats["outcomes"]["circuit_open"] == 2
+    assert stats["outcomes"]["error"] == 4
+
+
+def test_server_errors_count_against_the_circuit_but_are_not_negatively_cached():
+    supabase = _FakeSupabase()
+    supabase.status_code = 503
+    fallback = _fallback(supabase, _FakeClock())
+
+    _status_of(fallback, "token")
+    _status_of(fallback, "token")
+
+    assert supabase.calls == 2
+    assert fallback.stats()["cached_rejections"] == 0
+    assert fallback.stats()["consecutive_failures"] == 2
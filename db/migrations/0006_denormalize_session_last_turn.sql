@@ -0,0 +1,58 @@
+BEGIN;
+
+-- Denormalized last-turn snapshot so the history list reads only `sessions`.
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS last_user_message TEXT;
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS last_assistant_message TEXT;
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS last_overall_score SMALLINT
+  CHECK (last_overall_score IS NULL OR last_overall_score BETWEEN 0 AND 100);
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS last_risk_level VARCHAR(16)
+  CHECK (last_risk_level IS NULL OR last_risk_level IN ('LOW', 'MEDIUM', 'HIGH'));
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS has_summary BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS has_reflection BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Backfill existing rows once; the API keeps these columns current on write.
+UPDATE sessions s
+SET last_user_message = um.content,
+    last_assistant_message = am.content,
+    last_overall_score = f.overall_score,
+    last_risk_level = f.risk_level
+FROM sessions s2
+LEFT JOIN LATERAL (
+  SELECT m.id, m.turn_no, m.content
+  FROM messages m
+  WHERE m.session_id = s2.id
+    AND m.role = 'USER'
+  ORDER BY m.turn_no DESC, m.created_at DESC
+  LIMIT 1
+) um ON TRUE
+LEFT JOIN LATERAL (
+  SELECT m.content
+  FROM messages m
+  WHERE m.session_id = s2.id
+    AND m.role = 'ASSISTANT'
+    AND m.turn_no = um.turn_no
+  ORDER BY m.created_at DESC
+  LIMIT 1
+) am ON TRUE
+LEFT JOIN feedback_items f ON f.user_message_id = um.id
+WHERE s.id = s2.id
+  AND um.id IS NOT NULL;
+
+UPDATE sessions s
+SET has_summary = TRUE
+WHERE EXISTS (SELECT 1 FROM summaries sm WHERE sm.session_id = s.id)
+  AND s.has_summary = FALSE;
+
+UPDATE sessions s
+SET has_reflection = TRUE
+WHERE EXISTS (SELECT 1 FROM reflections r WHERE r.session_id = s.id)
+  AND s.has_reflection = FALSE;
+
+-- Keyset pagination on (created_at, id); supersedes idx_sessions_user_created.
+CREATE INDEX IF NOT EXISTS idx_sessions_user_created_id
+  ON sessions (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_state_created_id
+  ON sessions (user_id, state, created_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_sessions_user_created;
+
+COMMIT;
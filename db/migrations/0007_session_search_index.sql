@@ -0,0 +1,125 @@
+BEGIN;
+
+-- CJK-friendly search lexemes: every CJK character plus each adjacent CJK
+-- bigram, and lowercase ASCII words. Built without a text search parser so
+-- Chinese text is indexed regardless of database locale.
+CREATE OR REPLACE FUNCTION public.nvc_search_lexemes(input TEXT)
+RETURNS TEXT[]
+LANGUAGE plpgsql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+DECLARE
+  normalized TEXT := lower(coalesce(input, ''));
+  lexemes TEXT[] := ARRAY[]::TEXT[];
+  ch TEXT;
+  prev_cjk TEXT := NULL;
+  word TEXT := '';
+  i INTEGER;
+BEGIN
+  FOR i IN 1..char_length(normalized) LOOP
+    ch := substr(normalized, i, 1);
+    IF ch ~ '[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]' THEN
+      IF word <> '' THEN
+        lexemes := lexemes || word;
+        word := '';
+      END IF;
+      lexemes := lexemes || ch;
+      IF prev_cjk IS NOT NULL THEN
+        lexemes := lexemes || (prev_cjk || ch);
+      END IF;
+      prev_cjk := ch;
+    ELSIF ch ~ '[a-z0-9]' THEN
+      prev_cjk := NULL;
+      word := word || ch;
+    ELSE
+      prev_cjk := NULL;
+      IF word <> '' THEN
+        lexemes := lexemes || word;
+        word := '';
+      END IF;
+    END IF;
+  END LOOP;
+  IF word <> '' THEN
+    lexemes := lexemes || word;
+  END IF;
+  RETURN lexemes;
+END;
+$$;
+
+-- Query side of nvc_search_lexemes: CJK runs become ANDed bigrams (a single
+-- character falls back to its unigram) and ASCII words become prefix terms.
+-- Returns NULL when the input has no searchable characters.
+CREATE OR REPLACE FUNCTION public.nvc_search_tsquery(input TEXT)
+RETURNS tsquery
+LANGUAGE plpgsql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+DECLARE
+  normalized TEXT := lower(coalesce(input, ''));
+  terms TEXT[] := ARRAY[]::TEXT[];
+  ch TEXT;
+  prev_cjk TEXT := NULL;
+  run_length INTEGER := 0;
+  word TEXT := '';
+  i INTEGER;
+BEGIN
+  FOR i IN 1..char_length(normalized) + 1 LOOP
+    ch := CASE WHEN i <= char_length(normalized) THEN substr(normalized, i, 1) ELSE ' ' END;
+    IF ch ~ '[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]' THEN
+      IF word <> '' THEN
+        terms := terms || (quote_literal(word) || ':*');
+        word := '';
+      END IF;
+      IF prev_cjk IS NOT NULL THEN
+        terms := terms || quote_literal(prev_cjk || ch);
+      END IF;
+      prev_cjk := ch;
+      run_length := run_length + 1;
+      CONTINUE;
+    END IF;
+
+    IF run_length = 1 THEN
+      terms := terms || quote_literal(prev_cjk);
+    END IF;
+    prev_cjk := NULL;
+    run_length := 0;
+
+    IF ch ~ '[a-z0-9]' THEN
+      word := word || ch;
+    ELSIF word <> '' THEN
+      terms := terms || (quote_literal(word) || ':*');
+      word := '';
+    END IF;
+  END LOOP;
+
+  IF cardinality(terms) = 0 THEN
+    RETURN NULL;
+  END IF;
+  RETURN array_to_string(terms, ' & ')::tsquery;
+END;
+$$;
+
+ALTER TABLE scenes ADD COLUMN IF NOT EXISTS search_vector tsvector
+  GENERATED ALWAYS AS (
+    array_to_tsvector(public.nvc_search_lexemes(title || ' ' || goal || ' ' || context))
+  ) STORED;
+
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+  GENERATED ALWAYS AS (array_to_tsvector(public.nvc_search_lexemes(content))) STORED;
+
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS search_vector tsvector
+  GENERATED ALWAYS AS (
+    array_to_tsvector(
+      public.nvc_search_lexemes(
+        coalesce(last_user_message, '') || ' ' || coalesce(last_assistant_message, '')
+      )
+    )
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_scenes_search_vector ON scenes USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_messages_search_vector ON messages USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_sessions_search_vector ON sessions USING GIN (search_vector);
+
+COMMIT;
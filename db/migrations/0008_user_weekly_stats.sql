@@ -0,0 +1,76 @@
+BEGIN;
+
+-- Weeks start on Monday in UTC, matching the web client's default week picker.
+CREATE OR REPLACE FUNCTION public.nvc_week_start(ts TIMESTAMPTZ)
+RETURNS DATE
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+  SELECT date_trunc('week', ts AT TIME ZONE 'UTC')::date;
+$$;
+
+CREATE TABLE IF NOT EXISTS user_weekly_stats (
+  user_id UUID NOT NULL REFERENCES users(id),
+  week_start DATE NOT NULL CHECK (extract(isodow FROM week_start) = 1),
+  practice_count INTEGER NOT NULL DEFAULT 0 CHECK (practice_count >= 0),
+  summary_count INTEGER NOT NULL DEFAULT 0 CHECK (summary_count >= 0),
+  real_world_used_count INTEGER NOT NULL DEFAULT 0 CHECK (real_world_used_count >= 0),
+  outcome_score_sum INTEGER NOT NULL DEFAULT 0 CHECK (outcome_score_sum >= 0),
+  outcome_score_count INTEGER NOT NULL DEFAULT 0 CHECK (outcome_score_count >= 0),
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (user_id, week_start)
+);
+
+-- Serve the live (non-Monday) weekly query and backfill scans.
+CREATE INDEX IF NOT EXISTS idx_summaries_created_at ON summaries (created_at);
+CREATE INDEX IF NOT EXISTS idx_reflections_user_created ON reflections (user_id, created_at);
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE user_weekly_stats TO authenticated;
+ALTER TABLE user_weekly_stats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_weekly_stats FORCE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS user_weekly_stats_owner_all ON user_weekly_stats;
+CREATE POLICY user_weekly_stats_owner_all ON user_weekly_stats
+FOR ALL TO authenticated
+USING (user_id = public.request_user_id())
+WITH CHECK (user_id = public.request_user_id());
+
+-- Initial backfill; later drift can be repaired with scripts/backfill_weekly_stats.py.
+INSERT INTO user_weekly_stats (
+  user_id,
+  week_start,
+  practice_count,
+  summary_count,
+  real_world_used_count,
+  outcome_score_sum,
+  outcome_score_count
+)
+SELECT
+  activity.user_id,
+  activity.week_start,
+  SUM(activity.practice_count),
+  SUM(activity.summary_count),
+  SUM(activity.real_world_used_count),
+  SUM(activity.outcome_score_sum),
+  SUM(activity.outcome_score_count)
+FROM (
+  SELECT s.user_id, public.nvc_week_start(s.created_at) AS week_start,
+         1 AS practice_count, 0 AS summary_count, 0 AS real_world_used_count,
+         0 AS outcome_score_sum, 0 AS outcome_score_count
+  FROM sessions s
+  UNION ALL
+  SELECT s.user_id, public.nvc_week_start(sm.created_at), 0, 1, 0, 0, 0
+  FROM summaries sm
+  JOIN sessions s ON s.id = sm.session_id
+  UNION ALL
+  SELECT r.user_id, public.nvc_week_start(r.created_at), 0, 0,
+         CASE WHEN r.used_in_real_world THEN 1 ELSE 0 END,
+         COALESCE(r.outcome_score, 0),
+         CASE WHEN r.outcome_score IS NULL THEN 0 ELSE 1 END
+  FROM reflections r
+) activity
+GROUP BY activity.user_id, activity.week_start
+ON CONFLICT (user_id, week_start) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,23 @@
+BEGIN;
+
+-- Responses are stored as compact pre-serialized JSON bytes and returned as-is;
+-- response_body is kept nullable only for rows written before this migration.
+ALTER TABLE idempotency_keys ADD COLUMN IF NOT EXISTS response_bytes BYTEA;
+ALTER TABLE idempotency_keys ALTER COLUMN response_body DROP NOT NULL;
+
+ALTER TABLE idempotency_keys ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ;
+UPDATE idempotency_keys
+SET expires_at = created_at + INTERVAL '72 hours'
+WHERE expires_at IS NULL;
+ALTER TABLE idempotency_keys ALTER COLUMN expires_at SET DEFAULT NOW() + INTERVAL '72 hours';
+ALTER TABLE idempotency_keys ALTER COLUMN expires_at SET NOT NULL;
+
+ALTER TABLE idempotency_keys DROP CONSTRAINT IF EXISTS ck_idempotency_response_present;
+ALTER TABLE idempotency_keys ADD CONSTRAINT ck_idempotency_response_present
+  CHECK (response_bytes IS NOT NULL OR response_body IS NOT NULL);
+
+-- Batched purge walks this index; nothing reads created_at order any more.
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires_at ON idempotency_keys (expires_at);
+DROP INDEX IF EXISTS idx_idempotency_created_at;
+
+COMMIT;
@@ -0,0 +1,11 @@
+BEGIN;
+
+-- Summary generation reads the latest feedback of one session, and the RLS
+-- policies on feedback_items/rewrites resolve ownership through session_id;
+-- both columns were foreign keys without any supporting index.
+CREATE INDEX IF NOT EXISTS idx_feedback_items_session_created
+  ON feedback_items (session_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_rewrites_session_created
+  ON rewrites (session_id, created_at DESC);
+
+COMMIT;
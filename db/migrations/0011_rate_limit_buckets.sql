@@ -0,0 +1,81 @@
+BEGIN;
+
+-- Shared token buckets for RATE_LIMIT_BACKEND=postgres. A missing row is a
+-- full bucket, so rows idle for longer than their refill time can be deleted.
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+  bucket_key TEXT PRIMARY KEY,
+  tokens DOUBLE PRECISION NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE rate_limit_buckets ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON TABLE rate_limit_buckets FROM PUBLIC, authenticated;
+
+-- Takes p_cost tokens from every bucket, or from none if any is short.
+-- Callers pass keys in sorted order so concurrent calls lock rows in the
+-- same order. Returns each bucket's tokens after the call and, when
+-- rejected, the seconds until the emptiest bucket can pay p_cost again.
+CREATE OR REPLACE FUNCTION public.rate_limit_acquire(
+  p_keys TEXT[],
+  p_capacities DOUBLE PRECISION[],
+  p_refill_per_second DOUBLE PRECISION[],
+  p_cost DOUBLE PRECISION DEFAULT 1
+)
+RETURNS TABLE (
+  allowed BOOLEAN,
+  tokens DOUBLE PRECISION[],
+  retry_after_seconds DOUBLE PRECISION
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_now TIMESTAMPTZ := clock_timestamp();
+  v_tokens DOUBLE PRECISION[] := '{}';
+  v_allowed BOOLEAN := TRUE;
+  v_retry DOUBLE PRECISION := 0;
+  v_stored DOUBLE PRECISION;
+  v_updated_at TIMESTAMPTZ;
+  v_available DOUBLE PRECISION;
+  i INT;
+BEGIN
+  INSERT INTO rate_limit_buckets (bucket_key, tokens, updated_at)
+  SELECT k.bucket_key, k.capacity, v_now
+  FROM unnest(p_keys, p_capacities) AS k(bucket_key, capacity)
+  ON CONFLICT (bucket_key) DO NOTHING;
+
+  FOR i IN 1 .. array_length(p_keys, 1) LOOP
+    SELECT b.tokens, b.updated_at
+    INTO v_stored, v_updated_at
+    FROM rate_limit_buckets b
+    WHERE b.bucket_key = p_keys[i]
+    FOR UPDATE;
+
+    v_available := LEAST(
+      p_capacities[i],
+      v_stored + GREATEST(0, EXTRACT(EPOCH FROM v_now - v_updated_at)) * p_refill_per_second[i]
+    );
+    v_tokens := v_tokens || v_available;
+    IF v_available < p_cost THEN
+      v_allowed := FALSE;
+      v_retry := GREATEST(v_retry, (p_cost - v_available) / p_refill_per_second[i]);
+    END IF;
+  END LOOP;
+
+  -- A rejected call leaves rows untouched: refill is recomputed from
+  -- updated_at next time, so there is nothing to write.
+  IF v_allowed THEN
+    FOR i IN 1 .. array_length(p_keys, 1) LOOP
+      v_tokens[i] := v_tokens[i] - p_cost;
+      UPDATE rate_limit_buckets
+      SET tokens = v_tokens[i], updated_at = v_now
+      WHERE bucket_key = p_keys[i];
+    END LOOP;
+  END IF;
+
+  RETURN QUERY SELECT v_allowed, v_tokens, v_retry;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.rate_limit_acquire(TEXT[], DOUBLE PRECISION[], DOUBLE PRECISION[], DOUBLE PRECISION) FROM PUBLIC, authenticated;
+
+COMMIT;
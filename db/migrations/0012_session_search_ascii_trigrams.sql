@@ -0,0 +1,128 @@
+BEGIN;
+
+-- ASCII words are indexed as their trigrams instead of whole words, so a
+-- keyword that starts or ends mid-word ("view" inside "review") still narrows
+-- candidates through the GIN index. CJK lexemes are unchanged from 0007.
+CREATE OR REPLACE FUNCTION public.nvc_search_lexemes(input TEXT)
+RETURNS TEXT[]
+LANGUAGE plpgsql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+DECLARE
+  normalized TEXT := lower(coalesce(input, ''));
+  lexemes TEXT[] := ARRAY[]::TEXT[];
+  ch TEXT;
+  prev_cjk TEXT := NULL;
+  word TEXT := '';
+  i INTEGER;
+  j INTEGER;
+BEGIN
+  FOR i IN 1..char_length(normalized) + 1 LOOP
+    ch := CASE WHEN i <= char_length(normalized) THEN substr(normalized, i, 1) ELSE ' ' END;
+    IF ch ~ '[a-z0-9]' THEN
+      prev_cjk := NULL;
+      word := word || ch;
+      CONTINUE;
+    END IF;
+
+    FOR j IN 1..char_length(word) - 2 LOOP
+      lexemes := lexemes || substr(word, j, 3);
+    END LOOP;
+    word := '';
+
+    IF ch ~ '[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]' THEN
+      lexemes := lexemes || ch;
+      IF prev_cjk IS NOT NULL THEN
+        lexemes := lexemes || (prev_cjk || ch);
+      END IF;
+      prev_cjk := ch;
+    ELSE
+      prev_cjk := NULL;
+    END IF;
+  END LOOP;
+  RETURN lexemes;
+END;
+$$;
+
+-- Query side: CJK runs become ANDed bigrams (a single character falls back to
+-- its unigram) and ASCII runs of 3+ characters become their ANDed trigrams.
+-- Shorter ASCII runs and punctuation add no term; returns NULL when nothing in
+-- the input is indexed.
+CREATE OR REPLACE FUNCTION public.nvc_search_tsquery(input TEXT)
+RETURNS tsquery
+LANGUAGE plpgsql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+DECLARE
+  normalized TEXT := lower(coalesce(input, ''));
+  terms TEXT[] := ARRAY[]::TEXT[];
+  ch TEXT;
+  prev_cjk TEXT := NULL;
+  run_length INTEGER := 0;
+  word TEXT := '';
+  i INTEGER;
+  j INTEGER;
+BEGIN
+  FOR i IN 1..char_length(normalized) + 1 LOOP
+    ch := CASE WHEN i <= char_length(normalized) THEN substr(normalized, i, 1) ELSE ' ' END;
+    IF ch ~ '[a-z0-9]' THEN
+      word := word || ch;
+    ELSE
+      FOR j IN 1..char_length(word) - 2 LOOP
+        terms := terms || quote_literal(substr(word, j, 3));
+      END LOOP;
+      word := '';
+    END IF;
+
+    IF ch ~ '[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]' THEN
+      IF prev_cjk IS NOT NULL THEN
+        terms := terms || quote_literal(prev_cjk || ch);
+      END IF;
+      prev_cjk := ch;
+      run_length := run_length + 1;
+      CONTINUE;
+    END IF;
+
+    IF run_length = 1 THEN
+      terms := terms || quote_literal(prev_cjk);
+    END IF;
+    prev_cjk := NULL;
+    run_length := 0;
+  END LOOP;
+
+  IF cardinality(terms) = 0 THEN
+    RETURN NULL;
+  END IF;
+  RETURN array_to_string(terms, ' & ')::tsquery;
+END;
+$$;
+
+-- Stored generated columns are not recomputed when the function changes, so
+-- rebuild them (and their indexes) from the new lexemes.
+ALTER TABLE scenes DROP COLUMN IF EXISTS search_vector;
+ALTER TABLE scenes ADD COLUMN search_vector tsvector
+  GENERATED ALWAYS AS (
+    array_to_tsvector(public.nvc_search_lexemes(title || ' ' || goal || ' ' || context))
+  ) STORED;
+
+ALTER TABLE messages DROP COLUMN IF EXISTS search_vector;
+ALTER TABLE messages ADD COLUMN search_vector tsvector
+  GENERATED ALWAYS AS (array_to_tsvector(public.nvc_search_lexemes(content))) STORED;
+
+ALTER TABLE sessions DROP COLUMN IF EXISTS search_vector;
+ALTER TABLE sessions ADD COLUMN search_vector tsvector
+  GENERATED ALWAYS AS (
+    array_to_tsvector(
+      public.nvc_search_lexemes(
+        coalesce(last_user_message, '') || ' ' || coalesce(last_assistant_message, '')
+      )
+    )
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_scenes_search_vector ON scenes USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_messages_search_vector ON messages USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_sessions_search_vector ON sessions USING GIN (search_vector);
+
+COMMIT;
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from datetime import date
+from pathlib import Path
+from uuid import UUID
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+BACKEND_DIR = ROOT_DIR / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.db.session import SessionLocal, engine
+from app.db.weekly_stats import backfill_user_weekly_stats
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Recompute user_weekly_stats from sessions, summaries and reflections."
+    )
+    parser.add_argument(
+        "--user-id",
+        type=UUID,
+        default=None,
+        help="Only rebuild rows for this user (default: all users)",
+    )
+    parser.add_argument(
+        "--since",
+        type=date.fromisoformat,
+        default=None,
+        help="Only rebuild weeks starting on or after the week of this date (YYYY-MM-DD)",
+    )
+    return parser.parse_args()
+
+
+async def _run(user_id: UUID | None, since: date | None) -> int:
+    try:
+        async with SessionLocal() as session:
+            rows = await backfill_user_weekly_stats(session, user_id=user_id, since=since)
+            await session.commit()
+        return rows
+    finally:
+        await engine.dispose()
+
+
+def main() -> int:
+    args = _parse_args()
+    rows = asyncio.run(_run(args.user_id, args.since))
+    scope = f"user={args.user_id or 'all'} since={args.since or 'all'}"
+    print(f"[WEEKLY-STATS] rebuilt {rows} week rows ({scope})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+from synthetic_corpus import (
+    DEFAULT_EVALSETS,
+    UtteranceSampler,
+    load_utterances,
+    scene_payload,
+)
+
+# Upper bucket edges in ms; the last bucket is open-ended.
+BUCKET_EDGES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    # Nearest-rank, so p99 of a short run is a real observed sample.
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+@dataclass
+class EndpointStats:
+    samples_ms: list[float] = field(default_factory=list)
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(BUCKET_EDGES_MS) + 1))
+    status_counts: dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def record(self, elapsed_ms: float, status: str, ok: bool) -> None:
+        self.samples_ms.append(elapsed_ms)
+        self.buckets[bisect.bisect_left(BUCKET_EDGES_MS, elapsed_ms)] += 1
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples_ms)
+        labels = [f"<={edge}ms" for edge in BUCKET_EDGES_MS] + [f">{BUCKET_EDGES_MS[-1]}ms"]
+        return {
+            "count": len(ordered),
+            "errors": self.errors,
+            "status_counts": dict(sorted(self.status_counts.items())),
+            "p50_ms": round(_percentile(ordered, 50), 2),
+            "p90_ms": round(_percentile(ordered, 90), 2),
+            "p95_ms": round(_percentile(ordered, 95), 2),
+            "p99_ms": round(_percentile(ordered, 99), 2),
+            "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+            "histogram": {label: count for label, count in zip(labels, self.buckets) if count},
+        }
+
+
+class Pacer:
+    # Hands out evenly spaced start slots so all virtual users share one RPS budget.
+    def __init__(self, rps: float) -> None:
+        self._interval = 1.0 / rps
+        self._next_slot = time.monotonic()
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+@dataclass
+class DriverConfig:
+    base_url: str
+    rps: float
+    duration_seconds: float
+    virtual_users: int
+    user_pool: int
+    min_messages: int
+    rewrite_rate: float
+    summary_rate: float
+    reflection_rate: float
+    read_rate: float
+    timeout_seconds: float
+
+
+class TrafficDriver:
+    def __init__(self, config: DriverConfig, sampler: UtteranceSampler, rng: random.Random) -> None:
+        self._config = config
+        self._sampler = sampler
+        self._rng = rng
+        self._pacer = Pacer(config.rps)
+        self._user_ids = [uuid4() for _ in range(config.user_pool)]
+        self._deadline = 0.0
+        self._scene_index = 0
+        self.stats: dict[str, EndpointStats] = {}
+        self.flows_completed = 0
+        self.flows_aborted = 0
+
+    async def run(self) -> float:
+        limits = httpx.Limits(max_connections=self._config.virtual_users)
+        started = time.monotonic()
+        self._deadline = started + self._config.duration_seconds
+        async with httpx.AsyncClient(
+            base_url=self._config.base_url,
+            timeout=self._config.timeout_seconds,
+            limits=limits,
+        ) as client:
+            await asyncio.gather(
+                *(self._virtual_user(client, index) for index in range(self._config.virtual_users))
+            )
+        return time.monotonic() - started
+
+    async def _virtual_user(self, client: httpx.AsyncClient, index: int) -> None:
+        user_id = self._user_ids[index % len(self._user_ids)]
+        headers = {"Authorization": f"Bearer mock_{user_id}"}
+        while time.monotonic() < self._deadline:
+            if await self._flow(client, headers):
+                self.flows_completed += 1
+            elif time.monotonic() < self._deadline:
+                # Flows cut short by the end of the run are not failures.
+                self.flows_aborted += 1
+
+    async def _call(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        template: str,
+        url: str,
+        headers: dict[str, str],
+        payload: dict | None = None,
+        params: dict | None = None,
+    ) -> dict | None:
+        if time.monotonic() >= self._deadline:
+            return None
+        await self._pacer.wait()
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, headers=headers, json=payload, params=params)
+        except httpx.HTTPError as exc:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._stats_for(f"{method} {template}").record(elapsed_ms, type(exc).__name__, ok=False)
+            return None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        ok = response.status_code < 400
+        self._stats_for(f"{method} {template}").record(elapsed_ms, str(response.status_code), ok=ok)
+        if not ok:
+            return None
+        return response.json()
+
+    def _stats_for(self, key: str) -> EndpointStats:
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = EndpointStats()
+        return stats
+
+    async def _flow(self, client: httpx.AsyncClient, headers: dict[str, str]) -> bool:
+        # scene -> session -> N messages -> rewrite -> summary -> reflection, plus
+        # the reads a client makes while browsing its history.
+        rng = self._rng
+        config = self._config
+        self._scene_index += 1
+        scene = await self._call(
+            client,
+            "POST",
+            "/api/v1/scenes",
+            "/api/v1/scenes",
+            headers,
+            payload=scene_payload(rng, self._scene_index),
+        )
+        if scene is None:
+            return False
+
+        target_turns = rng.randint(5, 8)
+        session = await self._call(
+            client,
+            "POST",
+            "/api/v1/sessions",
+            "/api/v1/sessions",
+            headers,
+            payload={"scene_id": scene["scene_id"], "target_turns": target_turns},
+        )
+        if session is None:
+            return False
+        session_id = session["session_id"]
+        session_path = f"/api/v1/sessions/{session_id}"
+
+        last_message_id: str | None = None
+        for _ in range(rng.randint(min(config.min_messages, target_turns), target_turns)):
+            message = await self._call(
+                client,
+                "POST",
+                "/api/v1/sessions/{session_id}/messages",
+                f"{session_path}/messages",
+                headers,
+                payload={"client_message_id": str(uuid4()), "content": self._sampler.sample()},
+            )
+            if message is None:
+                return False
+            last_message_id = message["user_message_id"]
+
+        if last_message_id and rng.random() < config.rewrite_rate:
+            rewrite = await self._call(
+                client,
+                "POST",
+                "/api/v1/sessions/{session_id}/rewrite",
+                f"{session_path}/rewrite",
+                headers,
+                payload={"source_message_id": last_message_id, "rewrite_style": "NEUTRAL"},
+            )
+            if rewrite is None:
+                return False
+
+        if last_message_id and rng.random() < config.summary_rate:
+            summary = await self._call(
+                client,
+                "POST",
+                "/api/v1/sessions/{session_id}/summary",
+                f"{session_path}/summary",
+                headers,
+            )
+            if summary is None:
+                return False
+
+        if rng.random() < config.reflection_rate:
+            used = rng.random() < 0.6
+            reflection = await self._call(
+                client,
+                "POST",
+                "/api/v1/reflections",
+                "/api/v1/reflections",
+                headers,
+                payload={
+                    "session_id": session_id,
+                    "used_in_real_world": used,
+                    "outcome_score": rng.randint(1, 5) if used else None,
+                    "blocker_code": None if used else "NO_CHANCE",
+                },
+            )
+            if reflection is None:
+                return False
+
+        if rng.random() < config.read_rate:
+            today = date.today()
+            week_start = (today - timedelta(days=today.weekday())).isoformat()
+            reads = (
+                ("/api/v1/sessions/{session_id}/history", f"{session_path}/history", None),
+                ("/api/v1/sessions", "/api/v1/sessions", {"limit": 20}),
+                ("/api/v1/progress/weekly", "/api/v1/progress/weekly", {"week_start": week_start}),
+            )
+            for template, url, params in reads:
+                if await self._call(client, "GET", template, url, headers, params=params) is None:
+                    return False
+        return True
+
+
+def _print_report(driver: TrafficDriver, elapsed: float) -> dict:
+    endpoints = {key: stats.summary() for key, stats in sorted(driver.stats.items())}
+    total = sum(item["count"] for item in endpoints.values())
+    errors = sum(item["errors"] for item in endpoints.values())
+    report = {
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": total,
+        "errors": errors,
+        "achieved_rps": round(total / max(elapsed, 1e-9), 2),
+        "flows_completed": driver.flows_completed,
+        "flows_aborted": driver.flows_aborted,
+        "endpoints": endpoints,
+    }
+    for key, item in endpoints.items():
+        print(
+            f"[TRAFFIC] {key} n={item['count']} err={item['errors']} "
+            f"p50={item['p50_ms']}ms p90={item['p90_ms']}ms p95={item['p95_ms']}ms "
+            f"p99={item['p99_ms']}ms max={item['max_ms']}ms"
+        )
+        print("          " + " ".join(f"{label}:{count}" for label, count in item["histogram"].items()))
+    print(
+        f"[TRAFFIC] requests={total} errors={errors} achieved_rps={report['achieved_rps']} "
+        f"flows_completed={driver.flows_completed} flows_aborted={driver.flows_aborted}"
+    )
+    return report
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay practice-session flows against a running API at a target request rate."
+    )
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="API base URL")
+    parser.add_argument("--rps", type=float, default=20.0, help="Target requests per second across all users")
+    parser.add_argument("--duration-seconds", type=float, default=60.0, help="How long to drive traffic")
+    parser.add_argument("--virtual-users", type=int, default=20, help="Concurrent flows in flight")
+    parser.add_argument(
+        "--user-pool",
+        type=int,
+        default=None,
+        help="Distinct mock users the virtual users map onto (default: one per virtual user)",
+    )
+    parser.add_argument(
+        "--min-messages",
+        type=int,
+        default=3,
+        help="Minimum messages per session; the maximum is the session's target_turns",
+    )
+    parser.add_argument("--rewrite-rate", type=float, default=0.5, help="Share of flows that request a rewrite")
+    parser.add_argument("--summary-rate", type=float, default=0.8, help="Share of flows that request a summary")
+    parser.add_argument(
+        "--reflection-rate",
+        type=float,
+        default=0.4,
+        help="Share of flows that submit a reflection",
+    )
+    parser.add_argument(
+        "--read-rate",
+        type=float,
+        default=0.5,
+        help="Share of flows that finish with history, list and weekly progress reads",
+    )
+    parser.add_argument("--mutation-rate", type=float, default=0.5, help="Share of utterances that get mutated")
+    parser.add_argument(
+        "--evalset",
+        type=Path,
+        action="append",
+        default=None,
+        help="Evalset JSONL to sample utterances from (repeatable; default: v0.1 and v0.2)",
+    )
+    parser.add_argument("--timeout-seconds", type=float, default=30.0, help="Per-request timeout")
+    parser.add_argument("--seed", type=int, default=20260101, help="Random seed")
+    parser.add_argument("--json-out", type=Path, default=None, help="Write the report as JSON to this path")
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=0.01,
+        help="Exit non-zero when errors/requests exceeds this (default: 0.01)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    if args.rps <= 0 or args.duration_seconds <= 0 or args.virtual_users < 1:
+        print("[TRAFFIC] --rps and --duration-seconds must be > 0 and --virtual-users >= 1")
+        return 1
+
+    rng = random.Random(args.seed)
+    sampler = UtteranceSampler(rng, load_utterances(args.evalset or DEFAULT_EVALSETS), args.mutation_rate)
+    config = DriverConfig(
+        base_url=args.base_url.rstrip("/"),
+        rps=args.rps,
+        duration_seconds=args.duration_seconds,
+        virtual_users=args.virtual_users,
+        user_pool=max(1, args.user_pool or args.virtual_users),
+        min_messages=max(1, args.min_messages),
+        rewrite_rate=args.rewrite_rate,
+        summary_rate=args.summary_rate,
+        reflection_rate=args.reflection_rate,
+        read_rate=args.read_rate,
+        timeout_seconds=args.timeout_seconds,
+    )
+    print(
+        f"[TRAFFIC] driving {config.base_url} rps={config.rps} "
+        f"duration={config.duration_seconds}s virtual_users={config.virtual_users}"
+    )
+    driver = TrafficDriver(config, sampler, rng)
+    elapsed = asyncio.run(driver.run())
+    report = _print_report(driver, elapsed)
+    if args.json_out:
+        args.json_out.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"[TRAFFIC] wrote {args.json_out}")
+
+    error_rate = report["errors"] / max(1, report["requests"])
+    if error_rate > args.max_error_rate:
+        print(f"[TRAFFIC] error rate {error_rate:.2%} exceeds {args.max_error_rate:.2%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
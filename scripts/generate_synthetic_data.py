@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from uuid import UUID, uuid4
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+BACKEND_DIR = ROOT_DIR / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.db.weekly_stats import backfill_user_weekly_stats
+from app.schemas.reflections import BlockerCode
+from app.services.nvc_service import analyze_message
+from synthetic_corpus import (
+    ASSISTANT_REPLIES,
+    DEFAULT_EVALSETS,
+    UtteranceSampler,
+    load_utterances,
+    scene_payload,
+)
+
+# Explicit column lists keep COPY away from the generated search_vector columns.
+TABLE_COLUMNS = {
+    "users": ("id", "email", "display_name", "created_at", "updated_at"),
+    "scenes": (
+        "id",
+        "user_id",
+        "title",
+        "template_id",
+        "counterparty_role",
+        "relationship_level",
+        "goal",
+        "pain_points",
+        "context",
+        "power_dynamic",
+        "created_at",
+        "updated_at",
+    ),
+    "sessions": (
+        "id",
+        "user_id",
+        "scene_id",
+        "state",
+        "target_turns",
+        "current_turn",
+        "started_at",
+        "ended_at",
+        "created_at",
+        "last_user_message",
+        "last_assistant_message",
+        "last_overall_score",
+        "last_risk_level",
+        "has_summary",
+        "has_reflection",
+    ),
+    "messages": ("id", "session_id", "role", "turn_no", "content", "latency_ms", "created_at"),
+    "feedback_items": (
+        "id",
+        "session_id",
+        "user_message_id",
+        "overall_score",
+        "risk_level",
+        "ofnr_detail",
+        "next_best_sentence",
+        "created_at",
+    ),
+    "summaries": (
+        "id",
+        "session_id",
+        "opening_line",
+        "request_line",
+        "fallback_line",
+        "risk_triggers",
+        "created_at",
+        "updated_at",
+    ),
+    "reflections": (
+        "id",
+        "user_id",
+        "session_id",
+        "used_in_real_world",
+        "outcome_score",
+        "blocker_code",
+        "blocker_note",
+        "created_at",
+    ),
+}
+# FK order: parents are copied before the rows that reference them.
+TABLE_ORDER = tuple(TABLE_COLUMNS)
+
+
+@dataclass
+class GeneratorConfig:
+    users: int
+    sessions_per_user: int
+    completion_rate: float
+    summary_rate: float
+    reflection_rate: float
+    days: int
+    seed: int
+    chunk_users: int
+    mutation_rate: float
+    evalsets: list[Path]
+
+
+@dataclass
+class Batch:
+    rows: dict[str, list[tuple]] = field(default_factory=lambda: {table: [] for table in TABLE_ORDER})
+
+    def row_count(self) -> int:
+        return sum(len(rows) for rows in self.rows.values())
+
+
+@dataclass(frozen=True)
+class _Feedback:
+    overall_score: int
+    risk_level: str
+    ofnr_detail: str
+    next_best_sentence: str
+    risk_triggers: str
+
+
+@lru_cache(maxsize=16384)
+def _feedback_for(content: str) -> _Feedback:
+    # The rule engine is deterministic, so sampled utterances repeat cheaply.
+    analysis = analyze_message(content)
+    feedback = analysis.feedback
+    return _Feedback(
+        overall_score=feedback.overall_score,
+        risk_level=feedback.risk_level.value,
+        ofnr_detail=json.dumps(feedback.ofnr.model_dump(mode="json"), ensure_ascii=False),
+        next_best_sentence=feedback.next_best_sentence,
+        risk_triggers=json.dumps(analysis.risk_triggers, ensure_ascii=False),
+    )
+
+
+def _summary_lines(sentence: str) -> tuple[str, str, str]:
+    # Same split as POST /sessions/{id}/summary so generated rows look real.
+    parts = [p.strip() for p in sentence.replace("？", "?").split("。") if p.strip()]
+    opening_line = parts[0] if parts else sentence
+    request_line = parts[1] if len(parts) > 1 else "你愿意和我一起确认下一步安排吗？"
+    return opening_line, request_line, "如果现在不方便，我们可否约一个具体时间再对齐？"
+
+
+class SyntheticDataGenerator:
+    def __init__(self, config: GeneratorConfig) -> None:
+        self._config = config
+        self._rng = random.Random(config.seed)
+        self._sampler = UtteranceSampler(
+            self._rng,
+            load_utterances(config.evalsets),
+            config.mutation_rate,
+        )
+        self._now = datetime.now(UTC)
+        self._scene_index = 0
+
+    def build_batch(self, user_count: int) -> Batch:
+        batch = Batch()
+        for _ in range(user_count):
+            self._add_user(batch)
+        return batch
+
+    def _random_time(self) -> datetime:
+        seconds = self._rng.uniform(0, self._config.days * 86400)
+        return self._now - timedelta(seconds=seconds)
+
+    def _add_user(self, batch: Batch) -> None:
+        rng = self._rng
+        user_id = uuid4()
+        joined_at = self._now - timedelta(days=self._config.days, hours=rng.uniform(0, 72))
+        batch.rows["users"].append(
+            (
+                user_id,
+                f"synthetic+{user_id.hex[:16]}@load.local",
+                f"Synthetic {user_id.hex[:6]}",
+                joined_at,
+                joined_at,
+            )
+        )
+        scene_ids: list[UUID] = []
+        for _ in range(max(1, self._config.sessions_per_user // 3)):
+            scene_ids.append(self._add_scene(batch, user_id, joined_at))
+        for _ in range(self._config.sessions_per_user):
+            self._add_session(batch, user_id, rng.choice(scene_ids))
+
+    def _add_scene(self, batch: Batch, user_id: UUID, created_at: datetime) -> UUID:
+        scene_id = uuid4()
+        payload = scene_payload(self._rng, self._scene_index)
+        self._scene_index += 1
+        batch.rows["scenes"].append(
+            (
+                scene_id,
+                user_id,
+                payload["title"],
+                payload["template_id"],
+                payload["counterparty_role"],
+                payload["relationship_level"],
+                payload["goal"],
+                json.dumps(payload["pain_points"], ensure_ascii=False),
+                payload["context"],
+                payload["power_dynamic"],
+                created_at,
+                created_at,
+            )
+        )
+        return scene_id
+
+    def _add_session(self, batch: Batch, user_id: UUID, scene_id: UUID) -> None:
+        rng = self._rng
+        config = self._config
+        session_id = uuid4()
+        started_at = self._random_time()
+        target_turns = rng.randint(5, 8)
+        completed = rng.random() < config.completion_rate
+        turns = target_turns if completed else rng.randint(1, target_turns - 1)
+
+        at = started_at
+        last_user = last_assistant = None
+        feedback: _Feedback | None = None
+        for turn_no in range(1, turns + 1):
+            at += timedelta(seconds=rng.uniform(20, 180))
+            user_message_id = uuid4()
+            last_user = self._sampler.sample()
+            last_assistant = rng.choice(ASSISTANT_REPLIES)
+            feedback = _feedback_for(last_user)
+            latency_ms = int(rng.lognormvariate(6.5, 0.5))
+            batch.rows["messages"].append(
+                (user_message_id, session_id, "USER", turn_no, last_user, None, at)
+            )
+            batch.rows["messages"].append(
+                (
+                    uuid4(),
+                    session_id,
+                    "ASSISTANT",
+                    turn_no,
+                    last_assistant,
+                    latency_ms,
+                    at + timedelta(milliseconds=latency_ms),
+                )
+            )
+            batch.rows["feedback_items"].append(
+                (
+                    uuid4(),
+                    session_id,
+                    user_message_id,
+                    feedback.overall_score,
+                    feedback.risk_level,
+                    feedback.ofnr_detail,
+                    feedback.next_best_sentence,
+                    at,
+                )
+            )
+
+        has_summary = completed and feedback is not None and rng.random() < config.summary_rate
+        if has_summary:
+            summary_at = at + timedelta(minutes=rng.uniform(1, 30))
+            opening_line, request_line, fallback_line = _summary_lines(feedback.next_best_sentence)
+            batch.rows["summaries"].append(
+                (
+                    uuid4(),
+                    session_id,
+                    opening_line,
+                    request_line,
+                    fallback_line,
+                    feedback.risk_triggers,
+                    summary_at,
+                    summary_at,
+                )
+            )
+
+        has_reflection = completed and rng.random() < config.reflection_rate
+        if has_reflection:
+            used = rng.random() < 0.6
+            blocker = None if used else rng.choice(list(BlockerCode)).value
+            batch.rows["reflections"].append(
+                (
+                    uuid4(),
+                    user_id,
+                    session_id,
+                    used,
+                    rng.randint(1, 5) if used else None,
+                    blocker,
+                    None,
+                    at + timedelta(days=rng.uniform(0.5, 7)),
+                )
+            )
+
+        batch.rows["sessions"].append(
+            (
+                session_id,
+                user_id,
+                scene_id,
+                "COMPLETED" if completed else rng.choice(("ACTIVE", "ABANDONED")),
+                target_turns,
+                turns,
+                started_at,
+                at if completed else None,
+                started_at,
+                last_user,
+                last_assistant,
+                feedback.overall_score if feedback else None,
+                feedback.risk_level if feedback else None,
+                has_summary,
+                has_reflection,
+            )
+        )
+
+
+async def _copy_batch(batch: Batch) -> None:
+    async with engine.begin() as conn:
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        for table in TABLE_ORDER:
+            rows = batch.rows[table]
+            if rows:
+                await driver.copy_records_to_table(
+                    table,
+                    records=rows,
+                    columns=TABLE_COLUMNS[table],
+                )
+
+
+async def _run(config: GeneratorConfig, skip_rollup: bool) -> dict[str, int]:
+    generator = SyntheticDataGenerator(config)
+    totals = {table: 0 for table in TABLE_ORDER}
+    try:
+        remaining = config.users
+        while remaining > 0:
+            chunk = min(config.chunk_users, remaining)
+            batch = generator.build_batch(chunk)
+            await _copy_batch(batch)
+            for table in TABLE_ORDER:
+                totals[table] += len(batch.rows[table])
+            remaining -= chunk
+            print(f"[SYNTHETIC] copied users={config.users - remaining}/{config.users} rows={batch.row_count()}")
+
+        if not skip_rollup:
+            async with SessionLocal() as session:
+                totals["user_weekly_stats"] = await backfill_user_weekly_stats(session)
+                await session.commit()
+        return totals
+    finally:
+        await engine.dispose()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Bulk-load synthetic users, scenes and practice sessions for load testing."
+    )
+    parser.add_argument("--users", type=int, default=1000, help="Number of users to create")
+    parser.add_argument("--sessions-per-user", type=int, default=6, help="Sessions per user")
+    parser.add_argument(
+        "--completion-rate",
+        type=float,
+        default=0.7,
+        help="Share of sessions that reach target_turns (default: 0.7)",
+    )
+    parser.add_argument(
+        "--summary-rate",
+        type=float,
+        default=0.6,
+        help="Share of completed sessions with a summary (default: 0.6)",
+    )
+    parser.add_argument(
+        "--reflection-rate",
+        type=float,
+        default=0.4,
+        help="Share of completed sessions with a reflection (default: 0.4)",
+    )
+    parser.add_argument("--days", type=int, default=180, help="Spread session start times over this many days")
+    parser.add_argument(
+        "--mutation-rate",
+        type=float,
+        default=0.5,
+        help="Share of sampled utterances that get mutated (default: 0.5)",
+    )
+    parser.add_argument(
+        "--evalset",
+        type=Path,
+        action="append",
+        default=None,
+        help="Evalset JSONL to sample utterances from (repeatable; default: v0.1 and v0.2)",
+    )
+    parser.add_argument("--chunk-users", type=int, default=500, help="Users per COPY transaction")
+    parser.add_argument("--seed", type=int, default=20260101, help="Random seed")
+    parser.add_argument(
+        "--skip-rollup",
+        action="store_true",
+        help="Do not rebuild user_weekly_stats after loading",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    if settings.app_env == "production":
+        print("[SYNTHETIC] refusing to load synthetic data with APP_ENV=production")
+        return 1
+    if args.users < 1 or args.sessions_per_user < 1 or args.chunk_users < 1 or args.days < 1:
+        print("[SYNTHETIC] --users, --sessions-per-user, --chunk-users and --days must be >= 1")
+        return 1
+
+    config = GeneratorConfig(
+        users=args.users,
+        sessions_per_user=args.sessions_per_user,
+        completion_rate=args.completion_rate,
+        summary_rate=args.summary_rate,
+        reflection_rate=args.reflection_rate,
+        days=args.days,
+        seed=args.seed,
+        chunk_users=args.chunk_users,
+        mutation_rate=args.mutation_rate,
+        evalsets=args.evalset or list(DEFAULT_EVALSETS),
+    )
+    started = time.perf_counter()
+    totals = asyncio.run(_run(config, args.skip_rollup))
+    elapsed = time.perf_counter() - started
+    copied = sum(count for table, count in totals.items() if table in TABLE_COLUMNS)
+    print(
+        "[SYNTHETIC] "
+        + " ".join(f"{table}={count}" for table, count in totals.items())
+        + f" elapsed={elapsed:.1f}s rows_per_s={copied / max(elapsed, 1e-9):.0f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
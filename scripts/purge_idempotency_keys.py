@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+BACKEND_DIR = ROOT_DIR / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.db.idempotency import purge_expired_idempotency_keys
+from app.db.session import SessionLocal, engine
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Delete expired idempotency_keys rows in small batches."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Rows deleted per transaction",
+    )
+    parser.add_argument(
+        "--max-batches",
+        type=int,
+        default=0,
+        help="Stop after this many batches (0 means until drained)",
+    )
+    parser.add_argument(
+        "--pause-seconds",
+        type=float,
+        default=0.05,
+        help="Sleep between batches to leave headroom for live traffic",
+    )
+    return parser.parse_args()
+
+
+async def _run(batch_size: int, max_batches: int, pause_seconds: float) -> int:
+    total = 0
+    batches = 0
+    try:
+        while True:
+            async with SessionLocal() as session:
+                deleted = await purge_expired_idempotency_keys(session, batch_size=batch_size)
+                await session.commit()
+            total += deleted
+            batches += 1
+            if deleted < batch_size or (max_batches and batches >= max_batches):
+                return total
+            await asyncio.sleep(max(0.0, pause_seconds))
+    finally:
+        await engine.dispose()
+
+
+def main() -> int:
+    args = _parse_args()
+    batch_size = max(1, args.batch_size)
+    total = asyncio.run(_run(batch_size, max(0, args.max_batches), args.pause_seconds))
+    print(f"[IDEMPOTENCY-PURGE] deleted {total} expired rows")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import itertools
+import json
+import random
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+BACKEND_DIR = ROOT_DIR / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.schemas.scenes import (
+    CounterpartyRole,
+    PowerDynamic,
+    RelationshipLevel,
+    TemplateId,
+)
+
+DEFAULT_EVALSETS = (
+    ROOT_DIR / "spec" / "evals" / "ofnr_evalset_v0.1.jsonl",
+    ROOT_DIR / "spec" / "evals" / "ofnr_evalset_v0.2.jsonl",
+)
+
+# Every TemplateId x PowerDynamic pair, so generated scenes cover all prompts.
+SCENE_COMBINATIONS = tuple(itertools.product(TemplateId, PowerDynamic))
+
+SCENE_TITLES = {
+    TemplateId.PEER_FEEDBACK: ("同级协作延期", "评审节奏混乱", "代码评审反馈", "接口联调冲突"),
+    TemplateId.MANAGER_ALIGNMENT: ("向上沟通资源不足", "绩效评分依据", "优先级对齐", "加班安排"),
+    TemplateId.CROSS_TEAM_CONFLICT: ("跨部门交付冲突", "需求变更未同步", "上线窗口争议", "支持工单积压"),
+    TemplateId.CUSTOM: ("客户验收分歧", "会议经常迟到", "文档交接不清", "值班安排"),
+}
+SCENE_GOALS = (
+    "确认新的里程碑并明确责任",
+    "对齐本周最重要的两项工作",
+    "约定固定的评审时间",
+    "明确变更同步的流程",
+    "争取更多资源支持",
+)
+SCENE_CONTEXTS = (
+    "这个需求已经两次延期，影响发布节奏",
+    "过去两周有三次评审临时改期",
+    "昨天晚上需求变更后没有同步给测试",
+    "这次绩效评分里有些依据我还不清楚",
+    "对方团队的接口比约定晚了一周",
+)
+PAIN_POINTS = ("对方容易防御", "我会急躁", "时间紧张", "上级施压", "信息不对称")
+
+ASSISTANT_REPLIES = (
+    "我理解你想推进这件事。为了更快达成一致，我们先对齐具体事实和你希望我配合的下一步，可以吗？",
+    "谢谢你直接说出来。我这边也有一些困难，我们能先一起看看时间线吗？",
+    "我明白你的担心。你希望我具体在哪个时间点之前给你答复？",
+    "这件事我确实没有同步到位。我们约个时间把变更清单过一遍吧。",
+    "我听到你需要更稳定的节奏，我们可以先从固定评审时间开始。",
+)
+
+TIME_PREFIXES = ("昨天", "这周", "过去两周", "本周一", "上次评审时", "最近三次")
+FEELING_SUFFIXES = ("我有点担心。", "我感到压力很大。", "我有些焦虑。", "我很着急。")
+NEED_SUFFIXES = ("我需要更稳定的节奏。", "我希望资源安排更明确。", "对我来说确定性很重要。")
+REQUEST_SUFFIXES = (
+    "你愿意明天一起确认里程碑吗？",
+    "可以今天 18:00 前给我一个答复吗？",
+    "能否每周二下午固定评审？",
+    "你最好尽快处理一下。",
+)
+
+
+def load_utterances(paths: list[Path] | tuple[Path, ...] = DEFAULT_EVALSETS) -> list[str]:
+    # Parsed here rather than via app.services.ofnr_eval so the traffic driver
+    # can run without backend settings (DATABASE_URL) in its environment.
+    utterances: list[str] = []
+    for path in paths:
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            message = str(json.loads(line).get("input_message", "")).strip()
+            if message:
+                utterances.append(message)
+    if not utterances:
+        raise ValueError("no input_message found in evalsets")
+    return utterances
+
+
+class UtteranceSampler:
+    def __init__(self, rng: random.Random, utterances: list[str], mutation_rate: float) -> None:
+        self._rng = rng
+        self._utterances = utterances
+        self._mutation_rate = max(0.0, min(1.0, mutation_rate))
+
+    def sample(self) -> str:
+        text = self._rng.choice(self._utterances)
+        if self._rng.random() >= self._mutation_rate:
+            return text
+        return self._mutate(text)
+
+    def _mutate(self, text: str) -> str:
+        rng = self._rng
+        mutation = rng.randrange(6)
+        if mutation == 0:
+            return f"{rng.choice(TIME_PREFIXES)}，{text}"
+        if mutation == 1:
+            return f"{text.rstrip('。')}。{rng.choice(FEELING_SUFFIXES)}"
+        if mutation == 2:
+            return f"{text.rstrip('。')}。{rng.choice(NEED_SUFFIXES)}{rng.choice(REQUEST_SUFFIXES)}"
+        if mutation == 3:
+            # Two utterances glued together make longer, mixed-quality turns.
+            return f"{text.rstrip('。')}。{rng.choice(self._utterances)}"
+        if mutation == 4:
+            return text.replace("两", str(rng.randint(2, 5))).replace("三", str(rng.randint(2, 5)))
+        cut = max(6, int(len(text) * rng.uniform(0.5, 0.9)))
+        return text[:cut]
+
+
+def scene_payload(rng: random.Random, index: int) -> dict:
+    template_id, power_dynamic = SCENE_COMBINATIONS[index % len(SCENE_COMBINATIONS)]
+    return {
+        "title": rng.choice(SCENE_TITLES[template_id]),
+        "template_id": template_id.value,
+        "counterparty_role": rng.choice(list(CounterpartyRole)).value,
+        "relationship_level": rng.choice(list(RelationshipLevel)).value,
+        "goal": rng.choice(SCENE_GOALS),
+        "pain_points": rng.sample(PAIN_POINTS, k=rng.randint(0, 3)),
+        "context": rng.choice(SCENE_CONTEXTS),
+        "power_dynamic": power_dynamic.value,
+    }